@@ -0,0 +1,122 @@
+"""add cached balance to accounts
+
+Revision ID: 3b8f1c2d9e47
+Revises: 6fae53338051
+Create Date: 2026-10-18 14:02:37.215904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b8f1c2d9e47'
+down_revision: Union[str, None] = '6fae53338051'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Must stay in sync with models.finance.BALANCE_TRIGGERS
+BALANCE_TRIGGERS = (
+    """
+    CREATE TRIGGER trg_transactions_balance_insert AFTER INSERT ON transactions
+    BEGIN
+        UPDATE accounts
+        SET balance_cents = balance_cents + CAST(ROUND(NEW.value_in_account_currency * 100) AS INTEGER)
+        WHERE id = NEW.account_id
+          AND NOT EXISTS (SELECT 1 FROM transactions WHERE merge_parent_id = NEW.id);
+        UPDATE accounts
+        SET balance_cents = balance_cents - (
+            SELECT CAST(ROUND(value_in_account_currency * 100) AS INTEGER)
+            FROM transactions WHERE id = NEW.merge_parent_id)
+        WHERE id = (SELECT account_id FROM transactions WHERE id = NEW.merge_parent_id)
+          AND NOT EXISTS (
+            SELECT 1 FROM transactions WHERE merge_parent_id = NEW.merge_parent_id AND id != NEW.id);
+    END
+    """,
+    """
+    CREATE TRIGGER trg_transactions_balance_delete AFTER DELETE ON transactions
+    BEGIN
+        UPDATE accounts
+        SET balance_cents = balance_cents - CAST(ROUND(OLD.value_in_account_currency * 100) AS INTEGER)
+        WHERE id = OLD.account_id
+          AND NOT EXISTS (SELECT 1 FROM transactions WHERE merge_parent_id = OLD.id);
+        UPDATE accounts
+        SET balance_cents = balance_cents + (
+            SELECT CAST(ROUND(value_in_account_currency * 100) AS INTEGER)
+            FROM transactions WHERE id = OLD.merge_parent_id)
+        WHERE id = (SELECT account_id FROM transactions WHERE id = OLD.merge_parent_id)
+          AND NOT EXISTS (SELECT 1 FROM transactions WHERE merge_parent_id = OLD.merge_parent_id);
+    END
+    """,
+    """
+    CREATE TRIGGER trg_transactions_balance_amount
+    AFTER UPDATE OF value_in_account_currency, account_id ON transactions
+    BEGIN
+        UPDATE accounts
+        SET balance_cents = balance_cents - CAST(ROUND(OLD.value_in_account_currency * 100) AS INTEGER)
+        WHERE id = OLD.account_id
+          AND NOT EXISTS (SELECT 1 FROM transactions WHERE merge_parent_id = OLD.id);
+        UPDATE accounts
+        SET balance_cents = balance_cents + CAST(ROUND(NEW.value_in_account_currency * 100) AS INTEGER)
+        WHERE id = NEW.account_id
+          AND NOT EXISTS (SELECT 1 FROM transactions WHERE merge_parent_id = NEW.id);
+    END
+    """,
+    """
+    CREATE TRIGGER trg_transactions_balance_merge
+    AFTER UPDATE OF merge_parent_id ON transactions
+    WHEN OLD.merge_parent_id IS NOT NEW.merge_parent_id
+    BEGIN
+        UPDATE accounts
+        SET balance_cents = balance_cents + (
+            SELECT CAST(ROUND(value_in_account_currency * 100) AS INTEGER)
+            FROM transactions WHERE id = OLD.merge_parent_id)
+        WHERE id = (SELECT account_id FROM transactions WHERE id = OLD.merge_parent_id)
+          AND NOT EXISTS (SELECT 1 FROM transactions WHERE merge_parent_id = OLD.merge_parent_id);
+        UPDATE accounts
+        SET balance_cents = balance_cents - (
+            SELECT CAST(ROUND(value_in_account_currency * 100) AS INTEGER)
+            FROM transactions WHERE id = NEW.merge_parent_id)
+        WHERE id = (SELECT account_id FROM transactions WHERE id = NEW.merge_parent_id)
+          AND NOT EXISTS (
+            SELECT 1 FROM transactions WHERE merge_parent_id = NEW.merge_parent_id AND id != NEW.id);
+    END
+    """,
+)
+
+TRIGGER_NAMES = (
+    'trg_transactions_balance_insert',
+    'trg_transactions_balance_delete',
+    'trg_transactions_balance_amount',
+    'trg_transactions_balance_merge',
+)
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('accounts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('balance_cents', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill from the existing transactions, leaving out merge parents
+    op.execute(
+        """
+        UPDATE accounts SET balance_cents = (
+            SELECT COALESCE(SUM(CAST(ROUND(t.value_in_account_currency * 100) AS INTEGER)), 0)
+            FROM transactions AS t
+            WHERE t.account_id = accounts.id
+              AND NOT EXISTS (SELECT 1 FROM transactions AS c WHERE c.merge_parent_id = t.id)
+        )
+        """
+    )
+    for trigger in BALANCE_TRIGGERS:
+        op.execute(trigger)
+
+
+def downgrade() -> None:
+    for name in TRIGGER_NAMES:
+        op.execute(f'DROP TRIGGER IF EXISTS {name}')
+
+    with op.batch_alter_table('accounts', schema=None) as batch_op:
+        batch_op.drop_column('balance_cents')
@@ -0,0 +1,82 @@
+"""add full-text search index for transactions
+
+Revision ID: 5e2d8b7c4a13
+Revises: 9c4e7a1b5d20
+Create Date: 2026-10-18 19:02:44.218305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e2d8b7c4a13'
+down_revision: Union[str, None] = '9c4e7a1b5d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Must stay in sync with models.finance.SEARCH_INDEX_DDL and SEARCH_INDEX_TRIGGERS
+SEARCH_INDEX_DDL = "CREATE VIRTUAL TABLE transactions_search USING fts5(description, account, amount)"
+
+SEARCH_INDEX_TRIGGERS = (
+    """
+    CREATE TRIGGER trg_search_transactions_insert AFTER INSERT ON transactions
+    BEGIN
+        INSERT INTO transactions_search (rowid, description, account, amount)
+        VALUES (NEW.id, NEW.description, (SELECT name FROM accounts WHERE id = NEW.account_id),
+                printf('%.2f', NEW.original_value));
+    END
+    """,
+    """
+    CREATE TRIGGER trg_search_transactions_delete AFTER DELETE ON transactions
+    BEGIN
+        DELETE FROM transactions_search WHERE rowid = OLD.id;
+    END
+    """,
+    """
+    CREATE TRIGGER trg_search_transactions_update
+    AFTER UPDATE OF description, original_value, account_id ON transactions
+    BEGIN
+        UPDATE transactions_search
+        SET description = NEW.description,
+            account = (SELECT name FROM accounts WHERE id = NEW.account_id),
+            amount = printf('%.2f', NEW.original_value)
+        WHERE rowid = NEW.id;
+    END
+    """,
+    """
+    CREATE TRIGGER trg_search_accounts_insert AFTER INSERT ON accounts
+    BEGIN
+        UPDATE transactions_search SET account = NEW.name
+        WHERE rowid IN (SELECT id FROM transactions WHERE account_id = NEW.id);
+    END
+    """,
+    """
+    CREATE TRIGGER trg_search_accounts_update AFTER UPDATE OF name ON accounts
+    BEGIN
+        UPDATE transactions_search SET account = NEW.name
+        WHERE rowid IN (SELECT id FROM transactions WHERE account_id = NEW.id);
+    END
+    """,
+)
+
+
+def upgrade() -> None:
+    op.execute(SEARCH_INDEX_DDL)
+    op.execute(
+        """
+        INSERT INTO transactions_search (rowid, description, account, amount)
+        SELECT t.id, t.description, a.name, printf('%.2f', t.original_value)
+        FROM transactions t LEFT JOIN accounts a ON a.id = t.account_id
+        """
+    )
+    for trigger in SEARCH_INDEX_TRIGGERS:
+        op.execute(trigger)
+
+
+def downgrade() -> None:
+    for trigger in SEARCH_INDEX_TRIGGERS:
+        op.execute(f'DROP TRIGGER IF EXISTS {trigger.split()[2]}')
+    op.execute('DROP TABLE IF EXISTS transactions_search')
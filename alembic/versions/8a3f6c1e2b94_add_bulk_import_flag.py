@@ -0,0 +1,65 @@
+"""add bulk import flag for the balance and search index insert triggers
+
+Revision ID: 8a3f6c1e2b94
+Revises: 5e2d8b7c4a13
+Create Date: 2026-10-18 21:14:05.731642
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a3f6c1e2b94'
+down_revision: Union[str, None] = '5e2d8b7c4a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Must stay in sync with models.finance.BULK_IMPORT_DDL and the insert triggers in
+# BALANCE_TRIGGERS and SEARCH_INDEX_TRIGGERS
+BALANCE_INSERT_BODY = """
+    BEGIN
+        UPDATE accounts
+        SET balance_cents = balance_cents + CAST(ROUND(NEW.value_in_account_currency * 100) AS INTEGER)
+        WHERE id = NEW.account_id
+          AND NOT EXISTS (SELECT 1 FROM transactions WHERE merge_parent_id = NEW.id);
+        UPDATE accounts
+        SET balance_cents = balance_cents - (
+            SELECT CAST(ROUND(value_in_account_currency * 100) AS INTEGER)
+            FROM transactions WHERE id = NEW.merge_parent_id)
+        WHERE id = (SELECT account_id FROM transactions WHERE id = NEW.merge_parent_id)
+          AND NOT EXISTS (
+            SELECT 1 FROM transactions WHERE merge_parent_id = NEW.merge_parent_id AND id != NEW.id);
+    END
+"""
+SEARCH_INSERT_BODY = """
+    BEGIN
+        INSERT INTO transactions_search (rowid, description, account, amount)
+        VALUES (NEW.id, NEW.description, (SELECT name FROM accounts WHERE id = NEW.account_id),
+                printf('%.2f', NEW.original_value));
+    END
+"""
+NOT_BULK_IMPORT = "WHEN NOT EXISTS (SELECT 1 FROM bulk_import WHERE active)"
+INSERT_TRIGGERS = {
+    'trg_transactions_balance_insert': BALANCE_INSERT_BODY,
+    'trg_search_transactions_insert': SEARCH_INSERT_BODY,
+}
+
+
+def _create_insert_triggers(when: str):
+    for name, body in INSERT_TRIGGERS.items():
+        op.execute(f'DROP TRIGGER IF EXISTS {name}')
+        op.execute(f'CREATE TRIGGER {name} AFTER INSERT ON transactions {when} {body}')
+
+
+def upgrade() -> None:
+    op.execute('CREATE TABLE bulk_import (active BOOLEAN NOT NULL)')
+    op.execute('INSERT INTO bulk_import (active) VALUES (0)')
+    _create_insert_triggers(NOT_BULK_IMPORT)
+
+
+def downgrade() -> None:
+    _create_insert_triggers('')
+    op.execute('DROP TABLE IF EXISTS bulk_import')
@@ -0,0 +1,81 @@
+"""add split and merge parent flags to transactions
+
+Revision ID: 9c4e7a1b5d20
+Revises: 3b8f1c2d9e47
+Create Date: 2026-10-18 15:21:09.664318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c4e7a1b5d20'
+down_revision: Union[str, None] = '3b8f1c2d9e47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Must stay in sync with models.finance.PARENT_FLAG_TRIGGERS
+PARENT_FLAG_TRIGGERS = tuple(
+    trigger
+    for kind in ("split", "merge")
+    for trigger in (
+        f"""
+        CREATE TRIGGER trg_transactions_{kind}_parent_insert AFTER INSERT ON transactions
+        WHEN NEW.{kind}_parent_id IS NOT NULL
+        BEGIN
+            UPDATE transactions SET is_{kind}_parent = 1
+            WHERE id = NEW.{kind}_parent_id AND NOT is_{kind}_parent;
+        END
+        """,
+        f"""
+        CREATE TRIGGER trg_transactions_{kind}_parent_delete AFTER DELETE ON transactions
+        WHEN OLD.{kind}_parent_id IS NOT NULL
+        BEGIN
+            UPDATE transactions SET is_{kind}_parent = 0
+            WHERE id = OLD.{kind}_parent_id
+              AND NOT EXISTS (SELECT 1 FROM transactions WHERE {kind}_parent_id = OLD.{kind}_parent_id);
+        END
+        """,
+        f"""
+        CREATE TRIGGER trg_transactions_{kind}_parent_update AFTER UPDATE OF {kind}_parent_id ON transactions
+        WHEN OLD.{kind}_parent_id IS NOT NEW.{kind}_parent_id
+        BEGIN
+            UPDATE transactions SET is_{kind}_parent = 0
+            WHERE id = OLD.{kind}_parent_id
+              AND NOT EXISTS (SELECT 1 FROM transactions WHERE {kind}_parent_id = OLD.{kind}_parent_id);
+            UPDATE transactions SET is_{kind}_parent = 1
+            WHERE id = NEW.{kind}_parent_id AND NOT is_{kind}_parent;
+        END
+        """,
+    )
+)
+
+
+def upgrade() -> None:
+    # Plain ALTER TABLE ... ADD/DROP COLUMN throughout: a batch operation would copy
+    # the table and lose the balance triggers defined on it
+    op.add_column('transactions', sa.Column('is_split_parent', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.add_column('transactions', sa.Column('is_merge_parent', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+    for kind in ('split', 'merge'):
+        op.execute(
+            f"""
+            UPDATE transactions SET is_{kind}_parent = 1
+            WHERE id IN (SELECT {kind}_parent_id FROM transactions WHERE {kind}_parent_id IS NOT NULL)
+            """
+        )
+    for trigger in PARENT_FLAG_TRIGGERS:
+        op.execute(trigger)
+
+
+def downgrade() -> None:
+    for kind in ('split', 'merge'):
+        for event in ('insert', 'delete', 'update'):
+            op.execute(f'DROP TRIGGER IF EXISTS trg_transactions_{kind}_parent_{event}')
+
+    op.drop_column('transactions', 'is_merge_parent')
+    op.drop_column('transactions', 'is_split_parent')
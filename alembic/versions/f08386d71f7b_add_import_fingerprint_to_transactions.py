@@ -0,0 +1,93 @@
+"""add import_fingerprint to transactions
+
+Revision ID: f08386d71f7b
+Revises: a99e4a82224a
+Create Date: 2026-10-18 10:12:03.417529
+
+"""
+import hashlib
+from decimal import Decimal
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f08386d71f7b'
+down_revision: Union[str, None] = 'a99e4a82224a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Must stay in sync with queries._fingerprint_key / queries._import_fingerprint
+def _fingerprint_key(account_id, date, amount, description):
+    normalized = " ".join(description.casefold().split())
+    amount = Decimal(str(amount)).quantize(Decimal("0.01"))
+    return f"{account_id}|{date.isoformat()}|{amount}|{normalized}"
+
+
+def _fingerprint(key, ordinal):
+    return hashlib.sha1(f"{key}|{ordinal}".encode("utf-8")).hexdigest()
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('import_fingerprint', sa.String(length=40), nullable=True))
+        batch_op.create_index(batch_op.f('ix_transactions_import_fingerprint'), ['import_fingerprint'], unique=True)
+
+    # Backfill fingerprints for existing top-level rows so the first re-import
+    # after the upgrade already skips transactions imported earlier.
+    transactions = sa.table(
+        'transactions',
+        sa.column('id', sa.Integer),
+        sa.column('account_id', sa.Integer),
+        sa.column('description', sa.String),
+        sa.column('value_in_account_currency', sa.Numeric(10, 2)),
+        sa.column('date', sa.DateTime),
+        sa.column('split_parent_id', sa.Integer),
+        sa.column('merge_parent_id', sa.Integer),
+        sa.column('import_fingerprint', sa.String),
+    )
+    conn = op.get_bind()
+    merge_parent_ids = (
+        sa.select(transactions.c.merge_parent_id)
+        .where(transactions.c.merge_parent_id.is_not(None))
+        .scalar_subquery()
+    )
+    rows = conn.execute(
+        sa.select(
+            transactions.c.id,
+            transactions.c.account_id,
+            transactions.c.description,
+            transactions.c.value_in_account_currency,
+            transactions.c.date,
+        )
+        .where(transactions.c.split_parent_id.is_(None))
+        .where(transactions.c.id.not_in(merge_parent_ids))
+        .order_by(transactions.c.id)
+    ).all()
+
+    seen = {}
+    updates = []
+    for row in rows:
+        key = _fingerprint_key(
+            row.account_id, row.date, row.value_in_account_currency, row.description
+        )
+        ordinal = seen.get(key, 0)
+        seen[key] = ordinal + 1
+        updates.append({"row_id": row.id, "fingerprint": _fingerprint(key, ordinal)})
+
+    if updates:
+        conn.execute(
+            transactions.update()
+            .where(transactions.c.id == sa.bindparam("row_id"))
+            .values(import_fingerprint=sa.bindparam("fingerprint")),
+            updates,
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_transactions_import_fingerprint'))
+        batch_op.drop_column('import_fingerprint')
@@ -0,0 +1,86 @@
+# FinView — terminal-based personal finance manager
+# Copyright (C) 2026 Philipp Heller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Benchmark switching the transaction list back and forth between two accounts.
+
+Usage: python benchmarks/bench_account_switch.py [--transactions N] [--switches N] [--no-cache]
+
+Each switch does what the table does on opening an account: count its
+transactions, load the row layout and load the first page of rows. After the
+first visit of each account, counts and layout come from the read cache;
+--no-cache disables it to compare.
+"""
+
+import argparse
+
+import common  # noqa: F401  (sets up sys.path)
+
+from common import populate_ledger, report, timed
+import db
+import queries
+from models.base import Base
+
+
+def open_account(session, account_id):
+    queries.count_transactions(session, account_id=account_id)
+    layout = queries.load_transaction_layout(session, account_id=account_id)
+    units = layout.units(0, queries.TRANSACTION_PAGE_SIZE)
+    queries.load_unit_rows(session, account_id, False, units)
+    return layout
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transactions", type=int, default=200_000)
+    parser.add_argument("--merge-groups", type=int, default=20_000)
+    parser.add_argument("--accounts", type=int, default=4)
+    parser.add_argument("--switches", type=int, default=20)
+    parser.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args()
+
+    if args.no_cache:
+        queries._read_cache.max_rows = 0
+
+    db._create_memory_engine()
+    Base.metadata.create_all(db.engine)
+    session = db.SessionLocal()
+    account_ids, seconds = timed(
+        populate_ledger, session, args.accounts, args.transactions, args.merge_groups
+    )
+    print(f"built ledger in {seconds:.1f}s")
+
+    first, second = account_ids[:2]
+    layout, seconds = timed(open_account, session, first)
+    report("first visit", len(layout), seconds)
+    layout, seconds = timed(open_account, session, second)
+    report("first visit, other account", len(layout), seconds)
+
+    def switch_back_and_forth():
+        rows = 0
+        for i in range(args.switches):
+            rows += len(open_account(session, (first, second)[i % 2]))
+        return rows
+
+    rows, seconds = timed(switch_back_and_forth)
+    report(f"{args.switches} switches", rows, seconds)
+
+    db.mark_dirty()
+    layout, seconds = timed(open_account, session, first)
+    report("after a change", len(layout), seconds)
+
+
+if __name__ == "__main__":
+    main()
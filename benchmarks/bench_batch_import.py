@@ -0,0 +1,88 @@
+# FinView — terminal-based personal finance manager
+# Copyright (C) 2026 Philipp Heller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Benchmark importing several CSV files: sequential vs. a process pool.
+
+Usage: python benchmarks/bench_batch_import.py [--files N] [--rows N] [--workers N [N ...]]
+
+The sequential baseline calls import_csv_transactions once per file; the parallel
+runs use import_csv_batch, which parses the files in worker processes. Speedup is
+bounded by the number of CPU cores, since the single writer stays serial.
+"""
+
+import argparse
+import os
+import tempfile
+
+import common  # noqa: F401  (sets up sys.path)
+
+from common import report, timed, write_swisscard_csv
+import db
+import queries
+from models.base import Base
+from models.finance import Account, Currency
+
+
+def fresh_account():
+    db._create_memory_engine()
+    Base.metadata.create_all(db.engine)
+    session = db.SessionLocal()
+    account = Account(name="Bench", currency=Currency.CHF, mapping_spec="Swisscard/swisscard.yaml")
+    session.add(account)
+    session.commit()
+    return session, account
+
+
+def run_sequential(paths: list[str]) -> int:
+    session, account = fresh_account()
+    count = sum(queries.import_csv_transactions(session, p, account)[0] for p in paths)
+    session.close()
+    db.engine.dispose()
+    return count
+
+
+def run_batch(paths: list[str], workers: int) -> int:
+    session, account = fresh_account()
+    results = queries.import_csv_batch(session, [(p, account) for p in paths], max_workers=workers)
+    session.close()
+    db.engine.dispose()
+    return sum(inserted for inserted, _ in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=5_000, help="rows per file")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    os.chdir(common.ROOT)  # mapping specs are resolved relative to ./importers
+    with tempfile.TemporaryDirectory() as tmp:
+        # Distinct seeds so the files don't deduplicate against each other
+        paths = [
+            write_swisscard_csv(os.path.join(tmp, f"bench_{i}.csv"), args.rows, seed=i)
+            for i in range(args.files)
+        ]
+
+        count, seconds = timed(run_sequential, paths)
+        report(f"sequential ({args.files} files)", count, seconds)
+        for workers in sorted(set(args.workers)):
+            count, seconds = timed(run_batch, paths, workers)
+            report(f"batch, {workers} worker(s)", count, seconds)
+
+
+if __name__ == "__main__":
+    main()
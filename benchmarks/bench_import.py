@@ -0,0 +1,75 @@
+# FinView — terminal-based personal finance manager
+# Copyright (C) 2026 Philipp Heller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Benchmark a full CSV import: throughput and peak Python heap per file size.
+
+Usage: python benchmarks/bench_import.py [--rows N [N ...]] [--chunk-size N]
+
+Peak memory is measured with tracemalloc, so it covers Python allocations
+(ORM objects, parsed rows) rather than SQLite's own page cache.
+"""
+
+import argparse
+import os
+import tempfile
+import tracemalloc
+
+import common  # noqa: F401  (sets up sys.path)
+
+from common import report, timed, write_swisscard_csv
+import db
+import queries
+from models.base import Base
+from models.finance import Account, Currency
+
+
+def run_import(csv_path: str, chunk_size: int) -> tuple[int, float, int]:
+    db._create_memory_engine()
+    Base.metadata.create_all(db.engine)
+    session = db.SessionLocal()
+    account = Account(name="Bench", currency=Currency.CHF, mapping_spec="Swisscard/swisscard.yaml")
+    session.add(account)
+    session.commit()
+
+    tracemalloc.start()
+    (count, _), seconds = timed(
+        queries.import_csv_transactions, session, csv_path, account, chunk_size=chunk_size
+    )
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    session.close()
+    db.engine.dispose()
+    return count, seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[5_000, 20_000])
+    parser.add_argument("--chunk-size", type=int, default=queries.IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    os.chdir(common.ROOT)  # mapping specs are resolved relative to ./importers
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            csv_path = write_swisscard_csv(os.path.join(tmp, f"bench_{rows}.csv"), rows)
+            count, seconds, peak = run_import(csv_path, args.chunk_size)
+            report(f"import (chunk={args.chunk_size})", count, seconds)
+            print(f"{'':<32} peak heap {peak / 1024 / 1024:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# FinView — terminal-based personal finance manager
+# Copyright (C) 2026 Philipp Heller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Benchmark what the schema's triggers cost a CSV import.
+
+Usage: python benchmarks/bench_import_triggers.py [--rows N] [--repeat N] [--max-overhead PCT]
+
+Imports the same file with every trigger installed and with each trigger set
+dropped, taking the median of --repeat runs, and fails if the full set slows the
+import down by more than --max-overhead percent compared to none at all.
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+
+import common  # noqa: F401  (sets up sys.path)
+
+from common import report, timed, write_swisscard_csv
+import db
+import queries
+from models.base import Base
+from models.finance import (
+    BALANCE_TRIGGERS, PARENT_FLAG_TRIGGERS, SEARCH_INDEX_TRIGGERS, Account, Currency,
+)
+from sqlalchemy import text
+
+TRIGGER_SETS = {
+    "all triggers": (),
+    "without balance": BALANCE_TRIGGERS,
+    "without parent flags": PARENT_FLAG_TRIGGERS,
+    "without search index": SEARCH_INDEX_TRIGGERS,
+    "no triggers": BALANCE_TRIGGERS + PARENT_FLAG_TRIGGERS + SEARCH_INDEX_TRIGGERS,
+}
+
+
+def run_import(csv_path: str, dropped: tuple[str, ...]) -> tuple[int, float]:
+    db._create_memory_engine()
+    Base.metadata.create_all(db.engine)
+    session = db.SessionLocal()
+    for trigger in dropped:
+        session.execute(text(f"DROP TRIGGER {trigger.split()[2]}"))
+    account = Account(name="Bench", currency=Currency.CHF, mapping_spec="Swisscard/swisscard.yaml")
+    session.add(account)
+    session.commit()
+
+    (count, _), seconds = timed(queries.import_csv_transactions, session, csv_path, account)
+    session.close()
+    db.engine.dispose()
+    return count, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=30_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-overhead", type=float, default=40.0)
+    args = parser.parse_args()
+
+    runs = {label: [] for label in TRIGGER_SETS}
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = write_swisscard_csv(os.path.join(tmp, "bench.csv"), args.rows)
+        # Round-robin, so a slow spell of the machine doesn't hit just one set
+        for _ in range(args.repeat):
+            for label, dropped in TRIGGER_SETS.items():
+                count, seconds = run_import(csv_path, dropped)
+                runs[label].append(seconds)
+    seconds_by_set = {label: statistics.median(times) for label, times in runs.items()}
+    for label, seconds in seconds_by_set.items():
+        report(label, count, seconds)
+
+    overhead = 100 * (seconds_by_set["all triggers"] / seconds_by_set["no triggers"] - 1)
+    print(f"trigger overhead: {overhead:.0f}%")
+    assert overhead <= args.max_overhead, (
+        f"triggers slow the import down by {overhead:.0f}%, more than {args.max_overhead:.0f}%"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# FinView — terminal-based personal finance manager
+# Copyright (C) 2026 Philipp Heller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Benchmark the import write path: ORM unit-of-work vs. Core executemany.
+
+Usage: python benchmarks/bench_insert.py [--rows N] [--chunk-size N]
+
+CEL parsing is excluded; both writers get the same pre-validated rows so the
+numbers isolate the cost of getting them into SQLite.
+"""
+
+import argparse
+import datetime
+
+import common  # noqa: F401  (sets up sys.path)
+
+from common import report, timed
+import db
+import queries
+from models.base import Base
+from models.finance import Account, Currency, Transaction
+
+
+def fresh_session():
+    db._create_memory_engine()
+    Base.metadata.create_all(db.engine)
+    session = db.SessionLocal()
+    account = Account(name="Bench", currency=Currency.CHF)
+    session.add(account)
+    session.commit()
+    return session, account.id
+
+
+def make_params(account_id: int, count: int):
+    start = datetime.datetime(2020, 1, 1)
+    for i in range(count):
+        yield {
+            "account_id": account_id,
+            "description": f"Merchant {i % 977}",
+            "original_value": -(i % 500) - 0.25,
+            "original_currency": Currency.CHF,
+            "value_in_account_currency": -(i % 500) - 0.25,
+            "date": start + datetime.timedelta(minutes=i),
+        }
+
+
+def write_orm(session, account_id, count, chunk_size):
+    for chunk in queries._chunked(make_params(account_id, count), chunk_size):
+        session.add_all(Transaction(**p) for p in chunk)
+        session.flush()
+    session.commit()
+    return count
+
+
+def write_core(session, account_id, count, chunk_size):
+    for chunk in queries._chunked(make_params(account_id, count), chunk_size):
+        queries._insert_transaction_rows(session, chunk)
+    session.commit()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunk-size", type=int, default=queries.IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    results = {}
+    for label, writer in (("ORM add_all + flush", write_orm), ("Core executemany", write_core)):
+        session, account_id = fresh_session()
+        _, seconds = timed(writer, session, account_id, args.rows, args.chunk_size)
+        session.close()
+        db.engine.dispose()
+        results[label] = seconds
+        report(label, args.rows, seconds)
+
+    speedup = results["ORM add_all + flush"] / results["Core executemany"]
+    print(f"speedup: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
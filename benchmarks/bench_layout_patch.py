@@ -0,0 +1,87 @@
+# FinView — terminal-based personal finance manager
+# Copyright (C) 2026 Philipp Heller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Benchmark showing a merge in the transaction list: patching the layout vs loading it anew.
+
+Usage: python benchmarks/bench_layout_patch.py [--transactions N] [--merges N] [--all-accounts]
+
+Each merge joins two ungrouped transactions of the first account. Afterwards
+the table either patches its row layout with queries.update_transaction_layout
+or, as before, loads the whole layout again.
+"""
+
+import argparse
+import random
+
+import common  # noqa: F401  (sets up sys.path)
+
+from common import populate_ledger, report, timed
+import db
+import queries
+from models.base import Base
+from models.finance import Transaction
+from sqlalchemy import select
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transactions", type=int, default=200_000)
+    parser.add_argument("--merge-groups", type=int, default=20_000)
+    parser.add_argument("--accounts", type=int, default=4)
+    parser.add_argument("--merges", type=int, default=20)
+    parser.add_argument("--all-accounts", action="store_true")
+    args = parser.parse_args()
+
+    db._create_memory_engine()
+    Base.metadata.create_all(db.engine)
+    session = db.SessionLocal()
+    account_ids, seconds = timed(
+        populate_ledger, session, args.accounts, args.transactions, args.merge_groups
+    )
+    print(f"built ledger in {seconds:.1f}s")
+
+    account_id = None if args.all_accounts else account_ids[0]
+    view = (account_id, args.all_accounts)
+    layout, seconds = timed(queries.load_transaction_layout, session, *view)
+    report("initial layout", len(layout), seconds)
+
+    loose = session.execute(
+        select(Transaction.id).where(
+            Transaction.account_id == account_ids[0],
+            Transaction.merge_parent_id.is_(None),
+            Transaction.is_merge_parent.is_(False),
+            Transaction.is_split_parent.is_(False),
+        )
+    ).scalars().all()
+    picks = random.Random(42).sample(loose, 2 * args.merges)
+
+    patch_seconds = reload_seconds = 0.0
+    for i in range(args.merges):
+        changes = queries.ChangeSet()
+        queries.create_merge(session, picks[2 * i:2 * i + 2], f"Group {i}", changes)
+        patch, seconds = timed(queries.update_transaction_layout, session, layout, *view, changes)
+        patch_seconds += seconds
+        fresh, seconds = timed(queries.load_transaction_layout, session, *view)
+        reload_seconds += seconds
+        assert list(patch.layout.rows) == list(fresh.rows)
+        layout = patch.layout
+
+    report(f"{args.merges} merges, patched", len(layout) * args.merges, patch_seconds)
+    report(f"{args.merges} merges, reloaded", len(layout) * args.merges, reload_seconds)
+
+
+if __name__ == "__main__":
+    main()
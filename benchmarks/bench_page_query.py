@@ -0,0 +1,97 @@
+# FinView — terminal-based personal finance manager
+# Copyright (C) 2026 Philipp Heller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Benchmark loading the transaction list of one account and of all accounts.
+
+Usage: python benchmarks/bench_page_query.py [--transactions N] [--merge-groups N]
+
+Times what the table does on opening a view: count its transactions, load the
+first window of the row layout and load the rows of its display units. Then the
+slices that add the rest of the layout after the first paint, the whole layout
+in one query, and loading the rows of every unit. The read cache is off, so
+every call queries.
+"""
+
+import argparse
+
+import time
+
+import common  # noqa: F401  (sets up sys.path)
+
+from common import populate_ledger, report, timed
+import db
+import queries
+from models.base import Base
+
+# Display units per slice, as TransactionTable.LAYOUT_SLICE_UNITS
+SLICE_UNITS = 2000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transactions", type=int, default=200_000)
+    parser.add_argument("--merge-groups", type=int, default=20_000)
+    parser.add_argument("--accounts", type=int, default=4)
+    args = parser.parse_args()
+
+    queries._read_cache.max_rows = 0
+
+    db._create_memory_engine()
+    Base.metadata.create_all(db.engine)
+    session = db.SessionLocal()
+    account_ids, seconds = timed(
+        populate_ledger, session, args.accounts, args.transactions, args.merge_groups
+    )
+    print(f"built ledger in {seconds:.1f}s")
+
+    for name, account_id, all_accounts in (
+        ("one account", account_ids[0], False),
+        ("all accounts", None, True),
+    ):
+        counts, seconds = timed(queries.count_transactions, session, account_id, all_accounts)
+        report(f"{name}, count", counts[0], seconds)
+
+        window, seconds = timed(
+            queries.load_transaction_layout_window, session, account_id, all_accounts
+        )
+        report(f"{name}, first window", len(window), seconds)
+
+        session.expunge_all()
+        units = window.units(0, window.unit_count)
+        rows, seconds = timed(queries.load_unit_rows, session, account_id, all_accounts, units)
+        report(f"{name}, first page", len(rows), seconds)
+
+        first_rows = len(window)
+        slices = []
+        while not window.complete:
+            start = time.perf_counter()
+            queries.extend_transaction_layout(session, window, account_id, all_accounts, SLICE_UNITS)
+            slices.append(time.perf_counter() - start)
+        report(f"{name}, slowest slice", SLICE_UNITS, max(slices))
+        report(f"{name}, all {len(slices)} slices", len(window) - first_rows, sum(slices))
+
+        layout, seconds = timed(queries.load_transaction_layout, session, account_id, all_accounts)
+        report(f"{name}, layout", len(layout), seconds)
+        assert window == layout
+
+        session.expunge_all()
+        units = layout.units(0, layout.unit_count)
+        rows, seconds = timed(queries.load_unit_rows, session, account_id, all_accounts, units)
+        report(f"{name}, every row", len(rows), seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# FinView — terminal-based personal finance manager
+# Copyright (C) 2026 Philipp Heller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Benchmark mapping evaluation: per-row CEL parsing, compiled CEL, native fast paths.
+
+Usage: python benchmarks/bench_parse.py [--rows N]
+"""
+
+import argparse
+from datetime import datetime
+
+import common  # noqa: F401  (sets up sys.path)
+import cel
+
+from common import SWISSCARD_SPEC, report, swisscard_rows, timed
+from importers.engine import CSVImporter, _date, _double, _split
+
+# The Swisscard spec written purely in CEL, as it was before declarative fields
+# and the date() function
+SWISSCARD_CEL = {
+    "timestamp": "split(row[0], '.')[2] + '-' + split(row[0], '.')[1] + '-' + split(row[0], '.')[0]",
+    "description": "row[2] != '' ? row[2]+' ('+row[1]+')' : row[1]",
+    "amount_original": "(row[7] != '' ? double(row[7]) : double(row[5]))*-1.0",
+    "currency_original": "row[6] != '' ? row[6] : row[4]",
+    "amount_in_account_currency": "double(row[5])*-1.0",
+}
+
+
+def parse_uncompiled(rows: list[list[str]]) -> int:
+    """``cel.evaluate`` re-parses every field on every row."""
+    for row in rows:
+        context = {"row": row, "double": _double, "split": _split}
+        for expr_str in SWISSCARD_CEL.values():
+            cel.evaluate(expr_str, context)
+    return len(rows)
+
+
+def parse_compiled_cel(rows: list[list[str]]) -> int:
+    """Every field compiled once, but still interpreted by CEL."""
+    programs = [cel.compile(expr_str) for expr_str in SWISSCARD_CEL.values()]
+    for row in rows:
+        context = {"row": row, "double": _double, "split": _split}
+        for program in programs:
+            program.execute(context)
+    return len(rows)
+
+
+def parse_dates_split(rows: list[list[str]]) -> int:
+    """The old timestamp path: rebuild an ISO string in CEL, then parse it in Python."""
+    program = cel.compile(SWISSCARD_CEL["timestamp"])
+    for row in rows:
+        iso = program.execute({"row": row, "split": _split})
+        datetime.fromisoformat(iso)
+    return len(rows)
+
+
+def parse_dates_cel(rows: list[list[str]]) -> int:
+    """date() called from a compiled CEL program (memoized, no string rebuilding)."""
+    program = cel.compile("date(row[0], '%d.%m.%Y')")
+    for row in rows:
+        program.execute({"row": row, "date": _date})
+    return len(rows)
+
+
+def parse_importer(importer: CSVImporter, rows: list[list[str]]) -> int:
+    """The shipped spec: declarative and trivial fields run natively, the rest in CEL."""
+    for row in rows:
+        importer.parse_row(row)
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20_000)
+    args = parser.parse_args()
+
+    importer = CSVImporter(SWISSCARD_SPEC)
+    rows = list(swisscard_rows(args.rows))
+
+    _, uncompiled = timed(parse_uncompiled, rows)
+    _, compiled = timed(parse_compiled_cel, rows)
+    _, native = timed(parse_importer, importer, rows)
+    report("cel.evaluate per row", len(rows), uncompiled)
+    report("compiled CEL", len(rows), compiled)
+    report("native fast paths + CEL", len(rows), native)
+    print(f"speedup vs compiled CEL: {compiled / native:.1f}x")
+
+    _, split_dates = timed(parse_dates_split, rows)
+    _, cel_dates = timed(parse_dates_cel, rows)
+    report("timestamp: split() + fromisoformat", len(rows), split_dates)
+    report("timestamp: CEL date()", len(rows), cel_dates)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# FinView — terminal-based personal finance manager
+# Copyright (C) 2026 Philipp Heller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Benchmark :w: a full backup of the ledger vs. saving only the changed rows.
+
+Usage: python benchmarks/bench_save.py [--transactions N] [--changes N ...]
+
+The ledger is saved once in full, then each round toggles reviewed_at on
+--changes transactions and saves again to the same file.
+"""
+
+import argparse
+import datetime
+import os
+import tempfile
+
+import common  # noqa: F401  (sets up sys.path)
+
+from common import populate_ledger, report, timed
+from sqlalchemy import update
+
+import db
+from models.base import Base
+from models.finance import Transaction
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transactions", type=int, default=500_000)
+    parser.add_argument("--changes", type=int, nargs="+", default=[1, 100, 10_000])
+    args = parser.parse_args()
+
+    db._create_memory_engine()
+    Base.metadata.create_all(db.engine)
+    session = db.SessionLocal()
+    populate_ledger(session, transactions=args.transactions, merge_groups=args.transactions // 20)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ledger.db")
+        _, seconds = timed(db.save_to_file, path)
+        report("full backup", args.transactions, seconds)
+        print(f"{'file size':<32} {os.path.getsize(path) / 2**20:>9.1f} MiB")
+
+        for changes in args.changes:
+            session.execute(
+                update(Transaction).where(Transaction.id <= changes)
+                .values(reviewed_at=datetime.datetime.now())
+            )
+            session.commit()
+            _, seconds = timed(db.save_to_file)
+            report(f"incremental, {changes} changed", changes, seconds)
+
+    session.close()
+    db.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
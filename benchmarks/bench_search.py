@@ -0,0 +1,79 @@
+# FinView — terminal-based personal finance manager
+# Copyright (C) 2026 Philipp Heller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Benchmark / search: full-text index lookup, and search as you type.
+
+Usage: python benchmarks/bench_search.py [--transactions N] [--terms TERM ...]
+
+Search as you type is timed per keystroke for each term, once scanning the row
+texts and once with the postings built.
+"""
+
+import argparse
+
+import common  # noqa: F401  (sets up sys.path)
+
+from common import populate_ledger, report, timed
+
+import db
+import queries
+from models.base import Base
+
+
+def _type_terms(index, terms, label):
+    for term in terms:
+        slowest = 0.0
+        matches = None
+        for end in range(1, len(term) + 1):
+            words = queries.search_terms(term[:end])
+            matches, seconds = timed(index.matches, words, matches)
+            slowest = max(slowest, seconds)
+        print(f"{label + ' keystroke ' + repr(term):<32} slowest {slowest * 1000:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transactions", type=int, default=200_000)
+    parser.add_argument("--terms", nargs="+", default=["coop", "migros zurich", "12.5", "nomatch"])
+    args = parser.parse_args()
+
+    db._create_memory_engine()
+    Base.metadata.create_all(db.engine)
+    session = db.SessionLocal()
+    populate_ledger(session, transactions=args.transactions, merge_groups=args.transactions // 20)
+    layout = queries.load_transaction_layout(session, all_accounts=True)
+
+    for term in args.terms:
+        ids, seconds = timed(queries.search_transaction_ids, session, term)
+        report(f"index lookup '{term}'", len(ids), seconds)
+        _, seconds = timed(
+            lambda: [i for i, entry in enumerate(layout.rows) if abs(entry) in ids]
+        )
+        report(f"map onto layout '{term}'", len(layout), seconds)
+
+    index, seconds = timed(queries.load_row_search_index, session, layout)
+    report("load row texts", len(layout), seconds)
+    _type_terms(index, args.terms, "scan")
+    _, seconds = timed(index.build_postings)
+    report("build postings", len(layout), seconds)
+    _type_terms(index, args.terms, "indexed")
+
+    session.close()
+    db.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# FinView — terminal-based personal finance manager
+# Copyright (C) 2026 Philipp Heller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Benchmark listing mapping specs: YAML parsing vs. the spec registry's caches.
+
+Usage: python benchmarks/bench_specs.py [--specs N] [--repeat N]
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import common  # noqa: F401  (sets up sys.path)
+
+from common import SWISSCARD_SPEC
+from importers import registry
+
+
+def timed_listing(base_path: str, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        registry.list_specs(base_path)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--specs", type=int, default=80)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base_path = os.path.join(tmp, "importers")
+        for i in range(args.specs):
+            os.makedirs(os.path.join(base_path, f"bank{i}"))
+            shutil.copy(SWISSCARD_SPEC, os.path.join(base_path, f"bank{i}", "spec.yaml"))
+        registry.CACHE_PATH = os.path.join(tmp, "cache", "specs.json")
+
+        timings = []
+        for _ in range(args.repeat):
+            if os.path.exists(registry.CACHE_PATH):
+                os.remove(registry.CACHE_PATH)
+            registry.clear()
+            timings.append(timed_listing(base_path, 1))
+        no_cache = min(timings)
+
+        timings = []
+        for _ in range(args.repeat):
+            registry.clear()
+            timings.append(timed_listing(base_path, 1))
+        disk_cache = min(timings)
+
+        in_memory = timed_listing(base_path, args.repeat)
+
+    print(f"{args.specs} specs")
+    print(f"{'cold, no cache (YAML parse)':<32} {no_cache * 1000:8.1f} ms")
+    print(f"{'cold, disk cache':<32} {disk_cache * 1000:8.1f} ms")
+    print(f"{'warm, in memory':<32} {in_memory * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
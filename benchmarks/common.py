@@ -0,0 +1,182 @@
+# FinView — terminal-based personal finance manager
+# Copyright (C) 2026 Philipp Heller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Shared helpers for the benchmark scripts.
+
+The benchmarks are plain scripts (``python benchmarks/bench_parse.py``); this
+module puts the project root on ``sys.path`` and generates synthetic input.
+"""
+
+import csv
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.realpath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+SWISSCARD_SPEC = os.path.join(ROOT, "importers", "Swisscard", "swisscard.yaml")
+
+_MERCHANTS = ["COOP", "Migros", "SBB", "Digitec", "Starbucks", "Amazon", "Shell", "Manor"]
+_CITIES = ["Zurich", "Bern", "Basel", "Geneva", "Lausanne", ""]
+_CURRENCIES = ["CHF", "CHF", "CHF", "EUR", "USD"]
+
+
+def swisscard_rows(count: int, seed: int = 42):
+    """Yield ``count`` Swisscard-shaped CSV rows (without the header)."""
+    rng = random.Random(seed)
+    day = date(2025, 1, 1)
+    for i in range(count):
+        if i and i % 40 == 0:
+            day += timedelta(days=1)
+        merchant = rng.choice(_MERCHANTS)
+        city = rng.choice(_CITIES)
+        amount = f"{rng.uniform(1, 500):.2f}"
+        orig_currency = rng.choice(_CURRENCIES)
+        foreign = orig_currency != "CHF"
+        yield [
+            day.strftime("%d.%m.%Y"),
+            merchant,
+            f"{merchant} {city}".strip() if city else "",
+            "",
+            "CHF",
+            amount,
+            orig_currency if foreign else "",
+            f"{float(amount) * 0.95:.2f}" if foreign else "",
+        ]
+
+
+def write_swisscard_csv(path: str, count: int, seed: int = 42) -> str:
+    """Write a synthetic Swisscard export with ``count`` data rows to ``path``."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            ["Date", "Merchant", "Detail", "", "Currency", "Amount", "OrigCurrency", "OrigAmount"]
+        )
+        writer.writerows(swisscard_rows(count, seed))
+    return path
+
+
+def populate_ledger(
+    session,
+    accounts: int = 4,
+    transactions: int = 200_000,
+    merge_groups: int = 0,
+    split_groups: int = 0,
+    cross_account_share: float = 0.2,
+    seed: int = 42,
+) -> list[int]:
+    """Fill an empty database with a synthetic ledger and return the account ids.
+
+    Transactions are spread round-robin over the accounts, one every couple of
+    hours. merge_groups groups of two or three existing transactions get a merge
+    parent (cross_account_share of them spanning two accounts), and split_groups
+    transactions are split into two children. Rows go in through Core inserts so
+    that building a few hundred thousand rows takes seconds.
+    """
+    from sqlalchemy import bindparam, insert, update
+
+    from models.finance import Account, Currency, Transaction
+
+    rng = random.Random(seed)
+    account_objs = [Account(name=f"Account {i}", currency=Currency.CHF) for i in range(accounts)]
+    session.add_all(account_objs)
+    session.flush()
+    account_ids = [a.id for a in account_objs]
+
+    table = Transaction.__table__
+    start = datetime(2020, 1, 1)
+    rows = []
+    for i in range(1, transactions + 1):
+        value = round(rng.uniform(-300, 100), 2)
+        rows.append({
+            "id": i,
+            "account_id": account_ids[i % accounts],
+            "description": f"{rng.choice(_MERCHANTS)} {rng.choice(_CITIES)}".strip(),
+            "original_value": value,
+            "original_currency": Currency.CHF,
+            "value_in_account_currency": value,
+            "date": start + timedelta(hours=2 * i),
+        })
+    for i in range(0, len(rows), 10_000):
+        session.execute(insert(table), rows[i:i + 10_000])
+
+    next_id = transactions + 1
+    used = set()
+    parents, children = [], []
+    while len(parents) < merge_groups:
+        first = rng.randrange(1, transactions - 2 * accounts)
+        if rng.random() < cross_account_share:
+            ids = [first, first + 1]
+        else:
+            ids = [first + k * accounts for k in range(rng.choice((2, 3)))]
+        if used.intersection(ids):
+            continue
+        used.update(ids)
+        members = [rows[i - 1] for i in ids]
+        net = round(sum(m["value_in_account_currency"] for m in members), 2)
+        parents.append({
+            "id": next_id,
+            "account_id": members[0]["account_id"],
+            "description": f"Merge {len(parents)}",
+            "original_value": net,
+            "original_currency": Currency.CHF,
+            "value_in_account_currency": net,
+            "date": min(m["date"] for m in members),
+        })
+        children.extend({"child_id": i, "parent_id": next_id} for i in ids)
+        next_id += 1
+
+    split_children = []
+    while len(split_children) < 2 * split_groups:
+        parent_id = rng.randrange(1, transactions + 1)
+        if parent_id in used:
+            continue
+        used.add(parent_id)
+        parent = rows[parent_id - 1]
+        half = round(parent["value_in_account_currency"] / 2, 2)
+        for value in (half, round(parent["value_in_account_currency"] - half, 2)):
+            split_children.append({
+                **parent, "id": next_id, "split_parent_id": parent_id,
+                "original_value": value, "value_in_account_currency": value,
+            })
+            next_id += 1
+
+    if parents:
+        session.execute(insert(table), parents)
+        session.execute(
+            update(table).where(table.c.id == bindparam("child_id"))
+            .values(merge_parent_id=bindparam("parent_id")),
+            children,
+        )
+    if split_children:
+        session.execute(insert(table), split_children)
+    session.commit()
+    return account_ids
+
+
+def timed(fn, *args, **kwargs):
+    """Run ``fn`` once and return ``(result, elapsed_seconds)``."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def report(label: str, rows: int, seconds: float):
+    print(f"{label:<32} {rows:>9} rows  {seconds:8.3f}s  {rows / seconds:>12,.0f} rows/sec")
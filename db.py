@@ -16,8 +16,9 @@
 
 import os
 import sqlite3
+import threading
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
@@ -29,10 +30,44 @@ SessionLocal = None
 _dirty = False
 db_file_path = None
 
+# Incremental saves: TEMP triggers on the in-memory connection record the id of
+# every row inserted, updated or deleted since the last load or save. When the
+# next save goes to the same, unchanged file, only those rows are written.
+# _change_log_base is the (path, mtime_ns, size) of the file the log is relative to.
+_change_log_base = None
+
+# Direct mode (open_db_direct) works on the file itself instead of an in-memory copy
+_direct = False
+
+# Newest revision in alembic/versions, so startup need not load the migration
+# scripts to find it. Must stay in sync with alembic/versions (checked by tests).
+ALEMBIC_HEAD = "8a3f6c1e2b94"
+
+# Autosave: a snapshot of the in-memory DB next to the database file, written in the
+# background (see prepare_autosave) and offered for recovery on the next start.
+AUTOSAVE_SUFFIX = ".autosave"
+# Pages copied per backup step; the connection is free for the UI between steps
+AUTOSAVE_PAGES = 1024
+# sqlite3 total_changes at the last save or autosave, and a count of saves so an
+# autosave that finishes after a save does not replace it with an older snapshot
+_autosaved_changes = None
+_save_count = 0
+_autosave_lock = threading.Lock()
+
+# Page cache and memory map for direct mode: reads come straight from the mapped
+# file, and the cache caps how much of it is held in RAM (negative = KiB)
+DIRECT_MMAP_SIZE = 256 * 1024 * 1024
+DIRECT_CACHE_SIZE = -64 * 1024
+
+# Generation of the data, for caches of query results (see generation()). Bumped by
+# mark_dirty(), whenever another database is opened and whenever changes are rolled
+# back; changes written since show in the connection's total_changes.
+_generation = 0
+
 
 def _create_memory_engine():
     """Create an in-memory SQLite engine with StaticPool so all connections share one DB."""
-    global engine, SessionLocal
+    global engine, SessionLocal, _change_log_base, _direct, _autosaved_changes
     engine = create_engine(
         "sqlite://",
         connect_args={"check_same_thread": False},
@@ -40,17 +75,136 @@ def _create_memory_engine():
         echo=False,
     )
     SessionLocal = sessionmaker(bind=engine)
+    _track_generation(engine)
+    _change_log_base = None
+    _direct = False
+    _autosaved_changes = None
+
+
+def _bump_generation(*_args):
+    global _generation
+    _generation += 1
+
+
+def _track_generation(engine):
+    """Start a new generation for engine and bump it whenever it rolls back changes."""
+    _bump_generation()
+    # A rollback undoes changes without lowering total_changes; "reset" is the
+    # pool's rollback when a connection is handed back
+    for name in ("rollback", "rollback_savepoint", "reset"):
+        event.listen(engine, name, _bump_generation)
+
+
+def generation(session) -> tuple[int, int]:
+    """Return the generation of the data as seen by session.
+
+    It increases whenever anything may have changed: every insert, update or
+    delete counts, whether marked dirty yet or not, so results cached for one
+    generation are valid until it changes.
+    """
+    return _generation, session.connection().connection.driver_connection.total_changes
+
+
+class _UnsavedChangesConnection(sqlite3.Connection):
+    """sqlite3 connection that keeps every change in one open transaction until save().
+
+    Sessions commit and roll back as usual, but commit() only closes a unit of work
+    inside that transaction (a savepoint), so nothing reaches the file before save()
+    and closing the connection without it discards all changes, like :q! does with
+    the in-memory copy. Opened with isolation_level=None, so the driver never
+    begins or commits on its own.
+    """
+
+    def begin_unsaved(self):
+        """Open the transaction unless it is open already."""
+        if not self.in_transaction:
+            self.execute("BEGIN")
+            self.execute("SAVEPOINT unit")
+
+    def commit(self):
+        if not self.in_transaction:  # not begun yet, or SQLite aborted it on an error
+            self.begin_unsaved()
+            return
+        self.execute("RELEASE unit")
+        self.execute("SAVEPOINT unit")
+
+    def rollback(self):
+        if not self.in_transaction:
+            self.begin_unsaved()
+            return
+        self.execute("ROLLBACK TO unit")
+
+    def save(self):
+        """Write all changes made since the last save to the file."""
+        if self.in_transaction:
+            self.execute("COMMIT")
+        self.begin_unsaved()
+
+
+def _configure_direct_connection(dbapi_connection, connection_record):
+    dbapi_connection.execute(f"PRAGMA mmap_size = {DIRECT_MMAP_SIZE}")
+    dbapi_connection.execute(f"PRAGMA cache_size = {DIRECT_CACHE_SIZE}")
+    dbapi_connection.begin_unsaved()
+
+
+def open_db_direct(path: str):
+    """Work on the SQLite file at path directly instead of copying it into memory.
+
+    Startup does not read the whole file and memory stays bounded by the page
+    cache. Changes are held in an open transaction until save_to_file(); a new
+    file gets its tables right away.
+    """
+    global engine, SessionLocal, db_file_path, _change_log_base, _direct
+    db_file_path = os.path.abspath(path)
+    is_new = not os.path.exists(db_file_path)
+    engine = create_engine(
+        f"sqlite:///{db_file_path}",
+        connect_args={
+            "check_same_thread": False,
+            "factory": _UnsavedChangesConnection,
+            "isolation_level": None,
+        },
+        poolclass=StaticPool,
+        echo=False,
+    )
+    event.listen(engine, "connect", _configure_direct_connection)
+    _track_generation(engine)
+    SessionLocal = sessionmaker(bind=engine)
+    _change_log_base = None
+    _direct = True
+
+    if is_new:
+        Base.metadata.create_all(engine)
+        _stamp_alembic_head()
+        _save_direct()
+
+
+def _save_direct():
+    conn = engine.raw_connection()
+    try:
+        conn.driver_connection.save()
+    finally:
+        conn.close()
+
+
+def is_direct() -> bool:
+    return _direct
 
 
 def _stamp_alembic_head():
-    """Stamp the in-memory DB with the current alembic head revision."""
-    from alembic.config import Config
-    from alembic import command
+    """Stamp the in-memory DB with the current alembic head revision.
 
-    alembic_cfg = Config("alembic.ini")
+    Writes the same alembic_version table as `alembic stamp head` without
+    loading alembic or its migration scripts.
+    """
     with engine.connect() as conn:
-        alembic_cfg.attributes["connection"] = conn
-        command.stamp(alembic_cfg, "head")
+        conn.exec_driver_sql(
+            "CREATE TABLE IF NOT EXISTS alembic_version ("
+            "version_num VARCHAR(32) NOT NULL, "
+            "CONSTRAINT alembic_version_pkc PRIMARY KEY (version_num))"
+        )
+        conn.exec_driver_sql("DELETE FROM alembic_version")
+        conn.exec_driver_sql("INSERT INTO alembic_version (version_num) VALUES (?)", (ALEMBIC_HEAD,))
         conn.commit()
 
 
@@ -79,6 +233,8 @@ def load_db_from_file(path: str):
     mem_conn = engine.raw_connection()
     file_conn.backup(mem_conn.driver_connection)
     file_conn.close()
+    _start_change_log(db_file_path)
+    _autosave_done()
 
 
 def init_new_db(path: str):
@@ -86,15 +242,109 @@ def init_new_db(path: str):
     _init_fresh_db(path)
 
 
-def save_to_file(path: str | None = None):
-    """Save the in-memory DB to disk using sqlite3.backup() + atomic swap."""
-    global db_file_path, _dirty
+def _logged_tables():
+    """Tables whose row changes are recorded for incremental saves (those keyed by id)."""
+    return [
+        table for table in Base.metadata.sorted_tables
+        if [column.name for column in table.primary_key] == ["id"]
+    ]
 
-    target = path or db_file_path
-    if target is None:
-        raise ValueError("No file path specified")
 
-    target = os.path.abspath(target)
+def _file_state(path: str):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+
+def _start_change_log(path: str):
+    """Record row changes from now on, relative to the file at path as it is now."""
+    global _change_log_base
+    conn = engine.raw_connection()
+    try:
+        script = [
+            "CREATE TEMP TABLE IF NOT EXISTS changed_rows ("
+            "table_name TEXT NOT NULL, row_id INTEGER NOT NULL, "
+            "PRIMARY KEY (table_name, row_id)) WITHOUT ROWID",
+            "DELETE FROM temp.changed_rows",
+        ]
+        for table in _logged_tables():
+            for op, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+                script.append(
+                    f"CREATE TEMP TRIGGER IF NOT EXISTS log_{table.name}_{op.lower()} "
+                    f"AFTER {op} ON main.{table.name} BEGIN "
+                    f"INSERT OR IGNORE INTO changed_rows VALUES ('{table.name}', {row}.id); END"
+                )
+        for statement in script:
+            conn.driver_connection.execute(statement)
+        conn.driver_connection.commit()
+    finally:
+        conn.close()
+    _change_log_base = _file_state(path)
+
+
+def _write_changes(target: str):
+    """Write the logged rows into target in one transaction.
+
+    Rows that no longer exist in memory are deleted from the file; the others
+    replace their copy in the file. The file's own triggers are dropped for the
+    duration, since the rows already carry the values those triggers derive, and
+    recreated before the commit; only the search index triggers keep running, as
+    the index is not logged and must follow the replayed rows. The file's journal
+    keeps all of it atomic: a crash leaves the file as it was before the save.
+    """
+    from models.finance import SEARCH_INDEX_TRIGGER_PREFIX
+
+    mem_conn = engine.raw_connection()
+    try:
+        mem = mem_conn.driver_connection
+        if mem.execute("SELECT 1 FROM temp.changed_rows LIMIT 1").fetchone() is None:
+            return
+        file_conn = sqlite3.connect(target, isolation_level=None)
+        try:
+            file_conn.execute("BEGIN IMMEDIATE")
+            triggers = [
+                (name, sql) for name, sql in file_conn.execute(
+                    "SELECT name, sql FROM sqlite_master WHERE type = 'trigger'"
+                ) if not name.startswith(SEARCH_INDEX_TRIGGER_PREFIX)
+            ]
+            for name, _ in triggers:
+                file_conn.execute(f'DROP TRIGGER "{name}"')
+            for table in _logged_tables():
+                ids = [
+                    (row_id,) for (row_id,) in mem.execute(
+                        "SELECT row_id FROM temp.changed_rows WHERE table_name = ?", (table.name,)
+                    )
+                ]
+                if not ids:
+                    continue
+                file_conn.executemany(f"DELETE FROM {table.name} WHERE id = ?", ids)
+                columns = ", ".join(column.name for column in table.columns)
+                placeholders = ", ".join("?" for _ in table.columns)
+                rows = mem.execute(
+                    f"SELECT {columns} FROM main.{table.name} "
+                    f"WHERE id IN (SELECT row_id FROM temp.changed_rows WHERE table_name = ?)",
+                    (table.name,),
+                )
+                file_conn.executemany(
+                    f"INSERT INTO {table.name} ({columns}) VALUES ({placeholders})", rows
+                )
+            for _, sql in triggers:
+                file_conn.execute(sql)
+            file_conn.execute("COMMIT")
+        except Exception:
+            if file_conn.in_transaction:
+                file_conn.execute("ROLLBACK")
+            raise
+        finally:
+            file_conn.close()
+    finally:
+        mem_conn.close()
+
+
+def _backup_to_file(target: str):
+    """Write the whole in-memory DB to target using sqlite3.backup() + atomic swap."""
     swp_path = target + ".swp"
 
     mem_conn = engine.raw_connection()
@@ -111,13 +361,137 @@ def save_to_file(path: str | None = None):
     finally:
         mem_conn.close()
 
+
+def save_to_file(path: str | None = None):
+    """Save the in-memory DB to disk.
+
+    Saving again to the file that was last loaded or saved writes only the rows
+    changed since then. Any other target, a file changed on disk in the meantime,
+    or a schema migration falls back to a full backup. In direct mode the open
+    transaction is committed to the file instead.
+    """
+    global db_file_path, _dirty
+
+    target = path or db_file_path
+    if target is None:
+        raise ValueError("No file path specified")
+
+    target = os.path.abspath(target)
+    if _direct:
+        if target != db_file_path:
+            raise ValueError(
+                f"{os.path.basename(db_file_path)} is opened directly; "
+                "changes can only be saved to it (use :w without a file name)"
+            )
+        _save_direct()
+        _dirty = False
+        return
+    if _change_log_base is not None and _change_log_base == _file_state(target):
+        _write_changes(target)
+    else:
+        _backup_to_file(target)
+    _start_change_log(target)
+    with _autosave_lock:
+        _autosave_done()
+        for saved in {db_file_path, target} - {None}:
+            discard_autosave(saved)
     db_file_path = target
     _dirty = False
 
 
+def autosave_path(path: str) -> str:
+    return path + AUTOSAVE_SUFFIX
+
+
+def _sqlite_connection() -> sqlite3.Connection:
+    """The in-memory DB's sqlite3 connection itself, usable outside the pool."""
+    conn = engine.raw_connection()
+    try:
+        return conn.driver_connection
+    finally:
+        conn.close()
+
+
+def _autosave_done():
+    global _autosaved_changes, _save_count
+    _autosaved_changes = _sqlite_connection().total_changes
+    _save_count += 1
+
+
+def prepare_autosave():
+    """Return a function that writes an autosave snapshot, or None if none is due.
+
+    An autosave is due when the in-memory DB has a file path, is dirty and has
+    changed since the last save or autosave. Call this on the thread that owns the
+    sessions; the returned function touches only the sqlite3 connection and is
+    meant to run in a background thread. It copies the DB AUTOSAVE_PAGES pages at
+    a time with sqlite3's backup(), so the connection is never held for long; a
+    step waits while a write transaction is open, and changes made between steps
+    are carried into the copy, so the snapshot is consistent. It is written to a
+    temporary file and renamed over the previous autosave.
+    """
+    if _direct or db_file_path is None or not _dirty:
+        return None
+    source = _sqlite_connection()
+    changes = source.total_changes
+    if changes == _autosaved_changes:
+        return None
+    target = autosave_path(db_file_path)
+    save_count = _save_count
+
+    def write_autosave():
+        global _autosaved_changes
+        tmp_path = target + ".tmp"
+        try:
+            tmp_conn = sqlite3.connect(tmp_path)
+            try:
+                source.backup(tmp_conn, pages=AUTOSAVE_PAGES)
+            finally:
+                tmp_conn.close()
+            with _autosave_lock:
+                if save_count != _save_count:
+                    # Saved meanwhile; the file on disk is newer than this snapshot
+                    os.remove(tmp_path)
+                    return
+                os.replace(tmp_path, target)
+                _autosaved_changes = changes
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    return write_autosave
+
+
+def discard_autosave(path: str | None = None):
+    """Delete the autosave of path (default: the current file), if there is one."""
+    path = path or db_file_path
+    if path and os.path.exists(autosave_path(path)):
+        os.remove(autosave_path(path))
+
+
+def newer_autosave(path: str) -> str | None:
+    """Return the autosave of path if it is newer than the file itself."""
+    recovery = autosave_path(path)
+    if not os.path.exists(recovery):
+        return None
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(recovery):
+        return None
+    return recovery
+
+
+def recover_autosave(path: str):
+    """Load the autosave of path into memory; it stays unsaved until the next :w."""
+    global db_file_path
+    load_db_from_file(autosave_path(path))
+    db_file_path = os.path.abspath(path)
+    mark_dirty()
+
+
 def mark_dirty():
     global _dirty
     _dirty = True
+    _bump_generation()
 
 
 def is_dirty():
@@ -131,26 +505,28 @@ def clear_dirty():
 
 def has_pending_migrations() -> bool:
     """Check if the loaded DB has unapplied alembic migrations."""
-    from alembic.config import Config
-    from alembic.script import ScriptDirectory
-    from alembic.migration import MigrationContext
-
-    alembic_cfg = Config("alembic.ini")
-    script = ScriptDirectory.from_config(alembic_cfg)
-    head = script.get_current_head()
-
     with engine.connect() as conn:
-        ctx = MigrationContext.configure(conn)
-        current = ctx.get_current_revision()
+        has_version_table = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'alembic_version'"
+        ).first()
+        current = has_version_table and conn.exec_driver_sql(
+            "SELECT version_num FROM alembic_version"
+        ).scalar()
 
-    return current != head
+    return current != ALEMBIC_HEAD
 
 
 def run_migrations():
-    """Apply pending alembic migrations to the in-memory DB."""
+    """Apply pending alembic migrations to the in-memory DB.
+
+    The next save is a full backup, since migrations change more than rows.
+    """
+    global _change_log_base
     from alembic.config import Config
     from alembic import command
 
+    _change_log_base = None
+
     alembic_cfg = Config("alembic.ini")
     with engine.connect() as conn:
         alembic_cfg.attributes["connection"] = conn
@@ -14,9 +14,12 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import re
+from datetime import datetime
+from functools import lru_cache
+
 import yaml
-import cel
-from .schema import ImporterMapping
+from .schema import FieldSpec, ImporterMapping, NumberFormat
 
 
 def _double(val):
@@ -29,23 +32,131 @@ def _split(s, d):
     return s.split(d)
 
 
+@lru_cache(maxsize=4096)
+def _date(val, fmt):
+    # Exports have many rows per day, so the same strings come up over and over
+    return datetime.strptime(val, fmt)
+
+
+# Trivial CEL expressions that are translated to a FieldSpec instead of being interpreted
+_FAST_PATHS = [
+    (re.compile(r"row\[(\d+)\]"), lambda m: FieldSpec(column=int(m[1]))),
+    (re.compile(r"'([^'\\]*)'|\"([^\"\\]*)\""), lambda m: FieldSpec(constant=m[1] if m[1] is not None else m[2])),
+    (re.compile(r"double\(row\[(\d+)\]\)"), lambda m: FieldSpec(column=int(m[1]), number=True)),
+    (
+        re.compile(r"double\(row\[(\d+)\]\)\s*\*\s*-1\.0|-\s*double\(row\[(\d+)\]\)"),
+        lambda m: FieldSpec(column=int(m[1] or m[2]), number=True, negate=True),
+    ),
+    (
+        re.compile(r"date\(row\[(\d+)\],\s*(?:'([^'\\]*)'|\"([^\"\\]*)\")\)"),
+        lambda m: FieldSpec(column=int(m[1]), date_format=m[2] if m[2] is not None else m[3]),
+    ),
+]
+
+
+def _fast_path_spec(expr: str) -> FieldSpec | None:
+    """Return the FieldSpec equivalent of a trivial CEL expression, or None."""
+    for pattern, to_spec in _FAST_PATHS:
+        m = pattern.fullmatch(expr.strip())
+        if m:
+            return to_spec(m)
+    return None
+
+
+def _number_parser(fmt: bool | NumberFormat):
+    if fmt is True:
+        return _double
+
+    def parse(val):
+        val = val.strip()
+        if not val:
+            return 0.0
+        if fmt.thousands:
+            val = val.replace(fmt.thousands, "")
+        return float(val.replace(fmt.decimal, "."))
+
+    return parse
+
+
+def _native_field(spec: FieldSpec):
+    """Build a plain Python callable mapping a row to the value described by spec."""
+    if spec.constant is not None:
+        constant = spec.constant
+        return lambda row: constant
+
+    column, fallback = spec.column, spec.fallback_column
+    if fallback is None:
+        get = lambda row: row[column]
+    else:
+        get = lambda row: row[column] if row[column] != "" else row[fallback]
+
+    if spec.number:
+        parse = _number_parser(spec.number)
+        if spec.negate:
+            return lambda row: parse(get(row)) * -1.0
+        return lambda row: parse(get(row))
+
+    if spec.date_format:
+        date_format = spec.date_format
+        return lambda row: _date(get(row), date_format)
+
+    return get
+
+
 class CSVImporter:
     def __init__(self, yaml_path: str):
         with open(yaml_path, 'r') as f:
             raw_config = yaml.safe_load(f)
             self.config = ImporterMapping(**raw_config)
+        self._programs = self._compile_mappings()
 
-    def parse_row(self, row: list[str]) -> dict:
-        context = {
+    @classmethod
+    def from_config(cls, config: ImporterMapping) -> "CSVImporter":
+        """Build an importer from an already validated config, without reading a file."""
+        importer = cls.__new__(cls)
+        importer.config = config
+        importer._programs = importer._compile_mappings()
+        return importer
+
+    def _compile_mappings(self) -> dict:
+        """Turn every mapping into a callable taking the row, compiled once at load.
+
+        Declarative fields and trivial CEL expressions (plain column references,
+        constants, double(row[N]) with optional negation) become native Python
+        callables; everything else is compiled to a CEL program.
+        """
+        programs = {}
+        for field in type(self.config.mappings).model_fields:
+            mapping = getattr(self.config.mappings, field)
+            if isinstance(mapping, str):
+                mapping = _fast_path_spec(mapping) or mapping
+            if isinstance(mapping, FieldSpec):
+                programs[field] = _native_field(mapping)
+                continue
+            # Imported here: loading the CEL interpreter is slow and only specs with
+            # non-trivial expressions need it
+            import cel
+
+            try:
+                programs[field] = self._cel_field(cel.compile(mapping))
+            except Exception as e:
+                raise ValueError(f"Error compiling field '{field}': {e}")
+        return programs
+
+    @staticmethod
+    def _cel_field(program):
+        return lambda row: program.execute({
             "row": row,
             "double": _double,
             "split": _split,
-        }
+            "date": _date,
+        })
 
+    def parse_row(self, row: list[str]) -> dict:
         results = {}
-        for field, expr_str in self.config.mappings.model_dump().items():
+        for field, program in self._programs.items():
             try:
-                results[field] = cel.evaluate(expr_str, context)
+                results[field] = program(row)
             except Exception as e:
                 raise ValueError(f"Error evaluating field '{field}': {e}")
 
@@ -0,0 +1,186 @@
+# FinView — terminal-based personal finance manager
+# Copyright (C) 2026 Philipp Heller
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""Central registry of mapping specs.
+
+Every spec is read and validated once and then served from memory until its file
+changes (by mtime and size). Validated configs are also persisted to a JSON cache
+file, so a cold start doesn't need to YAML-parse every spec again. Compiled
+importers hold native CEL programs that can't be serialized; they are built on
+first use and kept in memory only.
+"""
+
+import json
+import os
+import threading
+from dataclasses import dataclass
+
+import yaml
+from pydantic import ValidationError
+
+from .engine import CSVImporter
+from .schema import ImporterMapping
+
+SPECS_DIR = "./importers"
+
+# Set to None to disable the on-disk cache
+CACHE_PATH: str | None = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "finview", "specs.json"
+)
+
+# Bump when the cached config format changes
+_CACHE_VERSION = 1
+
+
+@dataclass
+class _Entry:
+    mtime_ns: int
+    size: int
+    mapping: ImporterMapping | None  # None: the file isn't a valid spec
+    error: str | None = None
+    importer: CSVImporter | None = None
+
+
+_entries: dict[str, _Entry] = {}
+_lock = threading.RLock()
+_disk_loaded = False
+_disk_dirty = False
+
+
+def clear():
+    """Forget all in-memory entries; the disk cache is read again on next use."""
+    global _disk_loaded, _disk_dirty
+    with _lock:
+        _entries.clear()
+        _disk_loaded = False
+        _disk_dirty = False
+
+
+def get_mapping(path: str) -> ImporterMapping:
+    """Return the validated config of the spec at path.
+
+    Raises FileNotFoundError if the file doesn't exist, ValueError if it isn't a
+    valid spec.
+    """
+    entry = _get_entry(path)
+    _save_disk_cache()
+    if entry.mapping is None:
+        raise ValueError(f"Invalid mapping spec {path}: {entry.error}")
+    return entry.mapping
+
+
+def get_importer(path: str) -> CSVImporter:
+    """Return a compiled importer for the spec at path, reused until the file changes."""
+    mapping = get_mapping(path)
+    with _lock:
+        entry = _entries[os.path.abspath(path)]
+        if entry.importer is None or entry.importer.config is not mapping:
+            entry.importer = CSVImporter.from_config(mapping)
+        return entry.importer
+
+
+def list_specs(base_path: str = SPECS_DIR) -> list[tuple[str, ImporterMapping]]:
+    """Return (path relative to base_path, config) for every valid spec below base_path."""
+    specs = []
+    if not os.path.exists(base_path):
+        return specs
+
+    for root, _, files in os.walk(base_path):
+        for f in files:
+            if f.endswith((".yaml", ".yml")):
+                full_path = os.path.join(root, f)
+                try:
+                    entry = _get_entry(full_path)
+                except OSError:
+                    continue
+                if entry.mapping is not None:
+                    specs.append((os.path.relpath(full_path, base_path), entry.mapping))
+    _save_disk_cache()
+    return specs
+
+
+def _get_entry(path: str) -> _Entry:
+    global _disk_dirty
+    key = os.path.abspath(path)
+    st = os.stat(key)
+    with _lock:
+        _load_disk_cache()
+        entry = _entries.get(key)
+        if entry is None or entry.mtime_ns != st.st_mtime_ns or entry.size != st.st_size:
+            entry = _load_spec(key, st)
+            _entries[key] = entry
+            _disk_dirty = True
+        return entry
+
+
+def _load_spec(path: str, st: os.stat_result) -> _Entry:
+    with open(path, "r") as f:
+        try:
+            raw_config = yaml.safe_load(f)
+            return _Entry(st.st_mtime_ns, st.st_size, ImporterMapping(**raw_config))
+        except (yaml.YAMLError, ValidationError, TypeError) as e:
+            return _Entry(st.st_mtime_ns, st.st_size, None, str(e))
+
+
+def _load_disk_cache():
+    """Seed the in-memory entries from the cache file, once. Must hold _lock."""
+    global _disk_loaded
+    if _disk_loaded:
+        return
+    _disk_loaded = True
+    if not CACHE_PATH:
+        return
+
+    try:
+        with open(CACHE_PATH, "r") as f:
+            data = json.load(f)
+        if data.get("version") != _CACHE_VERSION:
+            return
+        for path, cached in data["specs"].items():
+            config = cached["config"]
+            mapping = ImporterMapping.model_validate(config) if config is not None else None
+            _entries.setdefault(
+                path, _Entry(cached["mtime_ns"], cached["size"], mapping, cached.get("error"))
+            )
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        # The cache is only an optimization; a broken one is rebuilt from the specs
+        return
+
+
+def _save_disk_cache():
+    global _disk_dirty
+    with _lock:
+        if not _disk_dirty or not CACHE_PATH:
+            return
+        specs = {
+            path: {
+                "mtime_ns": e.mtime_ns,
+                "size": e.size,
+                "config": e.mapping.model_dump(mode="json") if e.mapping is not None else None,
+                "error": e.error,
+            }
+            for path, e in _entries.items()
+            if os.path.exists(path)
+        }
+        try:
+            os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+            tmp_path = f"{CACHE_PATH}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"version": _CACHE_VERSION, "specs": specs}, f)
+            os.replace(tmp_path, CACHE_PATH)
+        except OSError:
+            return
+        _disk_dirty = False
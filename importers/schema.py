@@ -14,18 +14,51 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, model_validator
 
 class ParserConfig(BaseModel):
     delimiter: str
     skip_rows: int
 
+class NumberFormat(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    decimal: str = "."
+    thousands: str = ""
+
+class FieldSpec(BaseModel):
+    """Declarative alternative to a CEL expression for simple fields.
+
+    Takes the value of `column` (or of `fallback_column` when that cell is empty),
+    or a fixed `constant`, and optionally parses it as a number or a date.
+    """
+    model_config = ConfigDict(extra="forbid")
+
+    column: int | None = None
+    fallback_column: int | None = None
+    constant: str | None = None
+    number: bool | NumberFormat = False
+    negate: bool = False
+    date_format: str | None = None
+
+    @model_validator(mode="after")
+    def _check_combination(self):
+        if (self.column is None) == (self.constant is None):
+            raise ValueError("exactly one of 'column' or 'constant' is required")
+        if self.constant is not None and (self.fallback_column is not None or self.number or self.date_format):
+            raise ValueError("'constant' can't be combined with other options")
+        if self.number and self.date_format:
+            raise ValueError("'number' and 'date_format' are mutually exclusive")
+        if self.negate and not self.number:
+            raise ValueError("'negate' requires 'number'")
+        return self
+
 class DataMapping(BaseModel):
-    timestamp: str
-    description: str
-    amount_original: str
-    currency_original: str
-    amount_in_account_currency: str
+    timestamp: str | FieldSpec
+    description: str | FieldSpec
+    amount_original: str | FieldSpec
+    currency_original: str | FieldSpec
+    amount_in_account_currency: str | FieldSpec
 
 class ImporterMapping(BaseModel):
     model_config = ConfigDict(coerce_numbers_to_str=True)
@@ -17,9 +17,7 @@
 import argparse
 import os
 import sys
-
-from db import init_memory_db, load_db_from_file, init_new_db, has_pending_migrations, run_migrations
-from ui.app import FinViewApp
+from datetime import datetime
 
 _COPYRIGHT = "FinView Copyright (C) 2026 Philipp Heller"
 
@@ -47,6 +45,19 @@ This is free software, and you are welcome to redistribute it
 under certain conditions; see LICENSE.md for details."""
 
 
+def _ask_to_recover(db_path: str) -> bool:
+    """Offer to restore unsaved changes from an autosave newer than db_path."""
+    from db import newer_autosave
+
+    recovery = newer_autosave(db_path)
+    if recovery is None:
+        return False
+    saved_at = datetime.fromtimestamp(os.path.getmtime(recovery)).strftime("%Y-%m-%d %H:%M")
+    print(f"Found unsaved changes to '{os.path.basename(db_path)}' autosaved at {saved_at}.")
+    answer = input("Recover them? [y/N] ").strip().lower()
+    return answer in ("y", "yes")
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="FinView — a terminal-based personal finance manager. "
@@ -62,6 +73,12 @@ def main():
         help="path to the SQLite database file (e.g. ~/finances.db). "
         "If omitted, starts with a pure in-memory database.",
     )
+    parser.add_argument(
+        "--direct",
+        action="store_true",
+        help="work on the database file directly instead of loading it into memory; "
+        "starts instantly for large files, changes are still only written on :w",
+    )
     parser.add_argument(
         "--version",
         action="version",
@@ -79,12 +96,29 @@ def main():
         print(_LICENSE_NOTICE)
         sys.exit(0)
 
+    # Imported only now so --help, --version and --license need not load
+    # SQLAlchemy, the models and Textual
+    from db import (
+        init_memory_db, load_db_from_file, init_new_db, open_db_direct, has_pending_migrations,
+        run_migrations, recover_autosave,
+    )
+    from ui.app import FinViewApp
+
     if args.database is None:
+        if args.direct:
+            parser.error("--direct needs a database file")
         init_memory_db()
     else:
         db_path = os.path.abspath(os.path.expanduser(args.database))
-        if os.path.exists(db_path):
-            load_db_from_file(db_path)
+        if _ask_to_recover(db_path):
+            recover_autosave(db_path)
+            if has_pending_migrations():
+                run_migrations()
+        elif os.path.exists(db_path):
+            if args.direct:
+                open_db_direct(db_path)
+            else:
+                load_db_from_file(db_path)
             if has_pending_migrations():
                 db_name = os.path.basename(db_path)
                 print(f"Database '{db_name}' was created by an older version of FinView.")
@@ -95,6 +129,8 @@ def main():
                 else:
                     print("Cannot open database without upgrading. Exiting.")
                     sys.exit(0)
+        elif args.direct:
+            open_db_direct(db_path)
         else:
             init_new_db(db_path)
 
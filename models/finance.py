@@ -17,7 +17,7 @@
 import enum
 from datetime import datetime
 from decimal import Decimal
-from sqlalchemy import String, ForeignKey, Numeric, Enum as SqlEnum, DateTime
+from sqlalchemy import DDL, String, ForeignKey, Numeric, Enum as SqlEnum, DateTime, Index, event, false
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from typing import List
 from .base import Base
@@ -34,6 +34,9 @@ class Account(Base):
     name: Mapped[str] = mapped_column(String(50), unique=True)
     currency: Mapped[Currency] = mapped_column(SqlEnum(Currency, native_enum=False))
     mapping_spec: Mapped[str | None] = mapped_column(String(255))
+    # Sum of the account's transactions in cents, excluding merge parents.
+    # Maintained by the triggers in BALANCE_TRIGGERS; see queries.check_account_balances
+    balance_cents: Mapped[int] = mapped_column(default=0, server_default="0")
     
     transactions: Mapped[List["Transaction"]] = relationship(back_populates="account")
 
@@ -42,6 +45,10 @@ class Account(Base):
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        # Every account view filters by account and orders by date
+        Index("ix_transactions_account_id_date", "account_id", "date"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id"))
@@ -50,13 +57,20 @@ class Transaction(Base):
     original_currency: Mapped[Currency] = mapped_column(SqlEnum(Currency, native_enum=False))
     value_in_account_currency: Mapped[Decimal] = mapped_column(Numeric(10, 2))
     
-    date: Mapped[datetime] = mapped_column(DateTime)
-    reviewed_at: Mapped[datetime | None] = mapped_column(DateTime)
+    # Indexed on its own for the All Accounts list, which pages by (date, id)
+    date: Mapped[datetime] = mapped_column(DateTime, index=True)
+    reviewed_at: Mapped[datetime | None] = mapped_column(DateTime, index=True)
+    # Identifies a row from a CSV import so overlapping exports are not imported twice
+    import_fingerprint: Mapped[str | None] = mapped_column(String(40), index=True, unique=True)
 
-    split_parent_id: Mapped[int | None] = mapped_column(ForeignKey("transactions.id"))
+    split_parent_id: Mapped[int | None] = mapped_column(ForeignKey("transactions.id"), index=True)
     merge_parent_id: Mapped[int | None] = mapped_column(
-        ForeignKey("transactions.id", ondelete="SET NULL")
+        ForeignKey("transactions.id", ondelete="SET NULL"), index=True
     )
+    # Whether any row points at this one via split_parent_id / merge_parent_id.
+    # Maintained by PARENT_FLAG_TRIGGERS so listings can filter parents without anti-joins
+    is_split_parent: Mapped[bool] = mapped_column(default=False, server_default=false())
+    is_merge_parent: Mapped[bool] = mapped_column(default=False, server_default=false())
 
     account: Mapped["Account"] = relationship(back_populates="transactions")
     split_parent: Mapped["Transaction | None"] = relationship(
@@ -73,4 +87,207 @@ class Transaction(Base):
     merge_children: Mapped[List["Transaction"]] = relationship(
         "Transaction", back_populates="merge_parent",
         foreign_keys="[Transaction.merge_parent_id]"
-    )
\ No newline at end of file
+    )
+
+
+# One row whose active column CSV imports set while they insert. The per-row work
+# of the balance and search index insert triggers is then skipped, and the import
+# does it once for all its rows with BULK_IMPORT_STATEMENTS.
+BULK_IMPORT_TABLE = "bulk_import"
+BULK_IMPORT_DDL = (
+    f"CREATE TABLE {BULK_IMPORT_TABLE} (active BOOLEAN NOT NULL)",
+    f"INSERT INTO {BULK_IMPORT_TABLE} (active) VALUES (0)",
+)
+_NOT_BULK_IMPORT = f"WHEN NOT EXISTS (SELECT 1 FROM {BULK_IMPORT_TABLE} WHERE active)"
+
+# Keep accounts.balance_cents in step with every write to transactions, whether it
+# comes from the ORM or from a bulk insert. A row counts towards its account's
+# balance unless it is a merge parent (another row points at it via merge_parent_id),
+# so a parent gaining its first child or losing its last one moves the parent's own
+# amount out of or back into its account's balance.
+BALANCE_TRIGGERS = (
+    f"""
+    CREATE TRIGGER trg_transactions_balance_insert AFTER INSERT ON transactions
+    {_NOT_BULK_IMPORT}
+    BEGIN
+        UPDATE accounts
+        SET balance_cents = balance_cents + CAST(ROUND(NEW.value_in_account_currency * 100) AS INTEGER)
+        WHERE id = NEW.account_id
+          AND NOT EXISTS (SELECT 1 FROM transactions WHERE merge_parent_id = NEW.id);
+        UPDATE accounts
+        SET balance_cents = balance_cents - (
+            SELECT CAST(ROUND(value_in_account_currency * 100) AS INTEGER)
+            FROM transactions WHERE id = NEW.merge_parent_id)
+        WHERE id = (SELECT account_id FROM transactions WHERE id = NEW.merge_parent_id)
+          AND NOT EXISTS (
+            SELECT 1 FROM transactions WHERE merge_parent_id = NEW.merge_parent_id AND id != NEW.id);
+    END
+    """,
+    """
+    CREATE TRIGGER trg_transactions_balance_delete AFTER DELETE ON transactions
+    BEGIN
+        UPDATE accounts
+        SET balance_cents = balance_cents - CAST(ROUND(OLD.value_in_account_currency * 100) AS INTEGER)
+        WHERE id = OLD.account_id
+          AND NOT EXISTS (SELECT 1 FROM transactions WHERE merge_parent_id = OLD.id);
+        UPDATE accounts
+        SET balance_cents = balance_cents + (
+            SELECT CAST(ROUND(value_in_account_currency * 100) AS INTEGER)
+            FROM transactions WHERE id = OLD.merge_parent_id)
+        WHERE id = (SELECT account_id FROM transactions WHERE id = OLD.merge_parent_id)
+          AND NOT EXISTS (SELECT 1 FROM transactions WHERE merge_parent_id = OLD.merge_parent_id);
+    END
+    """,
+    """
+    CREATE TRIGGER trg_transactions_balance_amount
+    AFTER UPDATE OF value_in_account_currency, account_id ON transactions
+    BEGIN
+        UPDATE accounts
+        SET balance_cents = balance_cents - CAST(ROUND(OLD.value_in_account_currency * 100) AS INTEGER)
+        WHERE id = OLD.account_id
+          AND NOT EXISTS (SELECT 1 FROM transactions WHERE merge_parent_id = OLD.id);
+        UPDATE accounts
+        SET balance_cents = balance_cents + CAST(ROUND(NEW.value_in_account_currency * 100) AS INTEGER)
+        WHERE id = NEW.account_id
+          AND NOT EXISTS (SELECT 1 FROM transactions WHERE merge_parent_id = NEW.id);
+    END
+    """,
+    """
+    CREATE TRIGGER trg_transactions_balance_merge
+    AFTER UPDATE OF merge_parent_id ON transactions
+    WHEN OLD.merge_parent_id IS NOT NEW.merge_parent_id
+    BEGIN
+        UPDATE accounts
+        SET balance_cents = balance_cents + (
+            SELECT CAST(ROUND(value_in_account_currency * 100) AS INTEGER)
+            FROM transactions WHERE id = OLD.merge_parent_id)
+        WHERE id = (SELECT account_id FROM transactions WHERE id = OLD.merge_parent_id)
+          AND NOT EXISTS (SELECT 1 FROM transactions WHERE merge_parent_id = OLD.merge_parent_id);
+        UPDATE accounts
+        SET balance_cents = balance_cents - (
+            SELECT CAST(ROUND(value_in_account_currency * 100) AS INTEGER)
+            FROM transactions WHERE id = NEW.merge_parent_id)
+        WHERE id = (SELECT account_id FROM transactions WHERE id = NEW.merge_parent_id)
+          AND NOT EXISTS (
+            SELECT 1 FROM transactions WHERE merge_parent_id = NEW.merge_parent_id AND id != NEW.id);
+    END
+    """,
+)
+
+
+# Keep is_split_parent / is_merge_parent equal to "some row points at this one".
+# Setting the flag on the first child and re-checking on removal of any child keeps
+# them right for every writer: merge operations, the split dialog and bulk inserts.
+PARENT_FLAG_TRIGGERS = tuple(
+    trigger
+    for kind in ("split", "merge")
+    for trigger in (
+        f"""
+        CREATE TRIGGER trg_transactions_{kind}_parent_insert AFTER INSERT ON transactions
+        WHEN NEW.{kind}_parent_id IS NOT NULL
+        BEGIN
+            UPDATE transactions SET is_{kind}_parent = 1
+            WHERE id = NEW.{kind}_parent_id AND NOT is_{kind}_parent;
+        END
+        """,
+        f"""
+        CREATE TRIGGER trg_transactions_{kind}_parent_delete AFTER DELETE ON transactions
+        WHEN OLD.{kind}_parent_id IS NOT NULL
+        BEGIN
+            UPDATE transactions SET is_{kind}_parent = 0
+            WHERE id = OLD.{kind}_parent_id
+              AND NOT EXISTS (SELECT 1 FROM transactions WHERE {kind}_parent_id = OLD.{kind}_parent_id);
+        END
+        """,
+        f"""
+        CREATE TRIGGER trg_transactions_{kind}_parent_update AFTER UPDATE OF {kind}_parent_id ON transactions
+        WHEN OLD.{kind}_parent_id IS NOT NEW.{kind}_parent_id
+        BEGIN
+            UPDATE transactions SET is_{kind}_parent = 0
+            WHERE id = OLD.{kind}_parent_id
+              AND NOT EXISTS (SELECT 1 FROM transactions WHERE {kind}_parent_id = OLD.{kind}_parent_id);
+            UPDATE transactions SET is_{kind}_parent = 1
+            WHERE id = NEW.{kind}_parent_id AND NOT is_{kind}_parent;
+        END
+        """,
+    )
+)
+
+# Full-text index for / search: one row per transaction, keyed by its id, holding
+# its description, its account's name and its amount as shown in the table.
+SEARCH_INDEX_TABLE = "transactions_search"
+SEARCH_INDEX_DDL = (
+    f"CREATE VIRTUAL TABLE {SEARCH_INDEX_TABLE} USING fts5(description, account, amount)"
+)
+
+# Keep the search index in step with transactions and account names. The index is
+# not part of the change log of incremental saves, so these triggers stay active
+# while a save replays changed rows into the file (see db._write_changes); that is
+# why accounts also refresh their name on insert, as the replay deletes and
+# re-inserts a renamed account.
+SEARCH_INDEX_TRIGGER_PREFIX = "trg_search_"
+SEARCH_INDEX_TRIGGERS = (
+    f"""
+    CREATE TRIGGER trg_search_transactions_insert AFTER INSERT ON transactions
+    {_NOT_BULK_IMPORT}
+    BEGIN
+        INSERT INTO {SEARCH_INDEX_TABLE} (rowid, description, account, amount)
+        VALUES (NEW.id, NEW.description, (SELECT name FROM accounts WHERE id = NEW.account_id),
+                printf('%.2f', NEW.original_value));
+    END
+    """,
+    f"""
+    CREATE TRIGGER trg_search_transactions_delete AFTER DELETE ON transactions
+    BEGIN
+        DELETE FROM {SEARCH_INDEX_TABLE} WHERE rowid = OLD.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER trg_search_transactions_update
+    AFTER UPDATE OF description, original_value, account_id ON transactions
+    BEGIN
+        UPDATE {SEARCH_INDEX_TABLE}
+        SET description = NEW.description,
+            account = (SELECT name FROM accounts WHERE id = NEW.account_id),
+            amount = printf('%.2f', NEW.original_value)
+        WHERE rowid = NEW.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER trg_search_accounts_insert AFTER INSERT ON accounts
+    BEGIN
+        UPDATE {SEARCH_INDEX_TABLE} SET account = NEW.name
+        WHERE rowid IN (SELECT id FROM transactions WHERE account_id = NEW.id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER trg_search_accounts_update AFTER UPDATE OF name ON accounts
+    BEGIN
+        UPDATE {SEARCH_INDEX_TABLE} SET account = NEW.name
+        WHERE rowid IN (SELECT id FROM transactions WHERE account_id = NEW.id);
+    END
+    """,
+)
+
+# What the insert triggers skip during a bulk import, for the rows with ids from
+# :first_id on. Imported rows are never merge parents or children, so each simply
+# adds its amount to its account's balance.
+BULK_IMPORT_STATEMENTS = (
+    """
+    UPDATE accounts SET balance_cents = balance_cents + (
+        SELECT SUM(CAST(ROUND(value_in_account_currency * 100) AS INTEGER))
+        FROM transactions WHERE account_id = accounts.id AND id >= :first_id)
+    WHERE id IN (SELECT account_id FROM transactions WHERE id >= :first_id)
+    """,
+    f"""
+    INSERT INTO {SEARCH_INDEX_TABLE} (rowid, description, account, amount)
+    SELECT t.id, t.description, (SELECT name FROM accounts WHERE id = t.account_id),
+           printf('%.2f', t.original_value)
+    FROM transactions AS t WHERE t.id >= :first_id
+    """,
+)
+
+for _trigger in (BULK_IMPORT_DDL + BALANCE_TRIGGERS + PARENT_FLAG_TRIGGERS + (SEARCH_INDEX_DDL,)
+                 + SEARCH_INDEX_TRIGGERS):
+    # DDL() applies %-formatting to its statement
+    event.listen(Transaction.__table__, "after_create", DDL(_trigger.replace("%", "%%")))
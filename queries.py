@@ -14,41 +14,88 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import array
+import bisect
 import csv
 import datetime
+import functools
+import glob
+import hashlib
+import itertools
+import json
+import multiprocessing
+import operator
 import os
+import re
+import sqlite3
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
 from decimal import Decimal
+from typing import Callable, NamedTuple
 
-from sqlalchemy import select, func, case
+from sqlalchemy import (
+    Integer, bindparam, cast, select, func, case, exists, insert, literal, text, tuple_, update,
+)
 from sqlalchemy.orm import Session, selectinload
 
+import db
+from importers import registry
 from importers.engine import CSVImporter
-from models.finance import Account, Currency, Transaction
+from models.finance import (
+    BULK_IMPORT_STATEMENTS, BULK_IMPORT_TABLE, SEARCH_INDEX_TABLE, Account, Currency, Transaction,
+)
+
+
+def _cents(amount: int) -> Decimal:
+    return Decimal(amount).scaleb(-2)
 
 
 def get_all_accounts_with_balances(session: Session) -> list[tuple[Account, Decimal]]:
-    """Return all accounts with their computed balance via SQL SUM().
+    """Return all accounts with their balance, read from the cached balance_cents column.
 
-    Excludes merge parents (virtual transactions) from the balance sum.
+    The cache excludes merge parents (virtual transactions) and is kept current by
+    the triggers in models.finance.BALANCE_TRIGGERS, so this reads one row per account.
     """
-    stmt = (
-        select(Account, func.coalesce(func.sum(Transaction.value_in_account_currency), 0))
+    stmt = select(Account, Account.balance_cents).order_by(Account.id)
+    return [(acc, _cents(cents)) for acc, cents in session.execute(stmt).all()]
+
+
+def _computed_balances_stmt():
+    """Balance of every account summed from its transactions, excluding merge parents."""
+    cents = cast(func.round(Transaction.value_in_account_currency * 100), Integer)
+    return (
+        select(Account, Account.balance_cents, func.coalesce(func.sum(cents), 0))
         .outerjoin(Transaction, Account.id == Transaction.account_id)
         .where(~Transaction.id.in_(_merge_parent_ids_subquery()) | Transaction.id.is_(None))
         .group_by(Account.id)
         .order_by(Account.id)
     )
-    return [(acc, Decimal(str(bal))) for acc, bal in session.execute(stmt).all()]
 
 
-def _split_parent_ids_subquery():
-    """Subquery returning transaction ids that have children (are split parents)."""
-    return (
-        select(Transaction.split_parent_id)
-        .where(Transaction.split_parent_id.is_not(None))
-        .distinct()
-        .scalar_subquery()
-    )
+def check_account_balances(
+    session: Session, repair: bool = False
+) -> list[tuple[Account, Decimal, Decimal]]:
+    """Recompute every balance from its transactions and compare it with the cached one.
+
+    Returns (account, cached, computed) for each account whose cache is off. With
+    repair=True the cached balances of those accounts are overwritten and committed.
+    """
+    mismatches = [
+        (acc, cached, computed)
+        for acc, cached, computed in session.execute(_computed_balances_stmt()).all()
+        if cached != computed
+    ]
+    if repair and mismatches:
+        session.execute(
+            Account.__table__.update()
+            .where(Account.__table__.c.id == bindparam("account_id"))
+            .values(balance_cents=bindparam("computed")),
+            [{"account_id": acc.id, "computed": computed} for acc, _, computed in mismatches],
+        )
+        session.commit()
+    return [(acc, _cents(cached), _cents(computed)) for acc, cached, computed in mismatches]
 
 
 def _merge_parent_ids_subquery():
@@ -61,273 +108,848 @@ def _merge_parent_ids_subquery():
     )
 
 
-def _merge_net_subquery():
-    """Scalar subquery that computes the net total of a merge group.
-
-    Returns the sum of value_in_account_currency for all transactions sharing
-    the same merge_parent_id as the outer transaction.
-    """
-    MergeSibling = Transaction.__table__.alias("merge_sibling")
-    return (
-        select(func.sum(MergeSibling.c.value_in_account_currency))
-        .where(MergeSibling.c.merge_parent_id == Transaction.merge_parent_id)
-        .correlate(Transaction.__table__)
-        .scalar_subquery()
-    )
+def _merge_groups_subquery(account_id: int | None = None, merge_parent_ids: list[int] | None = None):
+    """Subquery with one row per merge group, aggregated in a single pass.
 
+    Columns: merge_parent_id, net (sum of the children's value_in_account_currency),
+    is_cross_account (children span more than one account), reviewed_at and
+    description of the merge parent.
 
-def _merge_parent_reviewed_subquery():
-    """Scalar subquery returning the merge parent's reviewed_at for a child."""
+    With account_id, only groups that have a child in that account are computed;
+    with merge_parent_ids, only those groups.
+    """
+    MergeChild = Transaction.__table__.alias("merge_child")
     MergeParent = Transaction.__table__.alias("merge_parent")
-    return (
-        select(MergeParent.c.reviewed_at)
-        .where(MergeParent.c.id == Transaction.merge_parent_id)
-        .correlate(Transaction.__table__)
-        .scalar_subquery()
+    stmt = (
+        select(
+            MergeChild.c.merge_parent_id,
+            func.sum(MergeChild.c.value_in_account_currency).label("net"),
+            (func.count(func.distinct(MergeChild.c.account_id)) > 1).label("is_cross_account"),
+            # Constant within a group; max() keeps the GROUP BY on the indexed column
+            func.max(MergeParent.c.reviewed_at).label("reviewed_at"),
+            func.max(MergeParent.c.description).label("description"),
+        )
+        .join(MergeParent, MergeParent.c.id == MergeChild.c.merge_parent_id)
+        .group_by(MergeChild.c.merge_parent_id)
     )
+    if merge_parent_ids is not None:
+        stmt = stmt.where(MergeChild.c.merge_parent_id.in_(merge_parent_ids))
+    elif account_id is not None:
+        AccountChild = Transaction.__table__.alias("account_merge_child")
+        stmt = stmt.where(
+            MergeChild.c.merge_parent_id.in_(
+                select(AccountChild.c.merge_parent_id)
+                .where(AccountChild.c.account_id == account_id)
+                .where(AccountChild.c.merge_parent_id.is_not(None))
+            )
+        )
+    return stmt.subquery("merge_groups")
 
 
-def _merge_parent_desc_subquery():
-    """Scalar subquery returning the merge parent's description for a child."""
-    MergeParent = Transaction.__table__.alias("merge_parent_desc")
-    return (
-        select(MergeParent.c.description)
-        .where(MergeParent.c.id == Transaction.merge_parent_id)
-        .correlate(Transaction.__table__)
-        .scalar_subquery()
-    )
+# --- Read cache ---
+
+# Rows the read cache holds at most; a layout counts one per row, counts count one
+READ_CACHE_ROWS = 1_000_000
 
 
-def _is_cross_account_merge_subquery():
-    """Scalar subquery that returns True when a merge group spans multiple accounts.
+class _ReadCache:
+    """LRU cache of read query results, valid for one generation of the data.
 
-    Counts distinct account_id values among all children sharing the same
-    merge_parent_id as the outer transaction. Returns > 1 when cross-account.
+    Results are keyed by (function, args) and all dropped as soon as
+    db.generation() changes. Once they hold more than max_rows rows, the least
+    recently used go first.
     """
-    MergeSibling = Transaction.__table__.alias("merge_sibling_acc")
-    return (
-        select(
-            func.count(func.distinct(MergeSibling.c.account_id)) > 1
-        )
-        .where(MergeSibling.c.merge_parent_id == Transaction.merge_parent_id)
-        .correlate(Transaction.__table__)
-        .scalar_subquery()
-    )
 
+    def __init__(self, max_rows: int = READ_CACHE_ROWS):
+        self.max_rows = max_rows
+        self.generation = None
+        self._entries = OrderedDict()  # key -> (result, rows)
+        self._rows = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+        self._rows = 0
+
+    def get(self, key, generation):
+        """Return the (result, rows) cached for key in generation, or None."""
+        if generation != self.generation:
+            self.clear()
+            self.generation = generation
+            return None
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
 
-def load_transaction_page(
+    def put(self, key, result, rows: int):
+        if rows > self.max_rows:
+            return
+        self._entries[key] = (result, rows)
+        self._rows += rows
+        while self._rows > self.max_rows:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._rows -= evicted
+
+
+_read_cache = _ReadCache()
+
+
+def _read_cache_key(name: str, args: tuple, kwargs: dict) -> tuple:
+    return (name, args, tuple(sorted(kwargs.items())))
+
+
+def _cached_read(rows: Callable[[object], int]):
+    """Cache a read function's results in _read_cache; rows(result) is their size.
+
+    Only for results that are plain data: ORM objects belong to their session
+    and are expired by its commits.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def cached(session: Session, *args, **kwargs):
+            key = _read_cache_key(fn.__name__, args, kwargs)
+            generation = db.generation(session)
+            entry = _read_cache.get(key, generation)
+            if entry is not None:
+                return entry[0]
+            result = fn(session, *args, **kwargs)
+            _read_cache.put(key, result, rows(result))
+            return result
+        return cached
+    return decorate
+
+
+TRANSACTION_PAGE_SIZE = 200
+
+
+@_cached_read(rows=lambda counts: 1)
+def count_transactions(
     session: Session,
     account_id: int | None = None,
     all_accounts: bool = False,
-) -> tuple[int, int, list]:
-    """Load transactions and counts.
-
-    Returns (total_count, total_unreviewed, rows).
-
-    For counting: merge children are excluded, merge parents are counted as 1.
-    For display: merge children are included (with merge metadata), merge parents
-    are excluded from normal rows but returned for all-accounts grouping.
+) -> tuple[int, int]:
+    """Return (total_count, total_unreviewed) for an account or all accounts.
 
-    Rows are:
-    - Single account: list of tuples (Transaction, merge_net|None, merge_reviewed|None, merge_group_name|None, is_cross_account_merge)
-    - All accounts: list of tuples (Transaction, account_name, merge_net|None, merge_reviewed|None, merge_group_name|None)
+    Merge children are excluded, merge parents are counted as 1.
     """
-    no_split_parent = ~Transaction.id.in_(_split_parent_ids_subquery())
-    no_merge_parent = ~Transaction.id.in_(_merge_parent_ids_subquery())
+    no_split_parent = ~Transaction.is_split_parent
     is_not_merge_child = Transaction.merge_parent_id.is_(None)
 
-    where = None if all_accounts else (Transaction.account_id == account_id)
-
-    # Count totals: exclude merge children, include merge parents as 1 each
     count_stmt = select(
         func.count(Transaction.id),
         func.sum(case((Transaction.reviewed_at.is_(None), 1), else_=0)),
     ).where(no_split_parent).where(is_not_merge_child)
     if all_accounts:
         count_stmt = count_stmt.join(Account, Transaction.account_id == Account.id)
-    if where is not None:
-        count_stmt = count_stmt.where(where)
+    else:
+        count_stmt = count_stmt.where(Transaction.account_id == account_id)
     total_count, total_unreviewed = session.execute(count_stmt).one()
-    total_count = total_count or 0
-    total_unreviewed = int(total_unreviewed or 0)
+    return total_count or 0, int(total_unreviewed or 0)
+
 
-    # Subquery labels for merge metadata
-    merge_net = _merge_net_subquery().label("merge_net")
-    merge_reviewed = _merge_parent_reviewed_subquery().label("merge_reviewed")
-    merge_group_name = _merge_parent_desc_subquery().label("merge_group_name")
+def _transaction_rows_stmt(
+    account_id: int | None,
+    all_accounts: bool,
+    merge_parent_ids: list[int] | None = None,
+):
+    """Select displayable transactions with their merge metadata, unordered.
+
+    Split parents and merge parents are excluded; merge children are included.
+    Passing merge_parent_ids limits the merge metadata to those groups and
+    leaves it to the caller to pick the rows (the account is not filtered).
+    """
+    no_split_parent = ~Transaction.is_split_parent
+    no_merge_parent = ~Transaction.is_merge_parent
+
+    # Merge metadata comes from one aggregate per group, joined to its children
+    groups = _merge_groups_subquery(None if all_accounts else account_id, merge_parent_ids)
+    merge_net = groups.c.net.label("merge_net")
+    merge_reviewed = groups.c.reviewed_at.label("merge_reviewed")
+    merge_group_name = groups.c.description.label("merge_group_name")
 
-    # Fetch rows: exclude split parents and merge parents, but include merge children
     if all_accounts:
         stmt = (
             select(Transaction, Account.name, merge_net, merge_reviewed, merge_group_name)
             .join(Account, Transaction.account_id == Account.id)
-            .where(no_split_parent)
-            .where(no_merge_parent)
         )
     else:
-        is_cross_account = _is_cross_account_merge_subquery().label("is_cross_account")
-        stmt = (
-            select(Transaction, merge_net, merge_reviewed, merge_group_name, is_cross_account)
-            .where(no_split_parent)
-            .where(no_merge_parent)
-        )
-        if where is not None:
-            stmt = stmt.where(where)
+        # Rows outside a merge group count as not cross-account, like before
+        is_cross_account = func.coalesce(groups.c.is_cross_account, False).label("is_cross_account")
+        stmt = select(Transaction, merge_net, merge_reviewed, merge_group_name, is_cross_account)
+        if merge_parent_ids is None:
+            stmt = stmt.where(Transaction.account_id == account_id)
+    return (
+        stmt.outerjoin(groups, groups.c.merge_parent_id == Transaction.merge_parent_id)
+        .where(no_split_parent)
+        .where(no_merge_parent)
+    )
+
+
+def _display_units_stmt(account_id: int | None, all_accounts: bool, units_only: bool = True):
+    """Select the display units of a view in (date, id) descending order.
+
+    A unit is what moves as a whole through the list: a plain row, or a merge
+    group shown as header plus children. A group is represented by its earliest
+    child, which is also where it is placed. In a single account, children of
+    cross-account merges are shown individually, so each is a unit of its own.
 
-    stmt = stmt.order_by(Transaction.date.desc())
-    rows = session.execute(stmt).all()
+    Columns: id, date, merge_parent_id, is_group. With units_only=False every
+    displayed row is selected, including the other children of each group.
+    """
+    no_split_parent = ~Transaction.is_split_parent
+    no_merge_parent = ~Transaction.is_merge_parent
+
+    EarlierSibling = Transaction.__table__.alias("earlier_sibling")
+    is_first_child = ~exists().where(
+        EarlierSibling.c.merge_parent_id == Transaction.merge_parent_id,
+        tuple_(EarlierSibling.c.date, EarlierSibling.c.id) < tuple_(Transaction.date, Transaction.id),
+    )
+    is_child = Transaction.merge_parent_id.is_not(None)
 
     if all_accounts:
-        rows = _group_merge_children_all_accounts(session, rows)
+        is_group = is_child
+        stmt = select(Transaction.id, Transaction.date, Transaction.merge_parent_id, is_group.label("is_group"))
+        unit = Transaction.merge_parent_id.is_(None) | is_first_child
     else:
-        rows = _group_merge_children_single_account(session, rows)
+        OtherAccountSibling = Transaction.__table__.alias("other_account_sibling")
+        is_cross_account = exists().where(
+            OtherAccountSibling.c.merge_parent_id == Transaction.merge_parent_id,
+            OtherAccountSibling.c.account_id != Transaction.account_id,
+        )
+        is_group = is_child & ~is_cross_account
+        stmt = (
+            select(Transaction.id, Transaction.date, Transaction.merge_parent_id, is_group.label("is_group"))
+            .where(Transaction.account_id == account_id)
+        )
+        unit = Transaction.merge_parent_id.is_(None) | is_cross_account | is_first_child
+
+    stmt = stmt.where(no_split_parent).where(no_merge_parent)
+    if units_only:
+        stmt = stmt.where(unit)
+    return stmt.order_by(Transaction.date.desc(), Transaction.id.desc())
+
+
+class DisplayUnit(NamedTuple):
+    """A plain row or a whole merge group of the transaction list, see load_unit_rows."""
+
+    id: int  # the row's transaction, or the group's earliest child
+    merge_parent_id: int | None
+    is_group: bool
 
-    return total_count, total_unreviewed, rows
 
+@dataclass
+class TransactionLayout:
+    """Order of every row of the transaction list, without the transactions.
 
-def _group_merge_children_all_accounts(session, rows):
-    """Post-process All Accounts rows to group merge children under their parent.
+    rows holds one entry per displayed row: the transaction id, or the negated
+    merge parent id for a group header. unit_starts holds the index in rows at
+    which each display unit starts, and unit_merge_parents its merge parent id
+    (0 if none). Plain arrays keep this small even for hundreds of thousands of rows.
 
-    Inserts merge parent header rows and reorders children beneath them
-    at the earliest child's position.
+    A layout loaded a window at a time (load_transaction_layout_window) holds
+    the newest units only until extend_transaction_layout has added the rest;
+    resume_after is the (date, id) of its last unit until then, and generation
+    the db.generation() its first window was read in.
     """
-    # Separate merge children from normal rows
-    normal_rows = []
-    merge_groups = {}  # merge_parent_id -> list of row tuples
 
-    for row in rows:
-        tx = row[0]
-        if tx.merge_parent_id is not None:
-            merge_groups.setdefault(tx.merge_parent_id, []).append(row)
-        else:
-            normal_rows.append(row)
+    rows: array.array = field(default_factory=lambda: array.array("q"))
+    unit_starts: array.array = field(default_factory=lambda: array.array("q"))
+    unit_merge_parents: array.array = field(default_factory=lambda: array.array("q"))
+    resume_after: tuple[datetime.datetime, int] | None = None
+    generation: tuple[int, int] | None = field(default=None, compare=False, repr=False)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def complete(self) -> bool:
+        """Whether the layout holds the whole list."""
+        return self.resume_after is None
+
+    @property
+    def unit_count(self) -> int:
+        return len(self.unit_starts)
+
+    def unit_at_row(self, row_index: int) -> int:
+        """Return the index of the display unit that contains the given row."""
+        return bisect.bisect_right(self.unit_starts, row_index) - 1
+
+    def unit_rows(self, unit: int) -> range:
+        """Return the indexes in rows of the given display unit's rows."""
+        start = self.unit_starts[unit]
+        stop = self.unit_starts[unit + 1] if unit + 1 < self.unit_count else len(self.rows)
+        return range(start, stop)
+
+    def copy(self) -> "TransactionLayout":
+        return TransactionLayout(
+            self.rows[:], self.unit_starts[:], self.unit_merge_parents[:], self.resume_after
+        )
 
-    if not merge_groups:
+    def remove_unit(self, unit: int) -> range:
+        """Take a display unit out; returns the indexes its rows had."""
+        rows = self.unit_rows(unit)
+        del self.rows[rows.start:rows.stop]
+        del self.unit_starts[unit]
+        del self.unit_merge_parents[unit]
+        self._shift_units(unit, -len(rows))
         return rows
 
-    # Load merge parents
-    parent_ids = list(merge_groups.keys())
-    parents = {
-        p.id: p
-        for p in session.execute(
-            select(Transaction).where(Transaction.id.in_(parent_ids))
-        ).scalars().all()
-    }
+    def insert_unit(self, unit: int, entries, merge_parent_id: int) -> int:
+        """Insert a display unit before the given one; returns the index of its first row."""
+        start = self.unit_starts[unit] if unit < self.unit_count else len(self.rows)
+        self.rows[start:start] = array.array("q", entries)
+        self._shift_units(unit, len(entries))
+        self.unit_starts.insert(unit, start)
+        self.unit_merge_parents.insert(unit, merge_parent_id)
+        return start
+
+    def _shift_units(self, unit: int, delta: int):
+        # map() keeps this in C, it runs over every later unit
+        tail = self.unit_starts[unit:]
+        self.unit_starts[unit:] = array.array("q", map(operator.add, tail, itertools.repeat(delta, len(tail))))
+
+    def units(self, start: int, stop: int) -> list[DisplayUnit]:
+        """Return the display units start..stop, for load_unit_rows."""
+        units = []
+        for i in range(start, min(stop, self.unit_count)):
+            first = self.rows[self.unit_starts[i]]
+            parent_id = self.unit_merge_parents[i] or None
+            if first < 0:
+                units.append(DisplayUnit(self.rows[self.unit_starts[i] + 1], parent_id, True))
+            else:
+                units.append(DisplayUnit(first, parent_id, False))
+        return units
+
+
+@_cached_read(rows=len)
+def load_transaction_layout(
+    session: Session,
+    account_id: int | None = None,
+    all_accounts: bool = False,
+) -> TransactionLayout:
+    """Return the layout of the whole transaction list without loading any transactions.
 
-    # Build result: insert group at earliest child's date position
-    result = list(normal_rows)
+    Rows come newest first, by (date, id), with merge groups as a header followed
+    by their children. Pass a slice of the layout's units to
+    load_unit_rows to fetch the rows to display.
+    """
+    stmt = _display_units_stmt(account_id, all_accounts, units_only=False)
+    # Only ids are needed: the SQL order already places every row
+    stmt = stmt.with_only_columns(
+        Transaction.id, Transaction.merge_parent_id, stmt.selected_columns.is_group
+    )
+    layout = TransactionLayout()
+    _append_layout_units(layout, session.execute(stmt).all())
+    return layout
 
-    for parent_id, children in merge_groups.items():
-        parent = parents.get(parent_id)
-        if parent is None:
-            result.extend(children)
+
+def _append_layout_units(layout: TransactionLayout, rows):
+    """Add the (id, merge_parent_id, is_group) rows of _display_units_stmt to layout.
+
+    rows must hold every row of each merge group they touch, in the SQL order.
+    """
+    group_children = {}
+    for tx_id, parent_id, is_group in rows:
+        if is_group:
+            group_children.setdefault(parent_id, []).append(tx_id)
+
+    for tx_id, parent_id, is_group in rows:
+        if not is_group:
+            layout.unit_starts.append(len(layout.rows))
+            layout.unit_merge_parents.append(parent_id or 0)
+            layout.rows.append(tx_id)
             continue
+        # The earliest child places its group, and it comes last in newest-first order
+        child_ids = group_children[parent_id]
+        if tx_id == child_ids[-1]:
+            layout.unit_starts.append(len(layout.rows))
+            layout.unit_merge_parents.append(parent_id)
+            layout.rows.append(-parent_id)
+            layout.rows.extend(reversed(child_ids))
+
+
+def load_transaction_layout_window(
+    session: Session,
+    account_id: int | None = None,
+    all_accounts: bool = False,
+    units: int = TRANSACTION_PAGE_SIZE,
+) -> TransactionLayout:
+    """Return the layout of the newest units display units of the list.
+
+    Costs about as much as loading one page of rows, however long the list is,
+    so a view can be shown before its whole layout is known. extend_transaction_layout
+    adds the remaining units. A whole layout read before in the same generation
+    of the data is returned as it is.
+    """
+    key = _read_cache_key("load_transaction_layout", (account_id, all_accounts), {})
+    generation = db.generation(session)
+    entry = _read_cache.get(key, generation)
+    if entry is not None:
+        return entry[0]
+    layout = TransactionLayout(generation=generation)
+    _append_layout_window(session, layout, account_id, all_accounts, None, units)
+    return layout
+
+
+def extend_transaction_layout(
+    session: Session,
+    layout: TransactionLayout,
+    account_id: int | None,
+    all_accounts: bool,
+    units: int | None = None,
+) -> None:
+    """Add up to units more display units to an incomplete layout, all if units is None.
+
+    The units are fetched by keyset, those after the layout's last one. Rows
+    written in the meantime show up where they now belong if that is after the
+    layout's last unit; apply the ChangeSets of such writes to the layout as
+    usual (update_transaction_layout) to place the others.
+    """
+    if layout.complete:
+        return
+    _append_layout_window(session, layout, account_id, all_accounts, layout.resume_after, units)
+
+
+def _append_layout_window(
+    session: Session,
+    layout: TransactionLayout,
+    account_id: int | None,
+    all_accounts: bool,
+    after: tuple[datetime.datetime, int] | None,
+    units: int | None,
+) -> None:
+    """Append the units after the keyset after (from the newest if None), up to units of them."""
+    stmt = _display_units_stmt(account_id, all_accounts)
+    if after is not None:
+        stmt = stmt.where(tuple_(Transaction.date, Transaction.id) < tuple_(*after))
+    if units is not None:
+        stmt = stmt.limit(units)
+    window = session.execute(stmt).all()
+
+    group_parent_ids = [row.merge_parent_id for row in window if row.is_group]
+    children = {}
+    if group_parent_ids:
+        # A group's children are all in the view, also in a single account: they
+        # are only grouped there if none is elsewhere
+        children_stmt = select(Transaction.id, Transaction.merge_parent_id, Transaction.date).where(
+            Transaction.merge_parent_id.in_(group_parent_ids),
+            ~Transaction.is_split_parent,
+            ~Transaction.is_merge_parent,
+        )
+        rows = sorted(session.execute(children_stmt), key=lambda row: (row.date, row.id))
+        for tx_id, parent_id, _ in rows:
+            children.setdefault(parent_id, []).append(tx_id)
+
+    for row in window:
+        layout.unit_starts.append(len(layout.rows))
+        layout.unit_merge_parents.append(row.merge_parent_id or 0)
+        if row.is_group:
+            layout.rows.append(-row.merge_parent_id)
+            layout.rows.extend(children[row.merge_parent_id])
+        else:
+            layout.rows.append(row.id)
+    if units is not None and len(window) == units:
+        layout.resume_after = (window[-1].date, window[-1].id)
+        return
+    layout.resume_after = None
+    # Read in one generation, the layout is that of load_transaction_layout
+    if layout.generation is not None and layout.generation == db.generation(session):
+        key = _read_cache_key("load_transaction_layout", (account_id, all_accounts), {})
+        _read_cache.put(key, layout, len(layout))
 
-        # Find earliest child date for positioning
-        earliest_date = min(c[0].date for c in children)
 
-        # Find insertion point: after the last row with date >= earliest_date
-        insert_idx = len(result)
-        for i, r in enumerate(result):
-            if r[0].date < earliest_date:
-                insert_idx = i
-                break
+# --- Change sets ---
 
-        # Compute net and get account currency
-        net = sum(Decimal(str(c[0].value_in_account_currency)) for c in children)
-        first_child = children[0][0]
-        account_currency = first_child.original_currency.value
+# Display units a layout is patched with at most; beyond that, loading it is faster
+LAYOUT_PATCH_UNITS = 50
 
-        # Insert parent header row: (parent_tx, "–", net, reviewed, group_name)
-        # We mark this as a "header" by using the parent transaction
-        header_row = (parent, "–", float(net), parent.reviewed_at, parent.description)
 
-        # Sort children by date
-        children.sort(key=lambda c: c[0].date)
+@dataclass
+class ChangeSet:
+    """Ids of the transactions a write changed, so views can update just their rows.
 
-        # Insert header + children at position
-        result.insert(insert_idx, header_row)
-        for j, child in enumerate(children):
-            result.insert(insert_idx + 1 + j, child)
+    Write functions add to the ChangeSet passed as their changes argument.
+    merge_parents holds the merge groups whose header or members changed. reload
+    is set instead of listing ids when a write changed more rows than a view
+    would patch anyway, see LAYOUT_PATCH_UNITS.
+    """
 
-    return result
+    inserted: set[int] = field(default_factory=set)
+    updated: set[int] = field(default_factory=set)
+    deleted: set[int] = field(default_factory=set)
+    merge_parents: set[int] = field(default_factory=set)
+    reload: bool = False
 
+    def __bool__(self) -> bool:
+        return bool(
+            self.reload or self.inserted or self.updated or self.deleted or self.merge_parents
+        )
 
-def _group_merge_children_single_account(session, rows):
-    """Post-process single-account rows to group same-account merge children under their parent.
 
-    Inserts merge parent header rows and reorders children beneath them
-    at the earliest child's position.  Cross-account merge children are
-    left in place (they display with an [m+] suffix instead of tree chars).
+@dataclass
+class LayoutPatch:
+    """A layout with a ChangeSet applied, see update_transaction_layout.
 
-    Each row is (Transaction, merge_net, merge_reviewed, merge_group_name, is_cross_account).
-    Header rows use the same shape with sentinel values so the widget can detect them.
+    The units of changed rows were taken out and put back where they belong
+    now. removed holds the indexes the rows taken out had in the old layout,
+    new_units the indexes of the units put back.
     """
-    # Separate same-account merge children from everything else
-    normal_rows = []
-    merge_groups = {}  # merge_parent_id -> list of row tuples
 
-    for row in rows:
-        tx = row[0]
-        is_cross_account = bool(row[4]) if row[4] else False
-        if tx.merge_parent_id is not None and not is_cross_account:
-            merge_groups.setdefault(tx.merge_parent_id, []).append(row)
+    layout: TransactionLayout
+    removed: list[range] = field(default_factory=list)
+    new_units: list[int] = field(default_factory=list)
+    # (row index, delta) in the order applied: the rows from row index on moved by delta
+    moves: list[tuple[int, int]] = field(default_factory=list)
+
+    def row_index(self, old_index: int) -> int | None:
+        """Return the index of a row of the old layout now, or None if it was taken out."""
+        if any(old_index in rows for rows in self.removed):
+            return None
+        for position, delta in self.moves:
+            if old_index >= position:
+                old_index += delta
+        return old_index
+
+
+def _changed_units(layout: TransactionLayout, tx_ids: set[int], parents: set[int]) -> set[int]:
+    """Return the units holding one of tx_ids, or the header or a member of a group in parents.
+
+    parents gets the groups of the units found added, as they change too.
+    """
+    units = set()
+    wanted, new_parents = set(tx_ids), set(parents)
+    while wanted or new_parents:
+        wanted.update(-p for p in new_parents)
+        found = {
+            layout.unit_at_row(i)
+            for i in itertools.compress(itertools.count(), map(wanted.__contains__, layout.rows))
+        }
+        found.update(itertools.compress(itertools.count(), map(new_parents.__contains__, layout.unit_merge_parents)))
+        found -= units
+        units |= found
+        # Only groups not searched for yet need another pass
+        new_parents = {layout.unit_merge_parents[u] for u in found} - parents - {0}
+        parents |= new_parents
+        wanted = set()
+    return units
+
+
+def update_transaction_layout(
+    session: Session,
+    layout: TransactionLayout,
+    account_id: int | None,
+    all_accounts: bool,
+    changes: ChangeSet,
+) -> LayoutPatch | None:
+    """Apply a ChangeSet to a copy of layout instead of loading it anew.
+
+    The display units holding changed rows are taken out, loaded again and put
+    back before the unit that now follows them. Returns None if more than
+    LAYOUT_PATCH_UNITS units changed or changes asks for a reload; load the
+    layout then.
+    """
+    if changes.reload:
+        return None
+    tx_ids = changes.inserted | changes.updated | changes.deleted
+    if len(tx_ids) + len(changes.merge_parents) > LAYOUT_PATCH_UNITS:
+        return None
+
+    # A changed row changes its group too
+    parents = set(changes.merge_parents)
+    if tx_ids:
+        parents.update(session.execute(
+            select(Transaction.merge_parent_id)
+            .where(Transaction.id.in_(tx_ids), Transaction.merge_parent_id.is_not(None))
+        ).scalars())
+    # Inserted rows too: a layout loaded while an import ran may show them already
+    changed = _changed_units(layout, tx_ids, parents)
+    if len(changed) > LAYOUT_PATCH_UNITS:
+        return None
+
+    ids = set(tx_ids)
+    for unit in changed:
+        unit_rows = layout.unit_rows(unit)
+        ids.update(entry for entry in layout.rows[unit_rows.start:unit_rows.stop] if entry > 0)
+    if parents:
+        ids.update(session.execute(
+            select(Transaction.id).where(Transaction.merge_parent_id.in_(parents))
+        ).scalars())
+    stmt = _display_units_stmt(account_id, all_accounts, units_only=False)
+    stmt = stmt.with_only_columns(
+        Transaction.id, Transaction.merge_parent_id, stmt.selected_columns.is_group, Transaction.date
+    ).where(Transaction.id.in_(ids))
+    # Sorted here: ordered by date, SQLite would walk the account's index instead of looking ids up
+    rows = sorted(session.execute(stmt.order_by(None)).all(), key=lambda row: (row.date, row.id), reverse=True)
+    dates = {row.id: row.date for row in rows}
+    fresh = TransactionLayout()
+    _append_layout_units(fresh, [row[:3] for row in rows])
+    if len(changed) + fresh.unit_count > LAYOUT_PATCH_UNITS:
+        return None
+
+    patch = LayoutPatch(layout.copy())
+    for unit in sorted(changed, reverse=True):
+        removed = patch.layout.remove_unit(unit)
+        patch.removed.append(removed)
+        patch.moves.append((removed.stop, -len(removed)))
+
+    following_stmt = _display_units_stmt(account_id, all_accounts).with_only_columns(Transaction.id).limit(1)
+    # Oldest first, so the unit that follows each one is in place already
+    for unit in reversed(range(fresh.unit_count)):
+        placing_id = fresh.units(unit, unit + 1)[0].id
+        following = session.execute(following_stmt.where(
+            tuple_(Transaction.date, Transaction.id) < tuple_(dates[placing_id], placing_id)
+        )).scalar()
+        if following is None:
+            position = patch.layout.unit_count
         else:
-            normal_rows.append(row)
+            try:
+                position = patch.layout.unit_at_row(patch.layout.rows.index(following))
+            except ValueError:
+                return None  # the layout was out of date before these changes
+        unit_rows = fresh.unit_rows(unit)
+        start = patch.layout.insert_unit(
+            position, fresh.rows[unit_rows.start:unit_rows.stop], fresh.unit_merge_parents[unit]
+        )
+        patch.moves.append((start, len(unit_rows)))
+        patch.new_units = [u + (u >= position) for u in patch.new_units] + [position]
+    return patch
 
-    if not merge_groups:
-        return rows
 
-    # Load merge parents
-    parent_ids = list(merge_groups.keys())
+def load_unit_rows(
+    session: Session,
+    account_id: int | None,
+    all_accounts: bool,
+    units: list[DisplayUnit],
+) -> list:
+    """Load the rows of the given display units, in the order of the units.
+
+    Merge groups are a header row followed by their children in date order.
+    Units whose rows no longer exist, as after a rolled back import, are left out.
+
+    Rows are:
+    - Single account: tuples (Transaction, merge_net|None, merge_reviewed|None, merge_group_name|None, is_cross_account_merge)
+    - All accounts: tuples (Transaction, account_name, merge_net|None, merge_reviewed|None, merge_group_name|None)
+
+    Header rows have the same shapes, with the merge parent as Transaction; in
+    all accounts their account_name is "–".
+    """
+    if not units:
+        return []
+
+    group_parent_ids = [u.merge_parent_id for u in units if u.is_group]
+    plain_ids = [u.id for u in units if not u.is_group]
+    merge_parent_ids = list({u.merge_parent_id for u in units if u.merge_parent_id is not None})
+
+    rows_stmt = _transaction_rows_stmt(account_id, all_accounts, merge_parent_ids).where(
+        Transaction.id.in_(plain_ids) | Transaction.merge_parent_id.in_(group_parent_ids)
+    )
+    plain = set(plain_ids)
+    rows_by_id = {}
+    children = {}
+    for row in session.execute(rows_stmt).all():
+        tx = row[0]
+        if tx.id in plain:
+            rows_by_id[tx.id] = row
+        else:
+            children.setdefault(tx.merge_parent_id, []).append(row)
+
     parents = {
         p.id: p
         for p in session.execute(
-            select(Transaction).where(Transaction.id.in_(parent_ids))
-        ).scalars().all()
-    }
-
-    result = list(normal_rows)
-
-    for parent_id, children in merge_groups.items():
-        parent = parents.get(parent_id)
+            select(Transaction).where(Transaction.id.in_(group_parent_ids))
+        ).scalars()
+    } if group_parent_ids else {}
+
+    rows = []
+    for unit in units:
+        if not unit.is_group:
+            if unit.id in rows_by_id:
+                rows.append(rows_by_id[unit.id])
+            continue
+        if unit.merge_parent_id not in children:
+            continue
+        group = sorted(children[unit.merge_parent_id], key=lambda r: (r[0].date, r[0].id))
+        parent = parents.get(unit.merge_parent_id)
         if parent is None:
-            result.extend(children)
+            rows.extend(group)
             continue
+        net = float(sum(Decimal(str(r[0].value_in_account_currency)) for r in group))
+        if all_accounts:
+            rows.append((parent, "–", net, parent.reviewed_at, parent.description))
+        else:
+            rows.append((parent, net, parent.reviewed_at, parent.description, False))
+        rows.extend(group)
+
+    return rows
 
-        # Find earliest child date for positioning
-        earliest_date = min(c[0].date for c in children)
 
-        # Find insertion point: after the last row with date >= earliest_date
-        insert_idx = len(result)
-        for i, r in enumerate(result):
-            if r[0].date < earliest_date:
-                insert_idx = i
-                break
+# Runs of characters that separate words, as for the FTS5 unicode61 tokenizer
+_WORD_SEPARATORS = re.compile(r"[\W_]+")
 
-        # Compute net
-        net = sum(Decimal(str(c[0].value_in_account_currency)) for c in children)
 
-        # Header row: use same tuple shape as single-account rows
-        # (Transaction, merge_net, merge_reviewed, merge_group_name, is_cross_account)
-        # We mark the account_name as "–" via a special flag that the widget detects
-        # by checking if the tx is a merge parent (id in merge_parent_ids)
-        header_row = (parent, float(net), parent.reviewed_at, parent.description, False)
+def _fold(text: str) -> str:
+    """Lowercase text and remove accents, as the full-text index does."""
+    text = text.lower()
+    if text.isascii():
+        return text
+    return "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
 
-        # Sort children by date
-        children.sort(key=lambda c: c[0].date)
 
-        result.insert(insert_idx, header_row)
-        for j, child in enumerate(children):
-            result.insert(insert_idx + 1 + j, child)
+def _search_words(text: str) -> str:
+    """Reduce text to its lowercased words without accents, joined by single spaces."""
+    return _WORD_SEPARATORS.sub(" ", _fold(text)).strip()
+
+
+def search_terms(term: str) -> list[str]:
+    """Split a search term into its words, each normalized like the indexed text.
+
+    Punctuation separates words here as it does in the index, so a word like
+    "-50.00" becomes "50 00": two words that must follow each other.
+    """
+    return [words for words in map(_search_words, term.split()) if words]
+
+
+def _search_query(term: str) -> str | None:
+    """Turn a search term into an FTS5 query matching rows that contain every word.
+
+    Each word is quoted, so it has no query meaning, and matched as a prefix, so
+    "groc" finds "Grocery".
+    """
+    words = search_terms(term)
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
 
-    return result
+
+def search_transaction_ids(session: Session, term: str) -> set[int]:
+    """Return the ids of the transactions whose description, account or amount match term.
+
+    Uses the full-text index kept by the SEARCH_INDEX_TRIGGERS, so the cost depends
+    on the number of matches rather than the size of the ledger. Matching is
+    case-insensitive, by word prefix, and covers every account; callers map the ids
+    onto the rows they show.
+    """
+    query = _search_query(term)
+    if query is None:
+        return set()
+    rows = session.execute(
+        text(f"SELECT rowid FROM {SEARCH_INDEX_TABLE} WHERE {SEARCH_INDEX_TABLE} MATCH :query"),
+        {"query": query},
+    )
+    return {row_id for (row_id,) in rows}
+
+
+# Word separators of RowSearchIndex texts, apart from the row and column ends;
+# str.translate() handles ASCII text much faster than a regex
+_ASCII_ROW_TEXT_SEPARATORS = str.maketrans(
+    {c: " " for c in map(chr, range(128)) if not c.isalnum() and c not in "\n\x1f"}
+)
+_ROW_TEXT_SEPARATORS = re.compile(r"[^\w\n\x1f]")
+
+
+class RowSearchIndex:
+    """Searchable text of every row of a TransactionLayout, for search as you type.
+
+    texts holds, per row, the indexed columns of its transaction reduced to words
+    like search_terms() does, each word preceded by a space and each column
+    followed by COLUMN_END. A term word matches where a word starts, but never
+    across columns: the same rows the full-text index finds. build_postings()
+    adds the rows of every trigram and of every two-character word start; it is
+    slow for large layouts and may run in another thread, matches() scans all
+    texts until it is done.
+    """
+
+    COLUMN_END = "\x1f"
+
+    def __init__(self, texts: list[str]):
+        self.texts = texts
+        self._postings: dict[str, array.array] | None = None
+        self._closed = False
+
+    def build_postings(self):
+        """Index the texts; returns early, without postings, once close() was called."""
+        postings = {}
+        for row, row_text in enumerate(self.texts):
+            if row % 4096 == 0 and self._closed:
+                return
+            grams = {row_text[i:i + 3] for i in range(len(row_text) - 2)}
+            grams.update(row_text[i:i + 2] for i in range(len(row_text) - 1) if row_text[i] == " ")
+            for gram in grams:
+                rows = postings.get(gram)
+                if rows is None:
+                    rows = postings[gram] = array.array("q")
+                rows.append(row)
+        self._postings = postings
+
+    def close(self):
+        """Stop a running build_postings(); the index is no longer needed."""
+        self._closed = True
+
+    def matches(self, words: list[str], within=None) -> list[int]:
+        """Return the rows, in order, that contain every word of search_terms().
+
+        Pass the matches of a shorter term that this one extends as within to
+        only check those rows.
+        """
+        needles = sorted((f" {word}" for word in words), key=len, reverse=True)
+        if not needles:
+            return []
+        texts = self.texts
+        if within is None:
+            within = self._candidates(needles)
+        if isinstance(within, range):
+            rows = [row for row, text in enumerate(texts) if needles[0] in text]
+        else:
+            rows = [row for row in within if needles[0] in texts[row]]
+        for needle in needles[1:]:
+            rows = [row for row in rows if needle in texts[row]]
+        return rows
+
+    def _candidates(self, needles: list[str]):
+        postings = self._postings
+        if postings is None:
+            return range(len(self.texts))
+        # Every matching row has all grams of every needle; the rarest is enough
+        grams = [needle[:2] for needle in needles]
+        grams += [needle[i:i + 3] for needle in needles for i in range(len(needle) - 2)]
+        return min((postings.get(gram, ()) for gram in grams), key=len)
+
+
+def load_row_search_index(session: Session, layout: TransactionLayout) -> RowSearchIndex:
+    """Build the RowSearchIndex of a layout from the full-text index's columns.
+
+    All rows are normalized as one string, which keeps the work in C.
+    """
+    end = RowSearchIndex.COLUMN_END
+    ids = []
+    raw = []
+    for row_id, description, account, amount in session.execute(
+        text(f"SELECT rowid, description, account, amount FROM {SEARCH_INDEX_TABLE}")
+    ):
+        ids.append(row_id)
+        raw.append(f"{description}{end}{account or ''}{end}{amount}{end}")
+    # The leading row end gives the first row its leading space, like the others
+    normalized = _fold("\n" + "\n".join(raw))
+    if normalized.isascii():
+        normalized = normalized.translate(_ASCII_ROW_TEXT_SEPARATORS)
+    else:
+        normalized = _ROW_TEXT_SEPARATORS.sub(" ", normalized.replace("_", " "))
+    while "  " in normalized:
+        normalized = normalized.replace("  ", " ")
+    normalized = normalized.replace(end, f" {end} ").replace("\n", " \n ")
+    texts = dict(zip(ids, normalized.split("\n")[1:]))
+    return RowSearchIndex([texts.get(abs(entry), "") for entry in layout.rows])
 
 
 # --- Merge operations ---
 
 
-def create_merge(session: Session, tx_ids: list[int], name: str) -> Transaction:
+def create_merge(
+    session: Session, tx_ids: list[int], name: str, changes: ChangeSet | None = None
+) -> Transaction:
     """Create a merge group from the given transaction IDs.
 
     Creates a virtual parent Transaction and sets merge_parent_id on all children.
@@ -384,11 +1006,17 @@ def create_merge(session: Session, tx_ids: list[int], name: str) -> Transaction:
     for tx in txs:
         tx.merge_parent_id = parent.id
 
+    if changes is not None:
+        changes.inserted.add(parent.id)
+        changes.updated.update(tx_ids)
+        changes.merge_parents.add(parent.id)
     session.commit()
     return parent
 
 
-def add_to_merge(session: Session, merge_parent_id: int, tx_id: int) -> None:
+def add_to_merge(
+    session: Session, merge_parent_id: int, tx_id: int, changes: ChangeSet | None = None
+) -> None:
     """Add a transaction to an existing merge group."""
     parent = session.get(Transaction, merge_parent_id)
     if parent is None:
@@ -413,9 +1041,12 @@ def add_to_merge(session: Session, merge_parent_id: int, tx_id: int) -> None:
     tx.merge_parent_id = merge_parent_id
     _update_merge_parent(session, parent)
     session.commit()
+    if changes is not None:
+        changes.updated.add(tx_id)
+        changes.merge_parents.add(merge_parent_id)
 
 
-def remove_from_merge(session: Session, tx_id: int) -> str | None:
+def remove_from_merge(session: Session, tx_id: int, changes: ChangeSet | None = None) -> str | None:
     """Remove a transaction from its merge group.
 
     Returns the dissolved group's name if the group was auto-dissolved, else None.
@@ -427,6 +1058,9 @@ def remove_from_merge(session: Session, tx_id: int) -> str | None:
     parent_id = tx.merge_parent_id
     parent = session.get(Transaction, parent_id)
     tx.merge_parent_id = None
+    if changes is not None:
+        changes.updated.add(tx_id)
+        changes.merge_parents.add(parent_id)
 
     # Count remaining children
     remaining = session.execute(
@@ -438,14 +1072,18 @@ def remove_from_merge(session: Session, tx_id: int) -> str | None:
     if remaining <= 1:
         # Dissolve: clear remaining child's FK and delete parent
         dissolved_name = parent.description if parent else None
-        session.execute(
+        released = session.execute(
             Transaction.__table__.update()
             .where(Transaction.__table__.c.merge_parent_id == parent_id)
             .values(merge_parent_id=None)
-        )
+            .returning(Transaction.__table__.c.id)
+        ).scalars().all()
         if parent:
             session.delete(parent)
         session.commit()
+        if changes is not None:
+            changes.updated.update(released)
+            changes.deleted.add(parent_id)
         return dissolved_name
 
     # Update parent totals
@@ -455,13 +1093,17 @@ def remove_from_merge(session: Session, tx_id: int) -> str | None:
     return None
 
 
-def rename_merge(session: Session, merge_parent_id: int, new_name: str) -> None:
+def rename_merge(
+    session: Session, merge_parent_id: int, new_name: str, changes: ChangeSet | None = None
+) -> None:
     """Rename a merge group."""
     parent = session.get(Transaction, merge_parent_id)
     if parent is None:
         raise ValueError("Merge parent not found")
     parent.description = new_name
     session.commit()
+    if changes is not None:
+        changes.merge_parents.add(merge_parent_id)
 
 
 def _update_merge_parent(session: Session, parent: Transaction) -> None:
@@ -479,6 +1121,72 @@ def _update_merge_parent(session: Session, parent: Transaction) -> None:
     parent.date = min(c.date for c in children)
 
 
+# --- Split operations ---
+
+
+def save_split(
+    session: Session, root_id: int, splits: list[dict], changes: ChangeSet | None = None
+) -> None:
+    """Replace the split children of a transaction with the given splits and commit.
+
+    splits are dicts with id (None for a new child), description and amount, as
+    returned by SplitTransactionScreen. Children not among them are deleted.
+    Amounts in account currency keep the root's exchange ratio.
+    """
+    root = session.execute(
+        select(Transaction)
+        .where(Transaction.id == root_id)
+        .options(selectinload(Transaction.split_children))
+    ).scalar_one()
+    existing_ids = {c.id for c in root.split_children}
+    returned_ids = {s["id"] for s in splits if s["id"] is not None}
+
+    # Delete removed children
+    deleted = [child for child in root.split_children if child.id not in returned_ids]
+    for child in deleted:
+        session.delete(child)
+
+    # Compute proportional ratio
+    if float(root.original_value) != 0:
+        ratio = Decimal(str(root.value_in_account_currency)) / Decimal(str(root.original_value))
+    else:
+        ratio = Decimal("1")
+
+    # Update or create children
+    updated, created = [], []
+    for s in splits:
+        amount = Decimal(str(s["amount"]))
+        acc_amount = float(amount * ratio)
+
+        if s["id"] is not None and s["id"] in existing_ids:
+            child = session.get(Transaction, s["id"])
+            if child:
+                child.description = s["description"]
+                child.original_value = float(amount)
+                child.value_in_account_currency = acc_amount
+                updated.append(child.id)
+        else:
+            child = Transaction(
+                account_id=root.account_id,
+                description=s["description"],
+                original_value=float(amount),
+                original_currency=root.original_currency,
+                value_in_account_currency=acc_amount,
+                date=root.date,
+                split_parent_id=root.id,
+            )
+            session.add(child)
+            created.append(child)
+
+    session.flush()
+    if changes is not None:
+        # The root is shown only while it has no children
+        changes.updated.update(updated, [root_id])
+        changes.inserted.update(child.id for child in created)
+        changes.deleted.update(child.id for child in deleted)
+    session.commit()
+
+
 # --- Existing functions ---
 
 
@@ -492,53 +1200,621 @@ def toggle_reviewed(session: Session, tx_id: int) -> Transaction | None:
     return tx
 
 
-def import_csv_transactions(session: Session, csv_path: str, account: Account) -> int:
-    """Parse a CSV file using the account's mapping spec, insert transactions, and commit.
+def _ids_param(tx_ids):
+    """A subquery over a list of ids passed as one JSON parameter.
 
-    Returns the number of imported transactions.
-    Raises FileNotFoundError if csv_path doesn't exist.
+    Unlike IN with one parameter per id, this works for any number of ids in a
+    single statement.
+    """
+    ids = func.json_each(json.dumps(list(tx_ids))).table_valued("value")
+    return select(ids.c.value)
+
+
+def _update_reviewed(session: Session, tx_ids, reviewed_at, where=None) -> dict[int, bool]:
+    stmt = update(Transaction).where(Transaction.id.in_(_ids_param(tx_ids)))
+    if where is not None:
+        stmt = stmt.where(where)
+    stmt = (
+        stmt.values(reviewed_at=reviewed_at)
+        .returning(Transaction.id, Transaction.reviewed_at)
+        .execution_options(synchronize_session=False)
+    )
+    changed = {tx_id: reviewed_at is not None for tx_id, reviewed_at in session.execute(stmt)}
+    # Expires the session's objects, so none keeps a stale reviewed_at
+    session.commit()
+    return changed
+
+
+def set_reviewed(session: Session, tx_ids, reviewed: bool) -> list[int]:
+    """Mark transactions reviewed (now) or unreviewed in one UPDATE and commit.
+
+    Transactions already in that state keep their reviewed_at. Returns the ids
+    that changed.
+    """
+    if reviewed:
+        now = literal(datetime.datetime.now(), Transaction.reviewed_at.type)
+        changed = _update_reviewed(session, tx_ids, now, Transaction.reviewed_at.is_(None))
+    else:
+        changed = _update_reviewed(session, tx_ids, None, Transaction.reviewed_at.is_not(None))
+    return list(changed)
+
+
+def toggle_reviewed_many(session: Session, tx_ids) -> dict[int, bool]:
+    """Toggle reviewed_at on transactions in one UPDATE and commit, like toggle_reviewed.
+
+    Returns whether each transaction is reviewed now, by id.
+    """
+    now = literal(datetime.datetime.now(), Transaction.reviewed_at.type)
+    return _update_reviewed(
+        session, tx_ids, case((Transaction.reviewed_at.is_(None), now), else_=None)
+    )
+
+
+# --- CSV import pipeline ---
+
+# Number of transactions flushed to the database at a time during an import.
+IMPORT_CHUNK_SIZE = 1000
+
+
+class ImportProgress(NamedTuple):
+    """Snapshot passed to the progress callback of import_csv_transactions after each chunk."""
+
+    rows_parsed: int
+    rows_inserted: int
+    bytes_read: int
+    bytes_total: int
+
+
+class ImportCancelled(Exception):
+    """Raised by a progress callback to abort an import; the import is rolled back."""
+
+
+def _read_csv_rows(f, importer: CSVImporter):
+    """Yield the non-blank data rows of an open CSV file, one at a time."""
+    reader = csv.reader(f, delimiter=importer.config.parser.delimiter)
+
+    for _ in range(importer.config.parser.skip_rows):
+        next(reader, None)
+
+    for row in reader:
+        if not row or all(not cell.strip() for cell in row):
+            continue
+        yield row
+
+
+def _parse_rows(importer: CSVImporter, rows):
+    """Evaluate the importer's mappings for each row."""
+    for row in rows:
+        yield importer.parse_row(row)
+
+
+def _build_transaction_params(account_id: int, records):
+    """Validate parsed mapping results and turn them into transactions-table rows.
+
+    Yields plain parameter dicts for a Core INSERT; a fresh import never needs the
+    ORM's unit-of-work or relationship bookkeeping.
+    """
+    for data in records:
+        ts = data["timestamp"]
+        if isinstance(ts, str):
+            try:
+                ts = datetime.datetime.fromisoformat(ts.replace(" ", "T"))
+            except ValueError:
+                ts = datetime.datetime.strptime(ts, "%Y-%m-%d")
+        elif ts.tzinfo is not None:
+            # CEL hands the wall-clock time back tagged with the local offset; keep the
+            # wall-clock time, or dates (and fingerprints) would depend on the machine
+            ts = ts.replace(tzinfo=None)
+
+        yield {
+            "account_id": account_id,
+            "description": str(data["description"]),
+            "original_value": float(data["amount_original"]),
+            "original_currency": Currency(data["currency_original"]),
+            "value_in_account_currency": float(data["amount_in_account_currency"]),
+            "date": ts,
+        }
+
+
+def _fingerprint_key(account_id: int, date: datetime.datetime, amount, description: str) -> str:
+    """Identity of an imported row, before disambiguating identical rows."""
+    normalized = " ".join(description.casefold().split())
+    amount = Decimal(str(amount)).quantize(Decimal("0.01"))
+    return f"{account_id}|{date.isoformat()}|{amount}|{normalized}"
+
+
+def _import_fingerprint(key: str, ordinal: int, segment: int = 0) -> str:
+    """Fingerprint stored in Transaction.import_fingerprint."""
+    if segment:
+        return hashlib.sha1(f"{key}|{segment}.{ordinal}".encode("utf-8")).hexdigest()
+    return hashlib.sha1(f"{key}|{ordinal}".encode("utf-8")).hexdigest()
+
+
+def _add_fingerprints(params):
+    """Attach an import_fingerprint to each row.
+
+    Identical rows within one file (same account, date, amount and description) get
+    increasing ordinals, so genuine repeats are kept apart while a re-import of the
+    same file reproduces the same fingerprints.
+
+    Ordinals are only counted within a run of rows sharing a date, so memory stays
+    flat however long the file is. That is exact while the dates only rise or only
+    fall, as in bank exports. Where they turn back, a new segment starts whose
+    number is part of the fingerprints, keeping rows of different segments apart.
+    """
+    # Keyed by digest rather than by the key string to keep the per-row cost small
+    seen: dict[bytes, int] = {}
+    run_date = None
+    direction = 0  # 1 while dates rise, -1 while they fall, 0 until the segment's second date
+    segment = 0
+    for p in params:
+        date = p["date"]
+        if date != run_date:
+            if run_date is not None:
+                step = 1 if date > run_date else -1
+                if direction and step != direction:
+                    segment += 1
+                    direction = 0
+                else:
+                    direction = step
+            run_date = date
+            seen.clear()
+        key = _fingerprint_key(
+            p["account_id"], date, p["value_in_account_currency"], p["description"]
+        )
+        digest = hashlib.sha1(key.encode("utf-8")).digest()
+        ordinal = seen.get(digest, 0)
+        seen[digest] = ordinal + 1
+        p["import_fingerprint"] = _import_fingerprint(key, ordinal, segment)
+        yield p
+
+
+def _without_existing(session: Session, params: list[dict]) -> list[dict]:
+    """Drop rows whose fingerprint is already stored, using one indexed lookup per chunk."""
+    existing = set(
+        session.execute(
+            select(Transaction.import_fingerprint).where(
+                Transaction.import_fingerprint.in_([p["import_fingerprint"] for p in params])
+            )
+        ).scalars()
+    )
+    if not existing:
+        return params
+    return [p for p in params if p["import_fingerprint"] not in existing]
+
+
+def _insert_transaction_rows(session: Session, params: list[dict]) -> None:
+    """Insert a chunk of transaction rows with a single executemany statement."""
+    session.execute(insert(Transaction.__table__), params)
+
+
+def _max_transaction_id(session: Session) -> int:
+    return session.execute(select(func.max(Transaction.id))).scalar() or 0
+
+
+def _record_imported(session: Session, first_id: int, changes: ChangeSet | None):
+    """Add the rows inserted since first_id to changes, if given.
+
+    SQLite gives new rows the next id after the highest, so they form a range.
+    Past LAYOUT_PATCH_UNITS rows, changes asks for a reload instead of holding
+    every id of a possibly huge import.
+    """
+    if changes is None:
+        return
+    last_id = _max_transaction_id(session)
+    if last_id - first_id + 1 > LAYOUT_PATCH_UNITS:
+        changes.reload = True
+    else:
+        changes.inserted.update(range(first_id, last_id + 1))
+
+
+def _chunked(iterable, size: int):
+    """Yield lists of up to size items from iterable."""
+    it = iter(iterable)
+    while chunk := list(itertools.islice(it, size)):
+        yield chunk
+
+
+class ImportJob(NamedTuple):
+    """A CSV file to import and the account it goes to, as plain values.
+
+    Built from the Account on the thread owning the session, so that a worker
+    thread can parse the file without touching the ORM object.
+    """
+
+    csv_path: str
+    account_id: int
+    spec_path: str
+
+    @classmethod
+    def for_account(cls, csv_path: str, account: Account) -> "ImportJob":
+        spec_path = os.path.join(registry.SPECS_DIR, account.mapping_spec)
+        return cls(csv_path, account.id, os.path.abspath(spec_path))
+
+
+def _write_import_rows(
+    session: Session,
+    params,
+    chunk_size: int,
+    on_chunk: Callable[[int, int], None] | None = None,
+) -> tuple[int, int]:
+    """Insert rows chunk by chunk, skipping already-imported ones.
+
+    on_chunk, if given, is called with the running (inserted, skipped) totals after
+    every chunk. Returns the final (inserted, skipped).
+
+    The rows are inserted with the bulk import flag set, so the balance and search
+    index triggers skip them; BULK_IMPORT_STATEMENTS then catch up for all of them.
+    """
+    inserted = skipped = 0
+    first_id = _max_transaction_id(session) + 1
+    # Part of the import's transaction, so a rollback clears the flag again
+    session.execute(text(f"UPDATE {BULK_IMPORT_TABLE} SET active = 1"))
+    for chunk in _chunked(params, chunk_size):
+        new_rows = _without_existing(session, chunk)
+        if new_rows:
+            _insert_transaction_rows(session, new_rows)
+        inserted += len(new_rows)
+        skipped += len(chunk) - len(new_rows)
+        if on_chunk is not None:
+            on_chunk(inserted, skipped)
+    if inserted:
+        for statement in BULK_IMPORT_STATEMENTS:
+            session.execute(text(statement), {"first_id": first_id})
+    session.execute(text(f"UPDATE {BULK_IMPORT_TABLE} SET active = 0"))
+    return inserted, skipped
+
+
+def _read_csv_file(
+    job: ImportJob,
+    write: Callable[[object, Callable[[int, int], None] | None], tuple[int, int]],
+    progress: Callable[[ImportProgress], None] | None = None,
+) -> tuple[int, int]:
+    """Stream job's file through reader -> parse -> build into write(params, on_chunk).
+
+    write consumes the rows like _write_import_rows and returns (written, skipped);
+    progress, if given, is called from its on_chunk callback.
+    Raises FileNotFoundError if the file doesn't exist.
     Raises ValueError if no transactions found.
     """
-    csv_path = os.path.expanduser(csv_path)
+    csv_path = os.path.expanduser(job.csv_path)
     if not os.path.exists(csv_path):
         raise FileNotFoundError(f"File not found: {csv_path}")
 
-    spec_path = os.path.join("./importers", account.mapping_spec)
-    importer = CSVImporter(spec_path)
-    new_txs = []
+    importer = registry.get_importer(job.spec_path)
+    bytes_total = os.path.getsize(csv_path)
+
+    with open(csv_path, mode="r", encoding="utf-8", newline="") as f:
+        rows = _read_csv_rows(f, importer)
+        params = _add_fingerprints(
+            _build_transaction_params(job.account_id, _parse_rows(importer, rows))
+        )
+
+        def on_chunk(written: int, skipped: int):
+            # The text layer reads ahead in blocks, so bytes_read is approximate
+            bytes_read = min(f.buffer.tell(), bytes_total)
+            progress(ImportProgress(written + skipped, written, bytes_read, bytes_total))
+
+        written, skipped = write(params, on_chunk if progress is not None else None)
+
+    if written + skipped == 0:
+        raise ValueError("No transactions found in file.")
+    return written, skipped
+
+
+def import_csv_transactions(
+    session: Session,
+    csv_path: str,
+    account: Account,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    progress: Callable[[ImportProgress], None] | None = None,
+    changes: ChangeSet | None = None,
+) -> tuple[int, int]:
+    """Parse a CSV file using the account's mapping spec, insert transactions, and commit.
+
+    The file is streamed through reader -> parse -> build and inserted in chunks of
+    chunk_size rows (one executemany per chunk), so memory use does not grow with the
+    file size. All chunks are written inside one transaction: either the whole file
+    is imported or nothing is.
 
-    with open(csv_path, mode="r", encoding="utf-8") as f:
-        reader = csv.reader(f, delimiter=importer.config.parser.delimiter)
+    Rows that were already imported (matched by import_fingerprint) are skipped, so
+    overlapping exports can be imported repeatedly.
 
-        for _ in range(importer.config.parser.skip_rows):
-            next(reader)
+    If given, progress is called with an ImportProgress after every chunk. It may
+    raise ImportCancelled (or any other exception) to abort and roll back the import.
 
-        for row in reader:
-            if not row or all(not cell.strip() for cell in row):
-                continue
+    Returns (inserted, skipped).
+    Raises FileNotFoundError if csv_path doesn't exist.
+    Raises ValueError if no transactions found.
+    """
+    job = ImportJob.for_account(csv_path, account)
+    first_id = _max_transaction_id(session) + 1
+
+    try:
+        inserted, skipped = _read_csv_file(
+            job,
+            lambda params, on_chunk: _write_import_rows(session, params, chunk_size, on_chunk),
+            progress,
+        )
+        _record_imported(session, first_id, changes)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    return inserted, skipped
 
-            data = importer.parse_row(row)
 
-            ts = data["timestamp"]
-            if isinstance(ts, str):
-                try:
-                    ts = datetime.datetime.fromisoformat(ts.replace(" ", "T"))
-                except ValueError:
-                    ts = datetime.datetime.strptime(ts, "%Y-%m-%d")
+# --- Batch import ---
 
-            tx = Transaction(
-                account_id=account.id,
-                description=str(data["description"]),
-                original_value=float(data["amount_original"]),
-                original_currency=Currency(data["currency_original"]),
-                value_in_account_currency=float(data["amount_in_account_currency"]),
-                date=ts,
+_GLOB_CHARS = set("*?[")
+
+
+def expand_import_glob(pattern: str) -> list[str]:
+    """Return the files matching a glob pattern (with ~ expanded), sorted by path."""
+    pattern = os.path.expanduser(pattern)
+    return sorted(p for p in glob.glob(pattern) if os.path.isfile(p))
+
+
+def is_glob_pattern(path: str) -> bool:
+    """Whether path is to be expanded as a glob pattern.
+
+    A path naming an existing file is taken literally even if it holds glob
+    characters, like statement[1].csv.
+    """
+    if os.path.exists(os.path.expanduser(path)):
+        return False
+    return any(c in _GLOB_CHARS for c in path)
+
+
+def _init_import_worker(cache_path: str | None):
+    # Share the parent's spec cache, which already holds the specs of this batch
+    registry.CACHE_PATH = cache_path
+
+
+def parse_csv_file(csv_path: str, spec_path: str, account_id: int) -> list[dict]:
+    """Parse a whole CSV file into validated, fingerprinted transaction rows.
+
+    Runs in a worker process during import_csv_batch, so it only takes and returns
+    picklable values and loads the mapping spec itself.
+    """
+    importer = registry.get_importer(spec_path)
+    try:
+        with open(csv_path, mode="r", encoding="utf-8", newline="") as f:
+            rows = _read_csv_rows(f, importer)
+            return list(
+                _add_fingerprints(_build_transaction_params(account_id, _parse_rows(importer, rows)))
             )
-            new_txs.append(tx)
+    except ValueError as e:
+        raise ValueError(f"{os.path.basename(csv_path)}: {e}") from e
+
+
+def _read_csv_batch(
+    jobs: list[ImportJob],
+    write: Callable[[list[dict]], tuple[int, int]],
+    max_workers: int | None = None,
+    progress: Callable[[ImportProgress], None] | None = None,
+) -> list[tuple[int, int]]:
+    """Parse the jobs' files in worker processes, passing each file's rows to write.
+
+    write is called in this process, once per file as it is parsed, and returns
+    (written, skipped). progress, if given, is called after each file is written.
+    Returns (written, skipped) per job, in the order of jobs.
+    Raises FileNotFoundError if a file doesn't exist.
+    Raises ValueError if no transactions were found in any file.
+    """
+    paths = [os.path.expanduser(job.csv_path) for job in jobs]
+    for path in paths:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"File not found: {path}")
+
+    sizes = [os.path.getsize(p) for p in paths]
+    bytes_total = sum(sizes)
+    results: list[tuple[int, int]] = [(0, 0)] * len(jobs)
+    rows_parsed = rows_written = bytes_read = 0
+
+    for spec_path in {job.spec_path for job in jobs}:
+        registry.get_mapping(spec_path)  # validate up front and populate the disk cache
+
+    # spawn: the app runs worker threads, which don't mix well with fork()
+    executor = ProcessPoolExecutor(
+        max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_import_worker,
+        initargs=(registry.CACHE_PATH,),
+    )
+    try:
+        futures = {
+            executor.submit(parse_csv_file, path, job.spec_path, job.account_id): i
+            for i, (path, job) in enumerate(zip(paths, jobs))
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            written, skipped = write(future.result())
+            results[i] = (written, skipped)
+
+            rows_parsed += written + skipped
+            rows_written += written
+            bytes_read += sizes[i]
+            if progress is not None:
+                progress(ImportProgress(rows_parsed, rows_written, bytes_read, bytes_total))
+
+        if rows_parsed == 0:
+            raise ValueError("No transactions found in files.")
+    except Exception:
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    finally:
+        executor.shutdown()
+    return results
+
+
+def import_csv_batch(
+    session: Session,
+    jobs: list[tuple[str, Account]],
+    max_workers: int | None = None,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    progress: Callable[[ImportProgress], None] | None = None,
+    changes: ChangeSet | None = None,
+) -> list[tuple[int, int]]:
+    """Import several CSV files, parsing them in parallel worker processes.
+
+    jobs is a list of (csv_path, account) pairs. CEL evaluation is CPU-bound, so each
+    file is parsed in its own process; the parsed rows are funnelled back to this
+    process, which is the only one writing to the database. Each file's rows are held
+    in memory until written, so use import_csv_transactions for single huge files.
+
+    The whole batch is one transaction: if any file fails, nothing is imported.
+    progress, if given, is called after each file is written; bytes_read then counts
+    the sizes of the files completed so far.
+
+    Returns (inserted, skipped) per job, in the order of jobs.
+    Raises FileNotFoundError if a file doesn't exist.
+    Raises ValueError if no transactions were found in any file.
+    """
+    import_jobs = [ImportJob.for_account(path, account) for path, account in jobs]
+    first_id = _max_transaction_id(session) + 1
+    try:
+        results = _read_csv_batch(
+            import_jobs,
+            lambda rows: _write_import_rows(session, rows, chunk_size),
+            max_workers,
+            progress,
+        )
+        _record_imported(session, first_id, changes)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    return results
 
-    if not new_txs:
-        raise ValueError("No transactions found in file.")
 
-    session.add_all(new_txs)
-    session.commit()
-    return len(new_txs)
+# --- Background import ---
+
+
+class StagedImport:
+    """Rows of a background import, held apart from the app's database until merged.
+
+    stage_csv_import and stage_csv_batch parse files into a temporary SQLite
+    database with a connection of its own, so the worker thread running them never
+    touches the app's connection and the app sees none of the rows yet.
+    merge_staged_import then writes them from the thread owning the session, in one
+    transaction. Closing a staged import without merging it discards the rows.
+    """
+
+    _COLUMNS = (
+        "import_fingerprint", "account_id", "description", "original_value",
+        "original_currency", "value_in_account_currency", "date",
+    )
+
+    def __init__(self):
+        # An empty file name opens a private temporary database, spilled to disk as it grows
+        self._conn = sqlite3.connect("", check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE staged_rows ("
+            "import_fingerprint TEXT PRIMARY KEY, account_id INTEGER NOT NULL, "
+            "description TEXT NOT NULL, original_value REAL NOT NULL, "
+            "original_currency TEXT NOT NULL, value_in_account_currency REAL NOT NULL, "
+            "date TEXT NOT NULL)"
+        )
+        self.rows_parsed = 0
+        self.rows_staged = 0
+
+    def write_rows(
+        self,
+        params,
+        chunk_size: int = IMPORT_CHUNK_SIZE,
+        on_chunk: Callable[[int, int], None] | None = None,
+    ) -> tuple[int, int]:
+        """Stage rows chunk by chunk, like _write_import_rows writes them.
+
+        A row repeating an already staged fingerprint (the same row in two files of
+        a batch) is skipped. Returns (staged, skipped).
+        """
+        staged = skipped = 0
+        insert_row = (
+            f"INSERT OR IGNORE INTO staged_rows ({', '.join(self._COLUMNS)}) "
+            f"VALUES ({', '.join('?' for _ in self._COLUMNS)})"
+        )
+        for chunk in _chunked(params, chunk_size):
+            before = self._conn.total_changes
+            self._conn.executemany(insert_row, (
+                (
+                    p["import_fingerprint"], p["account_id"], p["description"],
+                    p["original_value"], p["original_currency"].value,
+                    p["value_in_account_currency"], p["date"].isoformat(),
+                )
+                for p in chunk
+            ))
+            new = self._conn.total_changes - before
+            staged += new
+            skipped += len(chunk) - new
+            if on_chunk is not None:
+                on_chunk(staged, skipped)
+        self.rows_parsed += staged + skipped
+        self.rows_staged += staged
+        return staged, skipped
+
+    def rows(self):
+        """Yield the staged rows as transactions-table rows, in the order they were staged."""
+        for row in self._conn.execute(
+            f"SELECT {', '.join(self._COLUMNS)} FROM staged_rows ORDER BY rowid"
+        ):
+            p = dict(zip(self._COLUMNS, row))
+            p["original_currency"] = Currency(p["original_currency"])
+            p["date"] = datetime.datetime.fromisoformat(p["date"])
+            yield p
+
+    def close(self):
+        self._conn.close()
+
+
+def stage_csv_import(
+    staged: StagedImport,
+    job: ImportJob,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    progress: Callable[[ImportProgress], None] | None = None,
+) -> None:
+    """Parse a CSV file into staged, streaming it like import_csv_transactions.
+
+    progress gets the rows staged so far as rows_inserted and may raise
+    ImportCancelled to abort.
+    Raises FileNotFoundError if the file doesn't exist.
+    Raises ValueError if no transactions found.
+    """
+    _read_csv_file(
+        job, lambda params, on_chunk: staged.write_rows(params, chunk_size, on_chunk), progress
+    )
+
+
+def stage_csv_batch(
+    staged: StagedImport,
+    jobs: list[ImportJob],
+    max_workers: int | None = None,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    progress: Callable[[ImportProgress], None] | None = None,
+) -> None:
+    """Parse several CSV files into staged in parallel worker processes, like import_csv_batch."""
+    _read_csv_batch(jobs, lambda rows: staged.write_rows(rows, chunk_size), max_workers, progress)
+
+
+def merge_staged_import(
+    session: Session,
+    staged: StagedImport,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    changes: ChangeSet | None = None,
+) -> tuple[int, int]:
+    """Insert the staged rows, skipping already-imported ones, and commit.
+
+    All rows are written in one transaction, so either all of them are imported or
+    none is. Rows skipped while staging count as skipped.
+    Returns (inserted, skipped).
+    """
+    first_id = _max_transaction_id(session) + 1
+    try:
+        inserted, skipped = _write_import_rows(session, staged.rows(), chunk_size)
+        _record_imported(session, first_id, changes)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    return inserted, skipped + staged.rows_parsed - staged.rows_staged
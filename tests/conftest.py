@@ -3,10 +3,20 @@ from datetime import datetime
 from decimal import Decimal
 
 import db
+from importers import registry
 from models.base import Base
 from models.finance import Account, Currency, Transaction
 
 
+@pytest.fixture(autouse=True)
+def spec_registry(tmp_path, monkeypatch):
+    """Keep the mapping spec registry's disk cache inside the test's tmp dir."""
+    monkeypatch.setattr(registry, "CACHE_PATH", str(tmp_path / "spec-cache" / "specs.json"))
+    registry.clear()
+    yield registry
+    registry.clear()
+
+
 @pytest.fixture()
 def memory_db():
     """Set up a fresh in-memory SQLite DB, bypassing Alembic stamp."""
@@ -26,6 +36,24 @@ def memory_db():
     db.db_file_path = None
 
 
+@pytest.fixture()
+def direct_db(tmp_path):
+    """Open a new database file in direct mode; returns its path."""
+    path = str(tmp_path / "direct.db")
+    db.open_db_direct(path)
+    db._dirty = False
+
+    yield path
+
+    if db.engine:
+        db.engine.dispose()
+    db.engine = None
+    db.SessionLocal = None
+    db._dirty = False
+    db._direct = False
+    db.db_file_path = None
+
+
 @pytest.fixture()
 def session(memory_db):
     """Provide a fresh SQLAlchemy session, closed on teardown."""
@@ -1,9 +1,14 @@
 import os
+import random
+import sqlite3
 import pytest
 
 import db
-from models.finance import Account, Currency, Transaction
+from models.finance import (
+    BALANCE_TRIGGERS, PARENT_FLAG_TRIGGERS, SEARCH_INDEX_TRIGGERS, Account, Currency, Transaction,
+)
 from datetime import datetime
+from decimal import Decimal
 
 
 class TestDirtyFlag:
@@ -67,3 +72,378 @@ class TestSaveAndLoad:
         path2 = str(tmp_path / "second.db")
         db.save_to_file(path2)
         assert db.db_file_path == path2
+
+
+def file_rows(path, table):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(f"SELECT * FROM {table} ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+
+def memory_rows(session, table):
+    return [tuple(row) for row in session.connection().exec_driver_sql(f"SELECT * FROM {table} ORDER BY id")]
+
+
+class TestAlembicHead:
+    def test_constant_matches_versions_directory(self):
+        from alembic.config import Config
+        from alembic.script import ScriptDirectory
+
+        assert db.ALEMBIC_HEAD == ScriptDirectory.from_config(Config("alembic.ini")).get_current_head()
+
+    def test_fresh_db_is_stamped_like_alembic_does(self):
+        from alembic.migration import MigrationContext
+
+        db.init_memory_db()
+        try:
+            with db.engine.connect() as conn:
+                assert MigrationContext.configure(conn).get_current_revision() == db.ALEMBIC_HEAD
+            assert not db.has_pending_migrations()
+        finally:
+            db.engine.dispose()
+
+    def test_unversioned_db_has_pending_migrations(self, memory_db):
+        assert db.has_pending_migrations()
+
+    def test_old_db_has_pending_migrations(self, tmp_path, monkeypatch):
+        from alembic import command
+        from alembic.config import Config
+
+        path = str(tmp_path / "old.db")
+        monkeypatch.setenv("FINVIEW_DB", path)
+        command.upgrade(Config("alembic.ini"), "6fae53338051")
+        db.load_db_from_file(path)
+        assert db.has_pending_migrations()
+        db.engine.dispose()
+
+
+class TestIncrementalSave:
+    @pytest.fixture()
+    def saved_path(self, session, sample_account, tmp_path):
+        path = str(tmp_path / "ledger.db")
+        db.save_to_file(path)
+        return path
+
+    @pytest.fixture()
+    def no_full_backup(self, monkeypatch):
+        def fail(target):
+            raise AssertionError("expected an incremental save")
+
+        monkeypatch.setattr(db, "_backup_to_file", fail)
+
+    def assert_file_matches_memory(self, session, path):
+        for table in ("accounts", "transactions"):
+            assert file_rows(path, table) == memory_rows(session, table)
+        search_rows = "SELECT rowid, * FROM transactions_search ORDER BY rowid"
+        conn = sqlite3.connect(path)
+        try:
+            assert conn.execute(search_rows).fetchall() == [
+                tuple(row) for row in session.connection().exec_driver_sql(search_rows)
+            ]
+        finally:
+            conn.close()
+
+    def test_resave_writes_only_changes(self, session, sample_account, saved_path, no_full_backup):
+        tx = session.query(Transaction).filter_by(description="Grocery Store").one()
+        tx.reviewed_at = datetime(2025, 3, 1)
+        session.commit()
+
+        db.save_to_file()
+
+        self.assert_file_matches_memory(session, saved_path)
+        assert not os.path.exists(saved_path + ".swp")
+
+    def test_resave_after_load_is_incremental(self, session, sample_account, saved_path, no_full_backup):
+        session.close()
+        db.load_db_from_file(saved_path)
+        session = db.SessionLocal()
+        session.add(Account(name="Later", currency=Currency.EUR))
+        session.commit()
+
+        db.save_to_file()
+
+        self.assert_file_matches_memory(session, saved_path)
+        session.close()
+
+    def test_random_changes_round_trip(self, session, sample_account, saved_path, no_full_backup):
+        import queries
+
+        rng = random.Random(17)
+        for step in range(40):
+            txs = session.query(Transaction).all()
+            free = [t for t in txs if t.merge_parent_id is None and not t.is_merge_parent]
+            op = rng.randrange(5)
+            if op == 0 or len(free) < 3:
+                session.add(Transaction(
+                    account_id=sample_account.id, description=f"Step {step}",
+                    original_value=Decimal("1.25"), original_currency=Currency.CHF,
+                    value_in_account_currency=Decimal("1.25"), date=datetime(2025, 2, 1),
+                ))
+            elif op == 1:
+                rng.choice(txs).reviewed_at = datetime(2025, 3, step % 28 + 1)
+            elif op == 2:
+                session.delete(rng.choice(free))
+            elif op == 3:
+                queries.create_merge(session, [t.id for t in rng.sample(free, 2)], f"Group {step}")
+            else:
+                children = [t for t in txs if t.merge_parent_id is not None]
+                if children:
+                    queries.remove_from_merge(session, rng.choice(children).id)
+            session.commit()
+            if step % 4 == 0:
+                db.save_to_file()
+                self.assert_file_matches_memory(session, saved_path)
+
+        db.save_to_file()
+        self.assert_file_matches_memory(session, saved_path)
+        # The file keeps its triggers working after incremental saves
+        assert {name for (name,) in sqlite3.connect(saved_path).execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+        )} == {
+            trigger.split()[2] for trigger in BALANCE_TRIGGERS + PARENT_FLAG_TRIGGERS + SEARCH_INDEX_TRIGGERS
+        }
+
+    def test_search_index_follows_replayed_rows(self, session, sample_account, saved_path, no_full_backup):
+        sample_account.name = "Renamed"
+        session.query(Transaction).filter_by(description="Salary").one().description = "Bonus"
+        session.delete(session.query(Transaction).filter_by(description="Grocery Store").one())
+        session.commit()
+
+        db.save_to_file()
+
+        self.assert_file_matches_memory(session, saved_path)
+
+    def test_other_target_gets_full_backup(self, session, sample_account, saved_path, tmp_path):
+        other = str(tmp_path / "other.db")
+        db.save_to_file(other)
+
+        self.assert_file_matches_memory(session, other)
+        assert db.db_file_path == other
+
+    def test_file_changed_on_disk_gets_full_backup(self, session, sample_account, saved_path, monkeypatch):
+        conn = sqlite3.connect(saved_path)
+        conn.execute("DELETE FROM transactions")
+        conn.commit()
+        conn.close()
+        backups = []
+        original = db._backup_to_file
+        monkeypatch.setattr(db, "_backup_to_file", lambda target: backups.append(original(target)))
+
+        db.save_to_file()
+
+        assert len(backups) == 1
+        self.assert_file_matches_memory(session, saved_path)
+
+    def test_failed_save_leaves_file_and_log_intact(self, session, sample_account, saved_path, no_full_backup):
+        # A unique index only the file has makes the replayed row fail half-way through
+        conn = sqlite3.connect(saved_path)
+        conn.execute("CREATE UNIQUE INDEX ix_unique_description ON transactions (description)")
+        conn.commit()
+        conn.close()
+        db._change_log_base = db._file_state(saved_path)
+        before = file_rows(saved_path, "transactions")
+        session.query(Transaction).filter_by(description="Salary").one().description = "Grocery Store"
+        session.commit()
+
+        with pytest.raises(sqlite3.IntegrityError):
+            db.save_to_file()
+
+        assert file_rows(saved_path, "transactions") == before
+        assert len(sqlite3.connect(saved_path).execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+        ).fetchall()) == len(BALANCE_TRIGGERS + PARENT_FLAG_TRIGGERS + SEARCH_INDEX_TRIGGERS)
+
+        # The change is still logged, so a later save writes it
+        conn = sqlite3.connect(saved_path)
+        conn.execute("DROP INDEX ix_unique_description")
+        conn.commit()
+        conn.close()
+        db._change_log_base = db._file_state(saved_path)
+        db.save_to_file()
+        self.assert_file_matches_memory(session, saved_path)
+
+
+class TestDirectMode:
+    @pytest.fixture()
+    def direct_session(self, direct_db):
+        s = db.SessionLocal()
+        yield s
+        s.close()
+
+    def test_new_file_gets_schema(self, direct_db):
+        assert file_rows(direct_db, "accounts") == []
+        assert not db.has_pending_migrations()
+
+    def test_changes_reach_file_only_on_save(self, direct_session, direct_db):
+        direct_session.add(Account(name="Direct", currency=Currency.CHF))
+        direct_session.commit()
+        assert file_rows(direct_db, "accounts") == []
+
+        db.save_to_file()
+
+        assert [row[1] for row in file_rows(direct_db, "accounts")] == ["Direct"]
+        assert db.db_file_path == direct_db
+
+    def test_rollback_only_undoes_uncommitted_work(self, direct_session):
+        direct_session.add(Account(name="Kept", currency=Currency.CHF))
+        direct_session.commit()
+        direct_session.add(Account(name="Dropped", currency=Currency.CHF))
+        direct_session.rollback()
+
+        assert [a.name for a in direct_session.query(Account)] == ["Kept"]
+
+    def test_closing_without_save_discards_changes(self, direct_session, direct_db):
+        direct_session.add(Account(name="Saved", currency=Currency.CHF))
+        direct_session.commit()
+        db.save_to_file()
+        direct_session.add(Account(name="Unsaved", currency=Currency.CHF))
+        direct_session.commit()
+        direct_session.close()
+        db.engine.dispose()
+
+        db.open_db_direct(direct_db)
+        reopened = db.SessionLocal()
+        assert [a.name for a in reopened.query(Account)] == ["Saved"]
+        reopened.close()
+
+    def test_triggers_run_inside_the_transaction(self, direct_session, direct_db):
+        acc = Account(name="Balance", currency=Currency.CHF)
+        direct_session.add(acc)
+        direct_session.flush()
+        direct_session.add(Transaction(
+            account_id=acc.id, description="Pay", original_value=Decimal("12.50"),
+            original_currency=Currency.CHF, value_in_account_currency=Decimal("12.50"),
+            date=datetime(2025, 1, 1),
+        ))
+        direct_session.commit()
+        db.save_to_file()
+
+        assert file_rows(direct_db, "accounts")[0][-1] == 1250
+
+    def test_save_to_other_path_is_refused(self, direct_session, tmp_path):
+        with pytest.raises(ValueError, match="opened directly"):
+            db.save_to_file(str(tmp_path / "copy.db"))
+
+    def test_migrations_are_saved_with_the_changes(self, tmp_path, monkeypatch):
+        from alembic import command
+        from alembic.config import Config
+
+        path = str(tmp_path / "old.db")
+        monkeypatch.setenv("FINVIEW_DB", path)
+        command.upgrade(Config("alembic.ini"), "6fae53338051")
+        db.open_db_direct(path)
+        try:
+            assert db.has_pending_migrations()
+            db.run_migrations()
+            assert db.is_dirty()
+            db.save_to_file()
+            db.engine.dispose()
+
+            db.open_db_direct(path)
+            assert not db.has_pending_migrations()
+        finally:
+            db.engine.dispose()
+            db._direct = False
+            db._dirty = False
+
+
+class TestAutosave:
+    @pytest.fixture()
+    def saved_path(self, session, tmp_path):
+        session.add(Account(name="Saved", currency=Currency.EUR))
+        session.commit()
+        path = str(tmp_path / "ledger.db")
+        db.save_to_file(path)
+        return path
+
+    def add_unsaved(self, session, name="Unsaved"):
+        session.add(Account(name=name, currency=Currency.EUR))
+        session.commit()
+        db.mark_dirty()
+
+    def test_nothing_due_without_changes(self, saved_path):
+        assert db.prepare_autosave() is None
+
+    def test_nothing_due_without_file(self, session):
+        self.add_unsaved(session)
+        assert db.prepare_autosave() is None
+
+    def test_nothing_due_in_direct_mode(self, direct_db):
+        db.mark_dirty()
+        assert db.prepare_autosave() is None
+
+    def test_snapshot_matches_memory(self, session, saved_path):
+        self.add_unsaved(session)
+        job = db.prepare_autosave()
+        job()
+
+        assert file_rows(db.autosave_path(saved_path), "accounts") == memory_rows(session, "accounts")
+        assert [row[1] for row in file_rows(saved_path, "accounts")] == ["Saved"]
+        assert not os.path.exists(db.autosave_path(saved_path) + ".tmp")
+        # Unchanged since the snapshot, so no new one is due
+        assert db.prepare_autosave() is None
+
+    def test_snapshot_includes_changes_made_after_prepare(self, session, saved_path, monkeypatch):
+        monkeypatch.setattr(db, "AUTOSAVE_PAGES", 1)
+        for i in range(200):
+            session.add(Account(name=f"Account {i:03d}" + "x" * 200, currency=Currency.EUR))
+        session.commit()
+        db.mark_dirty()
+        job = db.prepare_autosave()
+
+        real_connect = sqlite3.connect
+
+        def connect(path, *args, **kwargs):
+            # Simulate a write from the UI thread right as the copy starts
+            monkeypatch.setattr(db.sqlite3, "connect", real_connect)
+            self.add_unsaved(session, "During")
+            return real_connect(path, *args, **kwargs)
+
+        monkeypatch.setattr(db.sqlite3, "connect", connect)
+        job()
+
+        assert file_rows(db.autosave_path(saved_path), "accounts") == memory_rows(session, "accounts")
+
+    def test_save_removes_autosave(self, session, saved_path):
+        self.add_unsaved(session)
+        db.prepare_autosave()()
+        assert os.path.exists(db.autosave_path(saved_path))
+
+        db.save_to_file()
+
+        assert not os.path.exists(db.autosave_path(saved_path))
+
+    def test_snapshot_taken_before_save_is_dropped(self, session, saved_path):
+        self.add_unsaved(session)
+        job = db.prepare_autosave()
+        db.save_to_file()
+
+        job()
+
+        assert not os.path.exists(db.autosave_path(saved_path))
+
+    def test_newer_autosave(self, session, saved_path):
+        assert db.newer_autosave(saved_path) is None
+        self.add_unsaved(session)
+        db.prepare_autosave()()
+        os.utime(saved_path, (0, 0))
+
+        assert db.newer_autosave(saved_path) == db.autosave_path(saved_path)
+
+        os.utime(db.autosave_path(saved_path), (0, 0))
+        assert db.newer_autosave(saved_path) is None
+
+    def test_recover_and_save(self, session, saved_path):
+        self.add_unsaved(session)
+        db.prepare_autosave()()
+        session.close()
+
+        db.recover_autosave(saved_path)
+
+        assert db.db_file_path == saved_path
+        assert db.is_dirty()
+        db.save_to_file()
+        assert [row[1] for row in file_rows(saved_path, "accounts")] == ["Saved", "Unsaved"]
+        assert not os.path.exists(db.autosave_path(saved_path))
@@ -0,0 +1,511 @@
+"""Tests for the CSV import pipeline in queries.py."""
+
+import csv
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import func, select, text
+
+import queries
+from importers.engine import CSVImporter
+from importers.schema import ImporterMapping, ParserConfig
+from models.finance import Account, Currency, Transaction
+
+HEADER = ["Date", "Merchant", "Detail", "", "Currency", "Amount", "OrigCurrency", "OrigAmount"]
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+    return str(path)
+
+
+def swisscard_row(day, merchant, amount, currency="CHF"):
+    return [f"{day:02d}.01.2025", merchant, "", "", "CHF", amount, currency, amount]
+
+
+@pytest.fixture()
+def card_account(session):
+    acc = Account(name="Card", currency=Currency.CHF, mapping_spec="Swisscard/swisscard.yaml")
+    session.add(acc)
+    session.commit()
+    return acc
+
+
+@pytest.fixture()
+def zurich_time(monkeypatch):
+    monkeypatch.setenv("TZ", "Europe/Zurich")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def triggers(session):
+    return set(session.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'")).scalars())
+
+
+def bulk_import_active(session):
+    return session.execute(text("SELECT active FROM bulk_import")).scalar()
+
+
+def search_rows(session):
+    return session.execute(text("SELECT rowid, * FROM transactions_search ORDER BY rowid")).all()
+
+
+def tx_count(session, account):
+    return session.execute(
+        select(func.count(Transaction.id)).where(Transaction.account_id == account.id)
+    ).scalar()
+
+
+class TestChunkedImport:
+    def test_imports_across_multiple_chunks(self, session, card_account, tmp_path):
+        rows = [swisscard_row(d, f"Shop {d}", "10.00") for d in range(1, 8)]
+        path = write_csv(tmp_path / "tx.csv", rows)
+
+        inserted, skipped = queries.import_csv_transactions(
+            session, path, card_account, chunk_size=3
+        )
+
+        assert (inserted, skipped) == (7, 0)
+        assert tx_count(session, card_account) == 7
+
+    def test_failure_in_later_chunk_rolls_back_everything(self, session, card_account, tmp_path):
+        rows = [swisscard_row(d, f"Shop {d}", "10.00") for d in range(1, 6)]
+        rows.append(swisscard_row(6, "Bad currency", "10.00", currency="XYZ"))
+        path = write_csv(tmp_path / "tx.csv", rows)
+        before = triggers(session)
+
+        with pytest.raises(ValueError):
+            queries.import_csv_transactions(session, path, card_account, chunk_size=2)
+
+        assert tx_count(session, card_account) == 0
+        assert triggers(session) == before
+        assert search_rows(session) == []
+        assert queries.check_account_balances(session) == []
+        assert not bulk_import_active(session)
+
+    def test_import_keeps_balance_and_search_index(self, session, card_account, tmp_path):
+        session.add(Transaction(
+            account_id=card_account.id, description="Opening", original_value=Decimal("100.00"),
+            original_currency=Currency.CHF, value_in_account_currency=Decimal("100.00"),
+            date=datetime(2024, 12, 31),
+        ))
+        session.commit()
+        rows = [swisscard_row(d, f"Shop {d}", f"{d}.25") for d in range(1, 8)]
+        path = write_csv(tmp_path / "tx.csv", rows)
+        before = triggers(session)
+
+        queries.import_csv_transactions(session, path, card_account, chunk_size=3)
+
+        assert triggers(session) == before
+        assert not bulk_import_active(session)
+        assert queries.check_account_balances(session) == []
+        assert search_rows(session)[1:] == [
+            (i + 2, f"Shop {d}", "Card", f"{-d}.25") for i, d in enumerate(range(1, 8))
+        ]
+        assert queries.search_transaction_ids(session, "shop") == set(range(2, 9))
+
+    def test_blank_rows_skipped(self, session, card_account, tmp_path):
+        rows = [swisscard_row(1, "Shop", "10.00"), ["", "", ""], swisscard_row(2, "Shop", "5.00")]
+        path = write_csv(tmp_path / "tx.csv", rows)
+
+        assert queries.import_csv_transactions(session, path, card_account) == (2, 0)
+
+    def test_empty_file_raises(self, session, card_account, tmp_path):
+        path = write_csv(tmp_path / "tx.csv", [])
+
+        with pytest.raises(ValueError, match="No transactions"):
+            queries.import_csv_transactions(session, path, card_account)
+
+    def test_missing_file_raises(self, session, card_account, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            queries.import_csv_transactions(session, str(tmp_path / "nope.csv"), card_account)
+
+
+class TestCoreInsertPath:
+    def test_imported_rows_match_mapping(self, session, card_account, tmp_path):
+        rows = [["15.01.2025", "COOP", "COOP Zurich", "", "CHF", "42.50", "EUR", "40.00"]]
+        path = write_csv(tmp_path / "tx.csv", rows)
+
+        queries.import_csv_transactions(session, path, card_account)
+
+        tx = session.execute(select(Transaction)).scalar_one()
+        assert tx.account_id == card_account.id
+        assert tx.description == "COOP Zurich (COOP)"
+        assert tx.original_value == Decimal("-40.00")
+        assert tx.original_currency == Currency.EUR
+        assert tx.value_in_account_currency == Decimal("-42.50")
+        assert tx.date == datetime(2025, 1, 15)
+        assert tx.reviewed_at is None
+        assert tx.split_parent_id is None
+        assert tx.merge_parent_id is None
+
+    def test_timestamp_forms_normalized_to_naive_wall_clock(self):
+        base = {"description": "Shop", "amount_original": -1.0, "currency_original": "CHF",
+                "amount_in_account_currency": -1.0}
+        records = [
+            {**base, "timestamp": "2025-01-15"},
+            {**base, "timestamp": datetime(2025, 1, 15)},
+            {**base, "timestamp": datetime(2025, 1, 15, tzinfo=timezone.utc)},
+            {**base, "timestamp": datetime(2025, 1, 15, tzinfo=timezone(timedelta(hours=1)))},
+        ]
+
+        params = list(queries._build_transaction_params(1, records))
+
+        assert [p["date"] for p in params] == [datetime(2025, 1, 15)] * 4
+
+    def test_cel_date_keeps_the_day_outside_utc(self, zurich_time):
+        mappings = {
+            "timestamp": "row[0] != '' ? date(row[0], '%d.%m.%Y') : date('01.01.2000', '%d.%m.%Y')",
+            "description": "row[1]",
+            "amount_original": "double(row[2])",
+            "currency_original": "'CHF'",
+            "amount_in_account_currency": "double(row[2])",
+        }
+        importer = CSVImporter.from_config(ImporterMapping(
+            version="1.0", name="Compound", parser=ParserConfig(delimiter=",", skip_rows=0),
+            mappings=mappings,
+        ))
+
+        record = importer.parse_row(["15.03.2024", "Shop", "-1.0"])
+        params = list(queries._build_transaction_params(1, [record]))
+
+        assert record["timestamp"].utcoffset() == timedelta(hours=1)
+        assert params[0]["date"] == datetime(2024, 3, 15)
+
+    def test_invalid_timestamp_raises(self, session, card_account, tmp_path):
+        path = write_csv(tmp_path / "tx.csv", [["01.13.2025", "Shop", "", "", "CHF", "1.00", "", ""]])
+
+        with pytest.raises(ValueError):
+            queries.import_csv_transactions(session, path, card_account)
+
+        assert tx_count(session, card_account) == 0
+
+
+class TestDuplicateSafeReimport:
+    def test_reimport_same_file_skips_everything(self, session, card_account, tmp_path):
+        rows = [swisscard_row(d, f"Shop {d}", "10.00") for d in range(1, 5)]
+        path = write_csv(tmp_path / "tx.csv", rows)
+
+        assert queries.import_csv_transactions(session, path, card_account) == (4, 0)
+        assert queries.import_csv_transactions(session, path, card_account) == (0, 4)
+        assert tx_count(session, card_account) == 4
+
+    def test_overlapping_export_imports_only_new_rows(self, session, card_account, tmp_path):
+        first = write_csv(
+            tmp_path / "jan.csv", [swisscard_row(d, f"Shop {d}", "10.00") for d in range(1, 11)]
+        )
+        second = write_csv(
+            tmp_path / "feb.csv", [swisscard_row(d, f"Shop {d}", "10.00") for d in range(6, 16)]
+        )
+
+        queries.import_csv_transactions(session, first, card_account, chunk_size=3)
+        inserted, skipped = queries.import_csv_transactions(
+            session, second, card_account, chunk_size=3
+        )
+
+        assert (inserted, skipped) == (5, 5)
+        assert tx_count(session, card_account) == 15
+
+    def test_identical_rows_in_one_file_are_kept(self, session, card_account, tmp_path):
+        rows = [swisscard_row(3, "Coffee", "4.50")] * 3
+        path = write_csv(tmp_path / "tx.csv", rows)
+
+        assert queries.import_csv_transactions(session, path, card_account) == (3, 0)
+        # A later export with one more identical coffee only adds the new one
+        path = write_csv(tmp_path / "tx2.csv", rows + [swisscard_row(3, "Coffee", "4.50")])
+        assert queries.import_csv_transactions(session, path, card_account) == (1, 3)
+
+    def test_identical_rows_in_unsorted_file_are_kept(self, session, card_account, tmp_path):
+        # Dates go 3, 5, back to 3 and on to 4: the second coffee is in a new segment
+        rows = [
+            swisscard_row(3, "Coffee", "4.50"), swisscard_row(5, "Shop", "9.00"),
+            swisscard_row(3, "Coffee", "4.50"), swisscard_row(4, "Coffee", "4.50"),
+        ]
+        path = write_csv(tmp_path / "tx.csv", rows)
+
+        assert queries.import_csv_transactions(session, path, card_account) == (4, 0)
+        assert queries.import_csv_transactions(session, path, card_account) == (0, 4)
+
+    def test_ordinal_state_is_kept_per_date_only(self):
+        rows = (
+            {
+                "account_id": 1, "date": datetime(2025, 1, 1 + i // 100),
+                "value_in_account_currency": 1.0, "description": f"Shop {i % 100}",
+            }
+            for i in range(1000)
+        )
+        fingerprinted = queries._add_fingerprints(rows)
+        fingerprints = set()
+        for row in fingerprinted:
+            fingerprints.add(row["import_fingerprint"])
+            assert len(fingerprinted.gi_frame.f_locals["seen"]) <= 100
+
+        assert len(fingerprints) == 1000
+
+    def test_descending_file_keeps_fingerprints_of_ascending_one(self):
+        def rows(days):
+            return [
+                {"account_id": 1, "date": datetime(2025, 1, d), "value_in_account_currency": 1.0,
+                 "description": "Coffee"}
+                for d in days for _ in range(2)
+            ]
+
+        ascending = [r["import_fingerprint"] for r in queries._add_fingerprints(rows([1, 2, 3]))]
+        descending = [r["import_fingerprint"] for r in queries._add_fingerprints(rows([3, 2, 1]))]
+
+        assert sorted(ascending) == sorted(descending)
+        assert len(set(ascending)) == 6
+
+    def test_description_normalized(self, session, card_account, tmp_path):
+        path = write_csv(tmp_path / "a.csv", [swisscard_row(1, "Coffee  Shop", "4.50")])
+        queries.import_csv_transactions(session, path, card_account)
+
+        path = write_csv(tmp_path / "b.csv", [swisscard_row(1, "coffee shop", "4.50")])
+        assert queries.import_csv_transactions(session, path, card_account) == (0, 1)
+
+    def test_same_row_in_other_account_is_imported(self, session, card_account, tmp_path):
+        other = Account(name="Card 2", currency=Currency.CHF, mapping_spec=card_account.mapping_spec)
+        session.add(other)
+        session.commit()
+        path = write_csv(tmp_path / "tx.csv", [swisscard_row(1, "Shop", "10.00")])
+
+        queries.import_csv_transactions(session, path, card_account)
+        assert queries.import_csv_transactions(session, path, other) == (1, 0)
+
+    def test_migration_backfill_matches_importer(self):
+        import importlib.util
+        import os
+
+        path = os.path.join(
+            os.path.dirname(__file__), "..", "alembic", "versions",
+            "f08386d71f7b_add_import_fingerprint_to_transactions.py",
+        )
+        spec = importlib.util.spec_from_file_location("fingerprint_migration", path)
+        migration = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(migration)
+
+        args = (3, datetime(2025, 1, 15), Decimal("-42.5"), "  COOP  Zurich ")
+        key = queries._fingerprint_key(*args)
+        assert migration._fingerprint_key(*args) == key
+        assert migration._fingerprint(key, 1) == queries._import_fingerprint(key, 1)
+
+
+class TestImportProgress:
+    def test_progress_reported_per_chunk(self, session, card_account, tmp_path):
+        rows = [swisscard_row(d % 28 + 1, f"Shop {d}", "1.00") for d in range(25)]
+        path = write_csv(tmp_path / "tx.csv", rows)
+        updates = []
+
+        queries.import_csv_transactions(
+            session, path, card_account, chunk_size=10, progress=updates.append
+        )
+
+        assert [u.rows_parsed for u in updates] == [10, 20, 25]
+        assert updates[-1].rows_inserted == 25
+        assert 0 < updates[-1].bytes_read <= updates[-1].bytes_total
+
+    def test_cancel_from_progress_rolls_back(self, session, card_account, tmp_path):
+        rows = [swisscard_row(d % 28 + 1, f"Shop {d}", "1.00") for d in range(25)]
+        path = write_csv(tmp_path / "tx.csv", rows)
+
+        def cancel_after_first_chunk(p):
+            raise queries.ImportCancelled()
+
+        with pytest.raises(queries.ImportCancelled):
+            queries.import_csv_transactions(
+                session, path, card_account, chunk_size=10, progress=cancel_after_first_chunk
+            )
+
+        assert tx_count(session, card_account) == 0
+
+
+class TestBatchImport:
+    def test_imports_all_files_in_one_transaction(self, session, card_account, tmp_path):
+        paths = [
+            write_csv(tmp_path / f"tx{m}.csv", [swisscard_row(d, f"Shop {m}-{d}", "2.00") for d in range(1, 4)])
+            for m in range(3)
+        ]
+
+        results = queries.import_csv_batch(
+            session, [(p, card_account) for p in paths], max_workers=2
+        )
+
+        assert results == [(3, 0), (3, 0), (3, 0)]
+        assert tx_count(session, card_account) == 9
+
+    def test_duplicates_across_batch_runs_skipped(self, session, card_account, tmp_path):
+        path = write_csv(tmp_path / "a.csv", [swisscard_row(1, "Shop", "2.00")])
+        queries.import_csv_batch(session, [(path, card_account)], max_workers=1)
+
+        results = queries.import_csv_batch(session, [(path, card_account)], max_workers=1)
+
+        assert results == [(0, 1)]
+        assert tx_count(session, card_account) == 1
+
+    def test_bad_file_rolls_back_whole_batch(self, session, card_account, tmp_path):
+        good = write_csv(tmp_path / "good.csv", [swisscard_row(1, "Shop", "2.00")])
+        bad = write_csv(tmp_path / "bad.csv", [swisscard_row(1, "Shop", "2.00", currency="XYZ")])
+
+        with pytest.raises(ValueError, match="bad.csv"):
+            queries.import_csv_batch(
+                session, [(good, card_account), (bad, card_account)], max_workers=2
+            )
+
+        assert tx_count(session, card_account) == 0
+
+    def test_missing_file_raises_before_parsing(self, session, card_account, tmp_path):
+        good = write_csv(tmp_path / "good.csv", [swisscard_row(1, "Shop", "2.00")])
+
+        with pytest.raises(FileNotFoundError):
+            queries.import_csv_batch(
+                session, [(good, card_account), (str(tmp_path / "nope.csv"), card_account)]
+            )
+
+    def test_progress_reported_per_file(self, session, card_account, tmp_path):
+        paths = [
+            write_csv(tmp_path / f"tx{m}.csv", [swisscard_row(m + 1, "Shop", "2.00")]) for m in range(2)
+        ]
+        updates = []
+
+        queries.import_csv_batch(
+            session, [(p, card_account) for p in paths], max_workers=2, progress=updates.append
+        )
+
+        assert [u.rows_parsed for u in updates] == [1, 2]
+        assert updates[-1].bytes_read == updates[-1].bytes_total
+
+    def test_existing_file_with_glob_characters_is_literal(self, session, card_account, tmp_path):
+        path = write_csv(tmp_path / "statement[1].csv", [swisscard_row(1, "Shop", "2.00")])
+        (tmp_path / "statement1.csv").write_text("")
+
+        assert not queries.is_glob_pattern(path)
+        assert queries.is_glob_pattern(str(tmp_path / "statement[12].csv"))
+        assert queries.import_csv_transactions(session, path, card_account) == (1, 0)
+
+    def test_expand_import_glob_sorted_files_only(self, tmp_path):
+        for name in ("b.csv", "a.csv", "c.txt"):
+            (tmp_path / name).write_text("")
+        (tmp_path / "d.csv").mkdir()
+
+        assert queries.is_glob_pattern(str(tmp_path / "*.csv"))
+        assert not queries.is_glob_pattern(str(tmp_path / "a.csv"))
+        assert queries.expand_import_glob(str(tmp_path / "*.csv")) == [
+            str(tmp_path / "a.csv"), str(tmp_path / "b.csv"),
+        ]
+
+
+class TestImportChanges:
+    def all_ids(self, session):
+        return set(session.execute(select(Transaction.id)).scalars())
+
+    def test_records_inserted_ids(self, session, card_account, tmp_path):
+        path = write_csv(tmp_path / "a.csv", [swisscard_row(1, "Shop", "2.00")])
+        queries.import_csv_transactions(session, path, card_account)
+        before = self.all_ids(session)
+        rows = [swisscard_row(1, "Shop", "2.00")] + [swisscard_row(d, "Shop", "3.00") for d in range(2, 5)]
+        changes = queries.ChangeSet()
+
+        queries.import_csv_transactions(
+            session, write_csv(tmp_path / "b.csv", rows), card_account, changes=changes
+        )
+
+        assert changes.inserted == self.all_ids(session) - before
+        assert len(changes.inserted) == 3
+
+    def test_batch_records_inserted_ids(self, session, card_account, tmp_path):
+        paths = [write_csv(tmp_path / f"tx{m}.csv", [swisscard_row(m + 1, "Shop", "2.00")]) for m in range(2)]
+        changes = queries.ChangeSet()
+
+        queries.import_csv_batch(session, [(p, card_account) for p in paths], max_workers=1, changes=changes)
+
+        assert changes.inserted == self.all_ids(session)
+
+    def test_large_import_asks_for_a_reload(self, session, card_account, tmp_path):
+        count = queries.LAYOUT_PATCH_UNITS + 1
+        rows = [swisscard_row(d % 28 + 1, f"Shop {d}", "1.00") for d in range(count)]
+        path = write_csv(tmp_path / "tx.csv", rows)
+        changes = queries.ChangeSet()
+
+        queries.import_csv_transactions(session, path, card_account, changes=changes)
+
+        assert changes.reload
+        assert changes.inserted == set()
+
+    def test_failed_import_records_nothing(self, session, card_account, tmp_path):
+        path = write_csv(tmp_path / "bad.csv", [swisscard_row(1, "Shop", "2.00", currency="XYZ")])
+        changes = queries.ChangeSet()
+
+        with pytest.raises(ValueError):
+            queries.import_csv_transactions(session, path, card_account, changes=changes)
+
+        assert not changes
+
+
+class TestStagedImport:
+    def staged_file(self, card_account, path, chunk_size=queries.IMPORT_CHUNK_SIZE):
+        staged = queries.StagedImport()
+        job = queries.ImportJob.for_account(path, card_account)
+        queries.stage_csv_import(staged, job, chunk_size=chunk_size)
+        return staged
+
+    def test_rows_reach_the_database_only_when_merged(self, session, card_account, tmp_path):
+        rows = [swisscard_row(d, f"Shop {d}", "2.00") for d in range(1, 6)]
+        staged = self.staged_file(card_account, write_csv(tmp_path / "a.csv", rows), chunk_size=2)
+        assert tx_count(session, card_account) == 0
+
+        changes = queries.ChangeSet()
+        assert queries.merge_staged_import(session, staged, changes=changes) == (5, 0)
+        staged.close()
+
+        assert tx_count(session, card_account) == 5
+        assert len(changes.inserted) == 5
+        assert queries.check_account_balances(session) == []
+        assert len(search_rows(session)) == 5
+
+    def test_staged_rows_keep_file_order_and_values(self, session, card_account, tmp_path):
+        path = write_csv(tmp_path / "a.csv", [swisscard_row(3, "Late", "2.50"), swisscard_row(1, "Early", "1.00")])
+        staged = self.staged_file(card_account, path)
+
+        queries.merge_staged_import(session, staged)
+        staged.close()
+
+        txs = session.execute(select(Transaction).order_by(Transaction.id)).scalars().all()
+        assert [(t.description, t.date, t.original_currency) for t in txs] == [
+            ("Late", datetime(2025, 1, 3), Currency.CHF),
+            ("Early", datetime(2025, 1, 1), Currency.CHF),
+        ]
+
+    def test_merge_skips_already_imported_rows(self, session, card_account, tmp_path):
+        path = write_csv(tmp_path / "a.csv", [swisscard_row(1, "Shop", "2.00")])
+        queries.import_csv_transactions(session, path, card_account)
+        rows = [swisscard_row(1, "Shop", "2.00"), swisscard_row(2, "Shop", "3.00")]
+        staged = self.staged_file(card_account, write_csv(tmp_path / "b.csv", rows))
+
+        assert queries.merge_staged_import(session, staged) == (1, 1)
+        staged.close()
+
+    def test_rows_repeated_across_batch_files_count_as_skipped(self, session, card_account, tmp_path):
+        paths = [write_csv(tmp_path / f"{name}.csv", [swisscard_row(1, "Shop", "2.00")]) for name in "ab"]
+        staged = queries.StagedImport()
+        queries.stage_csv_batch(
+            staged, [queries.ImportJob.for_account(p, card_account) for p in paths], max_workers=1
+        )
+
+        assert queries.merge_staged_import(session, staged) == (1, 1)
+        staged.close()
+        assert tx_count(session, card_account) == 1
+
+    def test_closing_without_merge_leaves_database_untouched(self, session, card_account, tmp_path):
+        path = write_csv(tmp_path / "a.csv", [swisscard_row(1, "Shop", "2.00")])
+
+        self.staged_file(card_account, path).close()
+
+        assert tx_count(session, card_account) == 0
+        assert search_rows(session) == []
@@ -1,9 +1,12 @@
 import os
+from datetime import datetime, timezone
+
+import cel
 import pytest
 from pydantic import ValidationError
 
-from importers.schema import ImporterMapping, DataMapping, ParserConfig
-from importers.engine import CSVImporter
+from importers.schema import ImporterMapping, DataMapping, FieldSpec, ParserConfig
+from importers.engine import CSVImporter, _date, _double, _split
 
 
 SWISSCARD_PATH = os.path.join(
@@ -52,7 +55,7 @@ class TestCSVImporterParseRow:
         ]
         result = importer.parse_row(row)
 
-        assert result["timestamp"] == "2025-01-15"
+        assert result["timestamp"] == datetime(2025, 1, 15)
         assert "COOP Zurich" in result["description"]
         assert "COOP Store" in result["description"]
         assert result["amount_original"] == -42.50
@@ -72,7 +75,7 @@ class TestCSVImporterParseRow:
         ]
         result = importer.parse_row(row)
 
-        assert result["timestamp"] == "2025-02-20"
+        assert result["timestamp"] == datetime(2025, 2, 20)
         assert result["description"] == "SBB Ticket"
         assert result["amount_original"] == -15.00
         assert result["currency_original"] == "CHF"
@@ -99,3 +102,209 @@ class TestCSVImporterErrors:
     def test_invalid_yaml_path(self):
         with pytest.raises(FileNotFoundError):
             CSVImporter("/nonexistent/path.yaml")
+
+
+class TestCSVImporterCompilation:
+    def test_mappings_compiled_once_at_load(self):
+        importer = CSVImporter(SWISSCARD_PATH)
+        assert set(importer._programs) == set(DataMapping.model_fields)
+
+    def test_invalid_expression_rejected_at_load(self, tmp_path):
+        spec = tmp_path / "broken.yaml"
+        spec.write_text(
+            'version: "1.0"\n'
+            "name: Broken\n"
+            "parser: {delimiter: ',', skip_rows: 0}\n"
+            "mappings:\n"
+            "  timestamp: \"row[0\"\n"
+            "  description: \"row[1]\"\n"
+            "  amount_original: \"double(row[2])\"\n"
+            "  currency_original: \"'CHF'\"\n"
+            "  amount_in_account_currency: \"double(row[2])\"\n"
+        )
+        with pytest.raises(ValueError, match="timestamp"):
+            CSVImporter(str(spec))
+
+
+def write_spec(path, **mappings):
+    """Write a minimal spec with the given mappings (YAML flow values)."""
+    fields = {
+        "timestamp": "\"row[0]\"",
+        "description": "\"row[1]\"",
+        "amount_original": "\"double(row[2])\"",
+        "currency_original": "\"'CHF'\"",
+        "amount_in_account_currency": "\"double(row[2])\"",
+    }
+    fields.update(mappings)
+    path.write_text(
+        'version: "1.0"\n'
+        "name: Test\n"
+        "parser: {delimiter: ';', skip_rows: 0}\n"
+        "mappings:\n" + "".join(f"  {k}: {v}\n" for k, v in fields.items())
+    )
+    return str(path)
+
+
+class TestFieldSpecSchema:
+    def test_column_or_constant_required(self):
+        with pytest.raises(ValidationError):
+            FieldSpec()
+        with pytest.raises(ValidationError):
+            FieldSpec(column=1, constant="CHF")
+
+    def test_invalid_combinations_rejected(self):
+        with pytest.raises(ValidationError):
+            FieldSpec(column=1, negate=True)
+        with pytest.raises(ValidationError):
+            FieldSpec(column=1, number=True, date_format="%d.%m.%Y")
+        with pytest.raises(ValidationError):
+            FieldSpec(column=1, colum=2)
+
+    def test_mapping_accepts_mixed_forms(self):
+        mapping = DataMapping(
+            timestamp={"column": 0, "date_format": "%d.%m.%Y"},
+            description="row[1] + row[2]",
+            amount_original={"column": 3, "number": {"decimal": ",", "thousands": "."}},
+            currency_original={"constant": "EUR"},
+            amount_in_account_currency="double(row[3])",
+        )
+        assert isinstance(mapping.timestamp, FieldSpec)
+        assert mapping.description == "row[1] + row[2]"
+
+
+class TestNativeMappings:
+    def test_declarative_fields(self, tmp_path):
+        importer = CSVImporter(write_spec(
+            tmp_path / "spec.yaml",
+            timestamp='{column: 0, date_format: "%d.%m.%Y"}',
+            description="{column: 1, fallback_column: 2}",
+            amount_original="{column: 3, number: {decimal: ',', thousands: '.'}, negate: true}",
+            currency_original="{constant: EUR}",
+            amount_in_account_currency='"double(row[4])"',
+        ))
+
+        result = importer.parse_row(["15.01.2025", "", "Bakery", "1.234,50", "9"])
+
+        assert result["timestamp"] == datetime(2025, 1, 15)
+        assert result["description"] == "Bakery"
+        assert result["amount_original"] == -1234.50
+        assert result["currency_original"] == "EUR"
+
+    @pytest.mark.parametrize("expr", [
+        "row[1]", "'CHF'", "double(row[2])", "double(row[2])*-1.0", "-double(row[2])",
+    ])
+    def test_trivial_cel_takes_fast_path_with_same_result(self, tmp_path, expr):
+        importer = CSVImporter(write_spec(tmp_path / "spec.yaml", description=f'"{expr}"'))
+        program = importer._programs["description"]
+        row = ["2025-01-15", "Shop", "12,5"]
+
+        expected = cel.evaluate(expr, {"row": row, "double": _double, "split": _split})
+
+        assert program.__qualname__.startswith("_native_field")
+        assert program(row) == expected
+
+    def test_complex_expression_falls_back_to_cel(self, tmp_path):
+        importer = CSVImporter(write_spec(tmp_path / "spec.yaml", description="\"row[1] + '!'\""))
+
+        assert importer.parse_row(["2025-01-15", "Shop", "1"])["description"] == "Shop!"
+        assert importer._programs["description"].__qualname__.startswith("CSVImporter._cel_field")
+
+    def test_native_field_errors_name_the_field(self, tmp_path):
+        importer = CSVImporter(write_spec(tmp_path / "spec.yaml", description="{column: 9}"))
+
+        with pytest.raises(ValueError, match="description"):
+            importer.parse_row(["2025-01-15", "Shop", "1"])
+
+
+class TestDateFunction:
+    def test_cel_date_returns_datetime(self, tmp_path):
+        importer = CSVImporter(write_spec(
+            tmp_path / "spec.yaml", timestamp="\"date(row[0] + ' 10:30', '%d.%m.%Y %H:%M')\""
+        ))
+
+        ts = importer.parse_row(["15.01.2025", "Shop", "1"])["timestamp"]
+
+        assert ts == datetime(2025, 1, 15, 10, 30, tzinfo=timezone.utc)
+
+    def test_plain_date_call_takes_fast_path(self, tmp_path):
+        importer = CSVImporter(write_spec(tmp_path / "spec.yaml", timestamp="\"date(row[0], '%d.%m.%Y')\""))
+
+        assert importer._programs["timestamp"].__qualname__.startswith("_native_field")
+        assert importer.parse_row(["15.01.2025", "Shop", "1"])["timestamp"] == datetime(2025, 1, 15)
+
+    def test_repeated_dates_are_memoized(self):
+        _date.cache_clear()
+        first = _date("15.01.2025", "%d.%m.%Y")
+
+        assert _date("15.01.2025", "%d.%m.%Y") is first
+        assert _date.cache_info().hits == 1
+
+    def test_invalid_date_names_the_field(self, tmp_path):
+        importer = CSVImporter(write_spec(tmp_path / "spec.yaml", timestamp="\"date(row[0], '%d.%m.%Y')\""))
+
+        with pytest.raises(ValueError, match="timestamp"):
+            importer.parse_row(["2025-01-15", "Shop", "1"])
+
+
+class TestSpecRegistry:
+    @pytest.fixture()
+    def spec_dir(self, tmp_path):
+        d = tmp_path / "specs"
+        (d / "Bank").mkdir(parents=True)
+        write_spec(d / "Bank" / "bank.yaml")
+        (d / "broken.yaml").write_text("version: '1.0'\nname: Broken\n")
+        return d
+
+    def test_list_specs_skips_invalid(self, spec_registry, spec_dir):
+        specs = spec_registry.list_specs(str(spec_dir))
+
+        assert [(path, m.name) for path, m in specs] == [(os.path.join("Bank", "bank.yaml"), "Test")]
+
+    def test_specs_parsed_once(self, spec_registry, spec_dir, monkeypatch):
+        spec_registry.list_specs(str(spec_dir))
+        monkeypatch.setattr(spec_registry.yaml, "safe_load", pytest.fail)
+
+        assert len(spec_registry.list_specs(str(spec_dir))) == 1
+        importer = spec_registry.get_importer(str(spec_dir / "Bank" / "bank.yaml"))
+        assert spec_registry.get_importer(str(spec_dir / "Bank" / "bank.yaml")) is importer
+
+    def test_changed_file_reloaded(self, spec_registry, spec_dir):
+        path = spec_dir / "Bank" / "bank.yaml"
+        first = spec_registry.get_importer(str(path))
+
+        write_spec(path, description="{column: 2}")
+        os.utime(path, ns=(0, path.stat().st_mtime_ns + 1_000_000))
+
+        second = spec_registry.get_importer(str(path))
+        assert second is not first
+        assert second.parse_row(["2025-01-15", "Shop", "1"])["description"] == "1"
+
+    def test_cold_start_uses_disk_cache(self, spec_registry, spec_dir, monkeypatch):
+        spec_registry.list_specs(str(spec_dir))
+        assert os.path.exists(spec_registry.CACHE_PATH)
+
+        spec_registry.clear()
+        monkeypatch.setattr(spec_registry.yaml, "safe_load", pytest.fail)
+
+        specs = spec_registry.list_specs(str(spec_dir))
+        assert [m.name for _, m in specs] == ["Test"]
+        row = ["2025-01-15", "Shop", "1"]
+        assert spec_registry.get_importer(str(spec_dir / "Bank" / "bank.yaml")).parse_row(row)["description"] == "Shop"
+
+    def test_corrupt_disk_cache_ignored(self, spec_registry, spec_dir):
+        os.makedirs(os.path.dirname(spec_registry.CACHE_PATH))
+        with open(spec_registry.CACHE_PATH, "w") as f:
+            f.write("{not json")
+
+        assert len(spec_registry.list_specs(str(spec_dir))) == 1
+
+    def test_invalid_spec_raises_value_error(self, spec_registry, spec_dir):
+        with pytest.raises(ValueError, match="broken.yaml"):
+            spec_registry.get_mapping(str(spec_dir / "broken.yaml"))
+
+    def test_declarative_fields_survive_disk_cache(self, spec_registry, tmp_path):
+        path = write_spec(tmp_path / "spec.yaml", timestamp='{column: 0, date_format: "%d.%m.%Y"}')
+        spec_registry.get_mapping(path)
+        spec_registry.clear()
+
+        assert isinstance(spec_registry.get_mapping(path).mappings.timestamp, FieldSpec)
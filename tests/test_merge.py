@@ -11,6 +11,14 @@ from ui.app import FinViewApp
 from ui.widgets import TransactionTable, MERGE_HEADER_KEY_PREFIX
 
 
+def load_view(session, account_id=None, all_accounts=False):
+    """Return (total, unreviewed, rows) of a view, loaded the way the transaction table loads it."""
+    total, unreviewed = queries.count_transactions(session, account_id, all_accounts)
+    layout = queries.load_transaction_layout(session, account_id, all_accounts)
+    rows = queries.load_unit_rows(session, account_id, all_accounts, layout.units(0, layout.unit_count))
+    return total, unreviewed, rows
+
+
 # ── Fixtures ──
 
 
@@ -224,17 +232,15 @@ class TestRenameMerge:
         assert parent.description == "New Name"
 
 
-# ── Query Tests: load_transaction_page ──
+# ── Query Tests: loading a view ──
 
 
-class TestLoadTransactionPageWithMerge:
+class TestLoadViewWithMerge:
     def test_merge_children_excluded_from_count(self, same_account_txs, session):
         acc, tx1, tx2, tx3 = same_account_txs
         queries.create_merge(session, [tx1.id, tx2.id], "Group")
 
-        total, unreviewed, rows = queries.load_transaction_page(
-            session, account_id=acc.id
-        )
+        total, unreviewed, rows = load_view(session, account_id=acc.id)
         # 3 original txs → 1 merge parent (counted) + 2 children (not counted) + 1 normal
         # But merge parent is excluded from display rows (it's a merge parent)
         # Count: tx3 (normal) + merge parent = 2
@@ -244,7 +250,7 @@ class TestLoadTransactionPageWithMerge:
         acc, tx1, tx2, tx3 = same_account_txs
         parent = queries.create_merge(session, [tx1.id, tx2.id], "Group")
 
-        _, _, rows = queries.load_transaction_page(session, account_id=acc.id)
+        _, _, rows = load_view(session, account_id=acc.id)
         # Should show: header + tx1, tx2 (merge children) + tx3 (normal) = 4
         assert len(rows) == 4
         tx_ids = [r[0].id for r in rows]
@@ -260,7 +266,7 @@ class TestLoadTransactionPageWithMerge:
         acc, tx1, tx2, tx3 = same_account_txs
         queries.create_merge(session, [tx1.id, tx2.id], "Group")
 
-        _, _, rows = queries.load_transaction_page(session, account_id=acc.id)
+        _, _, rows = load_view(session, account_id=acc.id)
         # Find a merge child and check merge_net
         for row in rows:
             tx = row[0]
@@ -275,7 +281,7 @@ class TestLoadTransactionPageWithMerge:
         acc1, acc2, tx1, tx2 = two_accounts
         queries.create_merge(session, [tx1.id, tx2.id], "Dinner")
 
-        _, _, rows = queries.load_transaction_page(session, all_accounts=True)
+        _, _, rows = load_view(session, all_accounts=True)
 
         # Should have a header row + 2 children
         # Header row has account_name "–"
@@ -473,15 +479,15 @@ class TestMergeWidget:
 
             # Find a merge child row
             for row_idx in range(table.row_count):
-                row_key = table._row_locations.get_key(row_idx)
-                if row_key and row_key.value in table._merge_child_rows:
+                row_key = table._key_at(row_idx)
+                if row_key and row_key in table._merge_child_rows:
                     table.move_cursor(row=row_idx)
                     break
             await pilot.pause()
 
             # Try to toggle reviewed — should be blocked
-            row_key = table._row_locations.get_key(table.cursor_coordinate.row)
-            tx = pilot.app.db.get(Transaction, int(row_key.value))
+            row_key = table._key_at(table.cursor_coordinate.row)
+            tx = pilot.app.db.get(Transaction, int(row_key))
             was_reviewed = tx.reviewed_at
 
             await pilot.press("enter")
@@ -507,8 +513,8 @@ class TestMergeWidget:
 
             # Find the ungrouped tx3 row and earmark it
             for row_idx in range(table.row_count):
-                row_key = table._row_locations.get_key(row_idx)
-                if row_key and row_key.value == str(tx3.id):
+                row_key = table._key_at(row_idx)
+                if row_key and row_key == str(tx3.id):
                     table.move_cursor(row=row_idx)
                     break
             await pilot.pause()
@@ -519,8 +525,8 @@ class TestMergeWidget:
 
             # Navigate to a merge child row and press m
             for row_idx in range(table.row_count):
-                row_key = table._row_locations.get_key(row_idx)
-                if row_key and row_key.value in table._merge_child_rows:
+                row_key = table._key_at(row_idx)
+                if row_key and row_key in table._merge_child_rows:
                     table.move_cursor(row=row_idx)
                     break
             await pilot.pause()
@@ -557,8 +563,8 @@ class TestMergeWidget:
 
             # Find the ungrouped tx3 row and earmark it
             for row_idx in range(table.row_count):
-                row_key = table._row_locations.get_key(row_idx)
-                if row_key and row_key.value == str(tx3.id):
+                row_key = table._key_at(row_idx)
+                if row_key and row_key == str(tx3.id):
                     table.move_cursor(row=row_idx)
                     break
             await pilot.pause()
@@ -569,8 +575,8 @@ class TestMergeWidget:
 
             # Navigate to the merge header row and press m
             for row_idx in range(table.row_count):
-                row_key = table._row_locations.get_key(row_idx)
-                if row_key and row_key.value in table._merge_header_rows:
+                row_key = table._key_at(row_idx)
+                if row_key and row_key in table._merge_header_rows:
                     table.move_cursor(row=row_idx)
                     break
             await pilot.pause()
@@ -594,7 +600,7 @@ class TestCrossAccountMergeQuery:
         acc1, acc2, tx1, tx2 = two_accounts
         queries.create_merge(session, [tx1.id, tx2.id], "Cross Merge")
 
-        _, _, rows = queries.load_transaction_page(session, account_id=acc1.id)
+        _, _, rows = load_view(session, account_id=acc1.id)
         # tx1 should appear with is_cross_account = True
         for row in rows:
             tx = row[0]
@@ -610,7 +616,7 @@ class TestCrossAccountMergeQuery:
         acc, tx1, tx2, tx3 = same_account_txs
         queries.create_merge(session, [tx1.id, tx2.id], "Same Merge")
 
-        _, _, rows = queries.load_transaction_page(session, account_id=acc.id)
+        _, _, rows = load_view(session, account_id=acc.id)
         for row in rows:
             tx = row[0]
             is_cross = row[4]
@@ -625,7 +631,7 @@ class TestCrossAccountMergeQuery:
         acc1, acc2, tx1, tx2 = two_accounts
         queries.create_merge(session, [tx1.id, tx2.id], "Cross Merge")
 
-        _, _, rows = queries.load_transaction_page(session, all_accounts=True)
+        _, _, rows = load_view(session, all_accounts=True)
         header_rows = [r for r in rows if r[1] == "–"]
         assert len(header_rows) == 1
         assert header_rows[0][0].description == "Cross Merge"
@@ -656,13 +662,13 @@ class TestCrossAccountMergeWidget:
             # Find tx1's row and check description
             found = False
             for row_idx in range(table.row_count):
-                row_key = table._row_locations.get_key(row_idx)
-                if row_key and row_key.value == str(tx1.id):
+                row_key = table._key_at(row_idx)
+                if row_key and row_key == str(tx1.id):
                     desc_value = str(table.get_cell(row_key, "description"))
                     assert "[m+]" in desc_value, f"Expected [m+] in '{desc_value}'"
                     assert "├─" not in desc_value, "Should not have tree prefix"
                     assert "└─" not in desc_value, "Should not have tree prefix"
-                    assert row_key.value not in table._merge_child_rows
+                    assert row_key not in table._merge_child_rows
                     found = True
                     break
             assert found, "tx1 row not found in table"
@@ -682,13 +688,13 @@ class TestCrossAccountMergeWidget:
             # Find merge children and check for tree prefix
             found_child = False
             for row_idx in range(table.row_count):
-                row_key = table._row_locations.get_key(row_idx)
-                if row_key and row_key.value in (str(tx1.id), str(tx2.id)):
+                row_key = table._key_at(row_idx)
+                if row_key and row_key in (str(tx1.id), str(tx2.id)):
                     desc_value = str(table.get_cell(row_key, "description"))
                     assert "├─" in desc_value or "└─" in desc_value, (
                         f"Expected tree prefix in '{desc_value}'"
                     )
                     assert "[m+]" not in desc_value
-                    assert row_key.value in table._merge_child_rows
+                    assert row_key in table._merge_child_rows
                     found_child = True
             assert found_child, "No merge child rows found"
@@ -0,0 +1,951 @@
+"""Tests for the read queries in queries.py: query plans and index usage."""
+
+import random
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event, select
+
+import db
+import queries
+from models.base import Base
+from models.finance import (
+    BALANCE_TRIGGERS, PARENT_FLAG_TRIGGERS, SEARCH_INDEX_TRIGGERS, Account, Currency, Transaction,
+)
+
+
+@contextmanager
+def captured_statements():
+    """Collect (sql, params) of every statement executed on db.engine."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, "before_cursor_execute", capture)
+
+
+def query_plans(session, statements) -> list[str]:
+    """Return the EXPLAIN QUERY PLAN output of each statement, one string per statement."""
+    conn = session.connection()
+    return [
+        "\n".join(row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", params))
+        for sql, params in statements
+    ]
+
+
+def plans_of(session, fn, *args, **kwargs) -> list[str]:
+    with captured_statements() as statements:
+        fn(session, *args, **kwargs)
+    return query_plans(session, statements)
+
+
+def view_units(session, account_id=None, all_accounts=False):
+    layout = queries.load_transaction_layout(session, account_id, all_accounts)
+    return layout.units(0, layout.unit_count)
+
+
+def view_rows(session, account_id=None, all_accounts=False):
+    """Every row of a view, loaded the way the transaction table loads them."""
+    units = view_units(session, account_id, all_accounts)
+    return queries.load_unit_rows(session, account_id, all_accounts, units)
+
+
+def rows_plan(session, account_id=None, all_accounts=False) -> str:
+    units = view_units(session, account_id, all_accounts)
+    (plan,) = plans_of(session, queries.load_unit_rows, account_id, all_accounts, units)
+    return plan
+
+
+class TestQueryPlans:
+    def test_account_view_uses_account_date_index(self, session, sample_account):
+        (count_plan,) = plans_of(session, queries.count_transactions, sample_account.id)
+        (layout_plan,) = plans_of(session, queries.load_transaction_layout, sample_account.id)
+
+        for plan in (count_plan, layout_plan):
+            assert "USING INDEX ix_transactions_account_id_date (account_id=?)" in plan
+            assert "SCAN transactions" not in plan
+        # Rows come out of the index already ordered by date
+        assert "TEMP B-TREE FOR ORDER BY" not in layout_plan
+
+    def test_merge_lookups_use_indexes(self, session, sample_account):
+        plan = rows_plan(session, sample_account.id)
+
+        assert "SEARCH merge_child USING INDEX ix_transactions_merge_parent_id" in plan
+
+    def test_all_accounts_view_uses_parent_indexes(self, session, sample_account):
+        (count_plan,) = plans_of(session, queries.count_transactions, None, all_accounts=True)
+
+        assert "ix_transactions_merge_parent_id" in count_plan
+        assert "INDEX ix_transactions_merge_parent_id" in rows_plan(session, None, True)
+
+    def test_parent_rows_are_filtered_without_subqueries(self, session, sample_account):
+        plans = [
+            rows_plan(session, sample_account.id),
+            rows_plan(session, None, True),
+            *plans_of(session, queries.load_transaction_layout, sample_account.id),
+            *plans_of(session, queries.load_transaction_layout, None, all_accounts=True),
+        ]
+
+        # The NOT IN (parent ids) anti-joins scanned these indexes for every query
+        for plan in plans:
+            assert "ix_transactions_split_parent_id" not in plan
+            assert "(merge_parent_id>?)" not in plan
+
+    def test_row_query_has_no_correlated_subqueries(self, session, sample_account):
+        assert "CORRELATED" not in rows_plan(session, sample_account.id)
+        assert "CORRELATED" not in rows_plan(session, None, True)
+
+    def test_balances_do_not_read_transactions(self, session, sample_account):
+        (plan,) = plans_of(session, queries.get_all_accounts_with_balances)
+
+        assert "transactions" not in plan
+
+    def test_balance_check_uses_account_index(self, session, sample_account):
+        (plan,) = plans_of(session, queries.check_account_balances)
+
+        assert "SEARCH transactions USING INDEX ix_transactions_account_id_date (account_id=?)" in plan
+
+    def test_migrations_create_model_indexes_and_triggers(self, tmp_path, monkeypatch):
+        from alembic import command
+        from alembic.config import Config
+        from sqlalchemy import create_engine, inspect
+
+        from models.finance import Transaction
+
+        monkeypatch.setenv("FINVIEW_DB", str(tmp_path / "migrated.db"))
+        command.upgrade(Config("alembic.ini"), "head")
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'migrated.db'}")
+        migrated = {ix["name"] for ix in inspect(engine).get_indexes("transactions")}
+        with engine.connect() as conn:
+            migrated_triggers = set(conn.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+            ).scalars())
+        engine.dispose()
+        assert migrated_triggers == {
+            trigger.split()[2] for trigger in BALANCE_TRIGGERS + PARENT_FLAG_TRIGGERS + SEARCH_INDEX_TRIGGERS
+        }
+        assert migrated == {ix.name for ix in Transaction.__table__.indexes}
+        assert "ix_transactions_reviewed_at" in migrated
+
+    def test_migration_backfills_parent_flags(self, tmp_path, monkeypatch):
+        import sqlite3
+
+        from alembic import command
+        from alembic.config import Config
+
+        path = tmp_path / "legacy.db"
+        monkeypatch.setenv("FINVIEW_DB", str(path))
+        command.upgrade(Config("alembic.ini"), "3b8f1c2d9e47")
+
+        conn = sqlite3.connect(path)
+        conn.execute("INSERT INTO accounts (id, name, currency) VALUES (1, 'A', 'CHF')")
+        conn.executemany(
+            "INSERT INTO transactions (id, account_id, description, original_value, original_currency,"
+            " value_in_account_currency, date, split_parent_id, merge_parent_id)"
+            " VALUES (?, 1, '', 0, 'CHF', 0, '2025-01-01', ?, ?)",
+            [(1, None, None), (2, 1, None), (3, 1, 5), (4, None, 5), (5, None, None)],
+        )
+        conn.commit()
+        conn.close()
+        command.upgrade(Config("alembic.ini"), "head")
+
+        conn = sqlite3.connect(path)
+        flags = conn.execute(
+            "SELECT id, is_split_parent, is_merge_parent FROM transactions ORDER BY id"
+        ).fetchall()
+        conn.close()
+        assert flags == [(1, 1, 0), (2, 0, 0), (3, 0, 0), (4, 0, 0), (5, 0, 1)]
+
+    def test_migration_backfills_search_index(self, tmp_path, monkeypatch):
+        import sqlite3
+
+        from alembic import command
+        from alembic.config import Config
+
+        path = tmp_path / "legacy.db"
+        monkeypatch.setenv("FINVIEW_DB", str(path))
+        command.upgrade(Config("alembic.ini"), "9c4e7a1b5d20")
+
+        conn = sqlite3.connect(path)
+        conn.execute("INSERT INTO accounts (id, name, currency) VALUES (1, 'Checking', 'CHF')")
+        conn.execute(
+            "INSERT INTO transactions (id, account_id, description, original_value, original_currency,"
+            " value_in_account_currency, date) VALUES (7, 1, 'Grocery Store', -5.5, 'CHF', -5.5, '2025-01-01')"
+        )
+        conn.commit()
+        conn.close()
+        command.upgrade(Config("alembic.ini"), "head")
+
+        conn = sqlite3.connect(path)
+        rows = conn.execute("SELECT rowid, * FROM transactions_search").fetchall()
+        conn.close()
+        assert rows == [(7, "Grocery Store", "Checking", "-5.50")]
+
+    def test_migration_adds_bulk_import_flag_to_insert_triggers(self, tmp_path, monkeypatch):
+        import sqlite3
+
+        from alembic import command
+        from alembic.config import Config
+
+        path = tmp_path / "migrated.db"
+        monkeypatch.setenv("FINVIEW_DB", str(path))
+        command.upgrade(Config("alembic.ini"), "head")
+
+        conn = sqlite3.connect(path)
+        flags = conn.execute("SELECT active FROM bulk_import").fetchall()
+        migrated = dict(conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'"))
+        conn.close()
+        assert flags == [(0,)]
+        for trigger in BALANCE_TRIGGERS + SEARCH_INDEX_TRIGGERS:
+            name = trigger.split()[2]
+            assert " ".join(migrated[name].split()) == " ".join(trigger.split()), name
+
+    def test_migration_backfills_cached_balances(self, tmp_path, monkeypatch):
+        import sqlite3
+
+        from alembic import command
+        from alembic.config import Config
+
+        path = tmp_path / "legacy.db"
+        monkeypatch.setenv("FINVIEW_DB", str(path))
+        command.upgrade(Config("alembic.ini"), "6fae53338051")
+
+        conn = sqlite3.connect(path)
+        conn.executemany(
+            "INSERT INTO accounts (id, name, currency) VALUES (?, ?, 'CHF')", [(1, "A"), (2, "B")]
+        )
+        conn.executemany(
+            "INSERT INTO transactions (id, account_id, description, original_value, original_currency,"
+            " value_in_account_currency, date, merge_parent_id) VALUES (?, ?, '', ?, 'CHF', ?, '2025-01-01', ?)",
+            [
+                (1, 1, 10.1, 10.1, None),
+                (2, 1, -0.3, -0.3, 4),
+                (3, 1, -0.2, -0.2, 4),
+                (4, 1, -0.5, -0.5, None),  # merge parent
+            ],
+        )
+        conn.commit()
+        conn.close()
+        command.upgrade(Config("alembic.ini"), "head")
+
+        conn = sqlite3.connect(path)
+        balances = conn.execute("SELECT id, balance_cents FROM accounts ORDER BY id").fetchall()
+        # The triggers are in place and keep the backfilled values current
+        conn.execute("UPDATE transactions SET merge_parent_id = NULL WHERE id IN (2, 3)")
+        after_unmerge = conn.execute("SELECT balance_cents FROM accounts WHERE id = 1").fetchone()
+        conn.close()
+        assert balances == [(1, 960), (2, 0)]
+        assert after_unmerge == (910,)
+
+
+@pytest.fixture()
+def merged_ledger(session):
+    """Two accounts: a cross-account merge, a same-account merge and a plain row."""
+    acc1 = Account(name="A", currency=Currency.CHF)
+    acc2 = Account(name="B", currency=Currency.CHF)
+    session.add_all([acc1, acc2])
+    session.flush()
+
+    def tx(account, day, value, description):
+        t = Transaction(
+            account_id=account.id, description=description,
+            original_value=Decimal(value), original_currency=Currency.CHF,
+            value_in_account_currency=Decimal(value), date=datetime(2025, 1, day),
+        )
+        session.add(t)
+        return t
+
+    cross = [tx(acc1, 1, "-30.00", "Dinner"), tx(acc2, 2, "10.00", "Refund")]
+    same = [tx(acc1, 3, "-5.00", "Coffee"), tx(acc1, 4, "-7.00", "Cake")]
+    plain = tx(acc1, 5, "-1.00", "Gum")
+    session.commit()
+
+    cross_parent = queries.create_merge(session, [t.id for t in cross], "Night out")
+    same_parent = queries.create_merge(session, [t.id for t in same], "Cafe")
+    same_parent.reviewed_at = datetime(2025, 2, 1)
+    session.commit()
+    return acc1, cross, same, plain, cross_parent, same_parent
+
+
+class TestMergeGroupAggregate:
+    def test_single_account_row_metadata(self, session, merged_ledger):
+        acc1, cross, same, plain, cross_parent, same_parent = merged_ledger
+
+        rows = view_rows(session, acc1.id)
+        by_id = {row[0].id: tuple(row[1:]) for row in rows}
+
+        assert by_id[plain.id] == (None, None, None, False)
+        assert by_id[plain.id][3] is False
+        assert by_id[cross[0].id] == (-20.0, None, "Night out", True)
+        assert by_id[same[0].id] == (-12.0, datetime(2025, 2, 1), "Cafe", False)
+        assert isinstance(by_id[same[0].id][0], Decimal)
+
+    def test_all_accounts_row_metadata(self, session, merged_ledger):
+        acc1, cross, same, plain, cross_parent, same_parent = merged_ledger
+
+        rows = view_rows(session, None, all_accounts=True)
+        by_id = {row[0].id: tuple(row[1:]) for row in rows if row[1] != "–"}
+
+        assert by_id[plain.id] == ("A", None, None, None)
+        assert by_id[cross[1].id] == ("B", -20.0, None, "Night out")
+        assert by_id[same[1].id] == ("A", -12.0, datetime(2025, 2, 1), "Cafe")
+
+
+class TestBulkReview:
+    def test_set_reviewed_in_one_statement(self, session, sample_account):
+        ids = [tx.id for tx in sample_account.transactions]
+        reviewed_before = {tx.id: tx.reviewed_at for tx in sample_account.transactions}
+
+        with captured_statements() as statements:
+            changed = queries.set_reviewed(session, ids, True)
+
+        assert len([sql for sql, _ in statements if sql.startswith("UPDATE")]) == 1
+        assert sorted(changed) == sorted(i for i in ids if reviewed_before[i] is None)
+        for tx in sample_account.transactions:
+            assert tx.reviewed_at is not None
+            if reviewed_before[tx.id] is not None:
+                assert tx.reviewed_at == reviewed_before[tx.id]
+
+        assert queries.set_reviewed(session, ids, True) == []
+        assert sorted(queries.set_reviewed(session, ids, False)) == sorted(ids)
+        assert all(tx.reviewed_at is None for tx in sample_account.transactions)
+
+    def test_toggle_many(self, session, sample_account):
+        states = {tx.id: tx.reviewed_at is not None for tx in sample_account.transactions}
+
+        assert queries.toggle_reviewed_many(session, list(states)) == {
+            tx_id: not reviewed for tx_id, reviewed in states.items()
+        }
+
+    def test_more_ids_than_sqlite_parameters(self, session, sample_account):
+        ids = list(range(1, 100_001))
+
+        assert len(queries.set_reviewed(session, ids, True)) == 2
+
+
+class TestAccountBalances:
+    def add_tx(self, session, account, value, **kwargs):
+        tx = Transaction(
+            account_id=account.id, description="tx", original_value=Decimal(value),
+            original_currency=Currency.CHF, value_in_account_currency=Decimal(value),
+            date=datetime(2025, 1, 1), **kwargs,
+        )
+        session.add(tx)
+        session.commit()
+        return tx
+
+    def test_new_account_has_zero_balance(self, session):
+        session.add(Account(name="Empty", currency=Currency.CHF))
+        session.commit()
+
+        assert queries.get_all_accounts_with_balances(session)[0][1] == Decimal("0.00")
+
+    def test_cached_balance_matches_transactions(self, session, sample_account):
+        ((acc, balance),) = queries.get_all_accounts_with_balances(session)
+
+        assert acc.id == sample_account.id
+        assert balance == Decimal("3950.00")
+        assert isinstance(balance, Decimal)
+
+    def test_bulk_insert_updates_balance(self, session, sample_account):
+        queries._insert_transaction_rows(session, [
+            {
+                "account_id": sample_account.id, "description": f"Row {i}",
+                "original_value": -0.1, "original_currency": Currency.CHF,
+                "value_in_account_currency": -0.1, "date": datetime(2025, 2, 1),
+                "import_fingerprint": None,
+            }
+            for i in range(10)
+        ])
+        session.commit()
+
+        assert dict(queries.get_all_accounts_with_balances(session))[sample_account] == Decimal("3949.00")
+
+    def test_edit_move_and_delete_update_balances(self, session, sample_account):
+        other = Account(name="Other", currency=Currency.CHF)
+        session.add(other)
+        tx = self.add_tx(session, sample_account, "12.34")
+
+        tx.value_in_account_currency = Decimal("20.00")
+        session.commit()
+        assert dict(queries.get_all_accounts_with_balances(session))[sample_account] == Decimal("3970.00")
+
+        tx.account_id = other.id
+        session.commit()
+        balances = dict(queries.get_all_accounts_with_balances(session))
+        assert balances[sample_account] == Decimal("3950.00")
+        assert balances[other] == Decimal("20.00")
+
+        session.delete(tx)
+        session.commit()
+        assert dict(queries.get_all_accounts_with_balances(session))[other] == Decimal("0.00")
+
+    def test_parent_flags_follow_merges(self, session, sample_account):
+        txs = [self.add_tx(session, sample_account, v) for v in ("-1.10", "-2.20", "-3.30")]
+
+        parent = queries.create_merge(session, [txs[0].id, txs[1].id], "Group")
+        assert parent.is_merge_parent
+        assert not any(tx.is_merge_parent for tx in txs)
+        queries.add_to_merge(session, parent.id, txs[2].id)
+        queries.remove_from_merge(session, txs[2].id)
+        assert parent.is_merge_parent
+
+        queries.remove_from_merge(session, txs[0].id)
+        assert session.get(Transaction, parent.id) is None
+
+    def test_parent_flags_follow_splits(self, session, sample_account):
+        root = self.add_tx(session, sample_account, "10.00")
+        children = [
+            self.add_tx(session, sample_account, v, split_parent_id=root.id) for v in ("4.00", "6.00")
+        ]
+        assert root.is_split_parent
+
+        session.delete(children[0])
+        session.commit()
+        assert root.is_split_parent
+        session.delete(children[1])
+        session.commit()
+        assert not root.is_split_parent
+
+    def test_merge_operations_keep_balance(self, session, sample_account):
+        txs = [self.add_tx(session, sample_account, v) for v in ("-1.10", "-2.20", "-3.30")]
+        expected = Decimal("3943.40")
+
+        parent = queries.create_merge(session, [txs[0].id, txs[1].id], "Group")
+        assert dict(queries.get_all_accounts_with_balances(session))[sample_account] == expected
+        queries.add_to_merge(session, parent.id, txs[2].id)
+        assert dict(queries.get_all_accounts_with_balances(session))[sample_account] == expected
+        queries.remove_from_merge(session, txs[2].id)
+        assert dict(queries.get_all_accounts_with_balances(session))[sample_account] == expected
+        assert queries.remove_from_merge(session, txs[0].id) == "Group"
+        assert dict(queries.get_all_accounts_with_balances(session))[sample_account] == expected
+        assert queries.check_account_balances(session) == []
+
+    def test_random_writes_keep_cache_consistent(self, session):
+        """Random inserts, edits, moves, deletes, splits and merge changes never drift."""
+        rng = random.Random(15)
+        accounts = [Account(name=f"Acc {i}", currency=Currency.CHF) for i in range(3)]
+        session.add_all(accounts)
+        session.commit()
+
+        def value():
+            return Decimal(rng.randrange(-10000, 10000)).scaleb(-2)
+
+        for step in range(300):
+            txs = session.execute(select(Transaction)).scalars().all()
+            children = [t for t in txs if t.merge_parent_id is not None]
+            parents = {t.merge_parent_id for t in children}
+            free = [t for t in txs if t.merge_parent_id is None and t.id not in parents]
+            op = rng.randrange(7)
+            if op == 0 or len(free) < 3:
+                self.add_tx(session, rng.choice(accounts), value())
+            elif op == 1:
+                tx = rng.choice(txs)
+                tx.value_in_account_currency = value()
+                session.commit()
+            elif op == 2:
+                rng.choice(free).account_id = rng.choice(accounts).id
+                session.commit()
+            elif op == 3:
+                session.delete(rng.choice([t for t in txs if t.id not in parents]))
+                session.commit()
+            elif op == 4:
+                root = rng.choice(free)
+                self.add_tx(session, accounts[0], value(), split_parent_id=root.id)
+            elif op == 5:
+                picked = rng.sample(free, rng.randint(2, 3))
+                if rng.random() < 0.5 and parents:
+                    queries.add_to_merge(session, rng.choice(sorted(parents)), picked[0].id)
+                else:
+                    queries.create_merge(session, [t.id for t in picked], f"Group {step}")
+            elif children:
+                queries.remove_from_merge(session, rng.choice(children).id)
+
+            assert queries.check_account_balances(session) == [], f"drift after step {step} (op {op})"
+            flags = session.execute(
+                select(Transaction.id, Transaction.is_split_parent, Transaction.is_merge_parent)
+            ).all()
+            split_parents = set(session.execute(select(Transaction.split_parent_id)).scalars())
+            merge_parents = set(session.execute(select(Transaction.merge_parent_id)).scalars())
+            assert flags == [
+                (tx_id, tx_id in split_parents, tx_id in merge_parents) for tx_id, _, _ in flags
+            ], f"stale parent flags after step {step} (op {op})"
+
+    def test_check_reports_and_repairs_drift(self, session, sample_account):
+        session.execute(Account.__table__.update().values(balance_cents=1))
+        session.commit()
+
+        mismatches = queries.check_account_balances(session)
+        assert [(acc.id, cached, computed) for acc, cached, computed in mismatches] == [
+            (sample_account.id, Decimal("0.01"), Decimal("3950.00"))
+        ]
+        # Without repair the cache stays as it was
+        assert queries.check_account_balances(session) == mismatches
+
+        queries.check_account_balances(session, repair=True)
+        assert queries.check_account_balances(session) == []
+        assert dict(queries.get_all_accounts_with_balances(session))[sample_account] == Decimal("3950.00")
+
+
+class TestTransactionLayout:
+    def layout_ids(self, rows):
+        """Row ids as in a layout: merge group headers are negated."""
+        parent_ids = {row[0].merge_parent_id for row in rows}
+        return [
+            -row[0].id if row[0].id in parent_ids and row[0].merge_parent_id is None else row[0].id
+            for row in rows
+        ]
+
+    @pytest.mark.parametrize("all_accounts", [False, True])
+    def test_layout_matches_unit_rows(self, session, merged_ledger, all_accounts):
+        acc1 = merged_ledger[0]
+        account_id = None if all_accounts else acc1.id
+
+        layout = queries.load_transaction_layout(session, account_id, all_accounts)
+        rows = queries.load_unit_rows(session, account_id, all_accounts, layout.units(0, layout.unit_count))
+
+        assert list(layout.rows) == self.layout_ids(rows)
+        # Loading unit by unit gives the same rows
+        assert [
+            row
+            for unit in range(layout.unit_count)
+            for row in queries.load_unit_rows(session, account_id, all_accounts, layout.units(unit, unit + 1))
+        ] == rows
+
+    @pytest.mark.parametrize("all_accounts", [False, True])
+    def test_windows_add_up_to_the_layout(self, session, merged_ledger, all_accounts):
+        account_id = None if all_accounts else merged_ledger[0].id
+        full = queries.load_transaction_layout(session, account_id, all_accounts)
+        queries._read_cache.clear()
+
+        layout = queries.load_transaction_layout_window(session, account_id, all_accounts, units=2)
+        assert not layout.complete
+        # The merge group ending the window comes whole
+        assert list(layout.rows) == list(full.rows[:full.unit_rows(1).stop])
+        assert layout.rows[1] < 0
+        while not layout.complete:
+            queries.extend_transaction_layout(session, layout, account_id, all_accounts, units=1)
+
+        assert layout == full
+
+    def test_merge_groups_are_whole_units(self, session, merged_ledger):
+        acc1, cross, same, plain, cross_parent, same_parent = merged_ledger
+        layout = queries.load_transaction_layout(session, None, all_accounts=True)
+
+        units = [
+            queries.load_unit_rows(session, None, True, layout.units(unit, unit + 1))
+            for unit in range(layout.unit_count)
+        ]
+
+        assert [[row[0].id for row in rows] for rows in units] == [
+            [plain.id],
+            [same_parent.id, same[0].id, same[1].id],
+            [cross_parent.id, cross[0].id, cross[1].id],
+        ]
+        assert units[1][0] == (same_parent, "–", -12.0, datetime(2025, 2, 1), "Cafe")
+
+    def test_cross_account_children_are_units_of_their_own(self, session, merged_ledger):
+        acc1, cross, same, plain, cross_parent, same_parent = merged_ledger
+
+        layout = queries.load_transaction_layout(session, acc1.id)
+
+        # The cross-account child is shown on its own, without a header
+        assert layout.units(0, layout.unit_count) == [
+            queries.DisplayUnit(plain.id, None, False),
+            queries.DisplayUnit(same[0].id, same_parent.id, True),
+            queries.DisplayUnit(cross[0].id, cross_parent.id, False),
+        ]
+
+    def test_all_accounts_headers(self, session, merged_ledger):
+        acc1, cross, same, plain, cross_parent, same_parent = merged_ledger
+        rows = view_rows(session, None, all_accounts=True)
+
+        assert [row[0].id for row in rows] == [
+            plain.id, same_parent.id, same[0].id, same[1].id,
+            cross_parent.id, cross[0].id, cross[1].id,
+        ]
+        assert rows[4] == (cross_parent, "–", -20.0, None, "Night out")
+
+    def test_counts_are_separate(self, session, merged_ledger):
+        acc1 = merged_ledger[0]
+
+        assert queries.count_transactions(session, acc1.id) == (3, 2)
+        assert queries.count_transactions(session, all_accounts=True) == (3, 2)
+
+    def test_all_accounts_layout_by_date_index(self, session, sample_account):
+        (plan,) = plans_of(session, queries.load_transaction_layout, None, all_accounts=True)
+
+        assert "SCAN transactions USING INDEX ix_transactions_date" in plan
+        assert "TEMP B-TREE FOR ORDER BY" not in plan
+
+    def test_units_of_a_slice(self, session, merged_ledger):
+        acc1, cross, same, plain, cross_parent, same_parent = merged_ledger
+
+        layout = queries.load_transaction_layout(session, None, all_accounts=True)
+
+        assert list(layout.rows) == [
+            plain.id, -same_parent.id, same[0].id, same[1].id,
+            -cross_parent.id, cross[0].id, cross[1].id,
+        ]
+        assert list(layout.unit_starts) == [0, 1, 4]
+        assert layout.unit_at_row(3) == 1
+        assert layout.units(1, 2) == [queries.DisplayUnit(same[0].id, same_parent.id, True)]
+        rows = queries.load_unit_rows(session, None, True, layout.units(1, 2))
+        assert [row[0].id for row in rows] == [same_parent.id, same[0].id, same[1].id]
+
+    def test_units_that_no_longer_exist_are_left_out(self, session, merged_ledger):
+        acc1, cross, same, plain, cross_parent, same_parent = merged_ledger
+        units = queries.load_transaction_layout(session, None, all_accounts=True).units(0, 3)
+
+        session.delete(plain)
+        for tx in same:
+            session.delete(tx)
+        session.commit()
+
+        rows = queries.load_unit_rows(session, None, True, units)
+        assert [row[0].id for row in rows] == [cross_parent.id, cross[0].id, cross[1].id]
+
+
+class TestReadCache:
+    def add_transaction(self, session, account, value="-5.00"):
+        session.add(Transaction(
+            account_id=account.id, description="Late", original_value=Decimal(value),
+            original_currency=Currency.CHF, value_in_account_currency=Decimal(value),
+            date=datetime(2025, 2, 1),
+        ))
+
+    def test_repeated_reads_run_no_queries(self, session, sample_account):
+        counts = queries.count_transactions(session, sample_account.id)
+        layout = queries.load_transaction_layout(session, sample_account.id)
+
+        with captured_statements() as statements:
+            assert queries.count_transactions(session, sample_account.id) == counts
+            assert queries.load_transaction_layout(session, sample_account.id) is layout
+
+        assert statements == []
+
+    def test_keyed_by_args(self, session, sample_account):
+        other = Account(name="Other", currency=Currency.CHF)
+        session.add(other)
+        session.commit()
+
+        assert queries.count_transactions(session, sample_account.id) == (3, 2)
+        assert queries.count_transactions(session, other.id) == (0, 0)
+        assert queries.count_transactions(session, all_accounts=True) == (3, 2)
+
+    def test_writes_invalidate(self, session, sample_account):
+        assert queries.count_transactions(session, sample_account.id) == (3, 2)
+
+        # Flushed but neither committed nor marked dirty
+        self.add_transaction(session, sample_account)
+        session.flush()
+        assert queries.count_transactions(session, sample_account.id) == (4, 3)
+
+        session.rollback()
+        assert queries.count_transactions(session, sample_account.id) == (3, 2)
+
+        queries.set_reviewed(session, [tx.id for tx in sample_account.transactions], True)
+        assert queries.count_transactions(session, sample_account.id) == (3, 0)
+
+    def test_mark_dirty_invalidates(self, session, sample_account):
+        layout = queries.load_transaction_layout(session, sample_account.id)
+
+        db.mark_dirty()
+
+        assert queries.load_transaction_layout(session, sample_account.id) is not layout
+
+    def test_new_database_invalidates(self, session, sample_account):
+        assert queries.count_transactions(session, sample_account.id) == (3, 2)
+
+        db._create_memory_engine()
+        Base.metadata.create_all(db.engine)
+        with db.SessionLocal() as other:
+            assert queries.count_transactions(other, sample_account.id) == (0, 0)
+
+    def test_direct_mode_rollback_invalidates(self, direct_db):
+        session = db.SessionLocal()
+        account = Account(name="Direct", currency=Currency.CHF)
+        session.add(account)
+        session.commit()
+        assert queries.count_transactions(session, account.id) == (0, 0)
+
+        self.add_transaction(session, account)
+        session.flush()
+        assert queries.count_transactions(session, account.id) == (1, 1)
+        session.rollback()
+
+        assert queries.count_transactions(session, account.id) == (0, 0)
+        session.close()
+
+    def test_completed_windows_are_cached(self, session, sample_account):
+        layout = queries.load_transaction_layout_window(session, sample_account.id, False, units=2)
+        queries.extend_transaction_layout(session, layout, sample_account.id, False)
+
+        with captured_statements() as statements:
+            assert queries.load_transaction_layout_window(session, sample_account.id, False) is layout
+            assert queries.load_transaction_layout(session, sample_account.id, False) is layout
+        assert statements == []
+
+    def test_windows_read_across_writes_are_not_cached(self, session, sample_account):
+        layout = queries.load_transaction_layout_window(session, sample_account.id, False, units=2)
+        self.add_transaction(session, sample_account)
+        session.flush()
+        queries.extend_transaction_layout(session, layout, sample_account.id, False)
+
+        assert layout.complete
+        assert queries.load_transaction_layout_window(session, sample_account.id, False) is not layout
+
+    def test_evicts_least_recently_used_by_rows(self, session, merged_ledger, monkeypatch):
+        monkeypatch.setattr(queries, "_read_cache", queries._ReadCache(max_rows=10))
+        acc1 = merged_ledger[0]
+        everything = queries.load_transaction_layout(session, None, all_accounts=True)
+        one = queries.load_transaction_layout(session, acc1.id)
+        assert len(everything) + len(one) > 10
+
+        assert queries.load_transaction_layout(session, acc1.id) is one
+        assert queries.load_transaction_layout(session, None, all_accounts=True) is not everything
+
+    def test_oversized_results_are_not_cached(self, session, sample_account, monkeypatch):
+        monkeypatch.setattr(queries, "_read_cache", queries._ReadCache(max_rows=2))
+
+        layout = queries.load_transaction_layout(session, sample_account.id)
+
+        assert len(queries._read_cache) == 0
+        assert queries.load_transaction_layout(session, sample_account.id) is not layout
+
+
+class TestLayoutPatch:
+    VIEWS = [(1, False), (2, False), (None, True)]
+
+    def layouts(self, session):
+        return {view: queries.load_transaction_layout(session, *view) for view in self.VIEWS}
+
+    def assert_patched(self, session, layouts, changes):
+        for view, old in layouts.items():
+            patch = queries.update_transaction_layout(session, old, *view, changes)
+            expected = queries.load_transaction_layout(session, *view)
+
+            assert patch is not None
+            assert list(patch.layout.rows) == list(expected.rows), view
+            assert list(patch.layout.unit_starts) == list(expected.unit_starts), view
+            assert list(patch.layout.unit_merge_parents) == list(expected.unit_merge_parents), view
+            for index, entry in enumerate(old.rows):
+                new_index = patch.row_index(index)
+                if new_index is not None:
+                    assert patch.layout.rows[new_index] == entry
+            layouts[view] = patch.layout
+
+    def add_transactions(self, session, rng, count, changes):
+        txs = [
+            Transaction(
+                account_id=rng.choice((1, 2)), description=f"Row {rng.random():.3f}",
+                original_value=Decimal("-1.00"), original_currency=Currency.CHF,
+                value_in_account_currency=Decimal("-1.00"),
+                date=datetime(2025, 1, rng.randint(1, 12), rng.choice((0, 12))),
+            )
+            for _ in range(count)
+        ]
+        session.add_all(txs)
+        session.commit()
+        changes.inserted.update(tx.id for tx in txs)
+
+    def test_matches_reloading_after_random_writes(self, session):
+        rng = random.Random(7)
+        session.add_all([Account(name="A", currency=Currency.CHF), Account(name="B", currency=Currency.CHF)])
+        session.commit()
+        self.add_transactions(session, rng, 40, queries.ChangeSet())
+        layouts = self.layouts(session)
+
+        for _ in range(60):
+            txs = session.execute(select(Transaction)).scalars().all()
+            loose = [
+                t for t in txs
+                if t.merge_parent_id is None and not t.is_merge_parent and not t.is_split_parent
+            ]
+            children = [t for t in txs if t.merge_parent_id is not None]
+            parents = [t for t in txs if t.is_merge_parent]
+            roots = [t for t in loose if t.split_parent_id is None] + [
+                t for t in txs if t.is_split_parent
+            ]
+
+            changes = queries.ChangeSet()
+            action = rng.choice(["merge", "add", "remove", "rename", "split", "insert"])
+            if action == "merge" and len(loose) >= 3:
+                queries.create_merge(
+                    session, [t.id for t in rng.sample(loose, rng.choice((2, 3)))], "Group", changes
+                )
+            elif action == "add" and parents and loose:
+                queries.add_to_merge(session, rng.choice(parents).id, rng.choice(loose).id, changes)
+            elif action == "remove" and children:
+                queries.remove_from_merge(session, rng.choice(children).id, changes)
+            elif action == "rename" and parents:
+                queries.rename_merge(session, rng.choice(parents).id, f"Group {rng.random():.3f}", changes)
+            elif action == "split" and roots:
+                root = rng.choice(roots)
+                kept = [
+                    {"id": c.id, "description": c.description, "amount": c.original_value}
+                    for c in root.split_children if c.merge_parent_id is None and rng.random() < 0.5
+                ]
+                new = [{"id": None, "description": "Part", "amount": Decimal("-0.50")}] * rng.randint(0, 2)
+                queries.save_split(session, root.id, kept + new, changes)
+            else:
+                self.add_transactions(session, rng, rng.randint(1, 3), changes)
+
+            self.assert_patched(session, layouts, changes)
+
+    def test_changed_merge_parent_is_patched(self, session, merged_ledger):
+        acc1, cross, same, plain, cross_parent, same_parent = merged_ledger
+        layouts = self.layouts(session)
+        changes = queries.ChangeSet()
+
+        queries.add_to_merge(session, same_parent.id, plain.id, changes)
+
+        assert changes.updated == {plain.id}
+        assert changes.merge_parents == {same_parent.id}
+        self.assert_patched(session, layouts, changes)
+
+    def test_dissolving_a_group(self, session, merged_ledger):
+        acc1, cross, same, plain, cross_parent, same_parent = merged_ledger
+        layouts = self.layouts(session)
+        changes = queries.ChangeSet()
+
+        queries.remove_from_merge(session, same[0].id, changes)
+
+        assert changes.updated == {same[0].id, same[1].id}
+        assert changes.deleted == {same_parent.id}
+        self.assert_patched(session, layouts, changes)
+
+    def test_too_many_changes_need_a_reload(self, session, sample_account):
+        layout = queries.load_transaction_layout(session, sample_account.id)
+        changes = queries.ChangeSet(inserted=set(range(1000, 1000 + queries.LAYOUT_PATCH_UNITS + 1)))
+
+        assert queries.update_transaction_layout(session, layout, sample_account.id, False, changes) is None
+
+    def test_changes_asking_for_a_reload_are_not_patched(self, session, sample_account):
+        layout = queries.load_transaction_layout(session, sample_account.id)
+
+        assert queries.update_transaction_layout(
+            session, layout, sample_account.id, False, queries.ChangeSet(reload=True)
+        ) is None
+
+    def test_patch_does_not_touch_the_cached_layout(self, session, sample_account):
+        layout = queries.load_transaction_layout(session, sample_account.id)
+        rows = list(layout.rows)
+        changes = queries.ChangeSet()
+        self.add_transactions(session, random.Random(1), 1, changes)
+
+        queries.update_transaction_layout(session, layout, sample_account.id, False, changes)
+
+        assert list(layout.rows) == rows
+
+
+class TestSearch:
+    def test_matches_word_prefixes_case_insensitively(self, session, sample_account):
+        ids = queries.search_transaction_ids(session, "groc")
+
+        assert {session.get(Transaction, i).description for i in ids} == {"Grocery Store"}
+
+    def test_every_word_must_match(self, session, sample_account):
+        assert len(queries.search_transaction_ids(session, "grocery store")) == 1
+        assert queries.search_transaction_ids(session, "grocery salary") == set()
+
+    def test_matches_account_name_and_amount(self, session, sample_account):
+        assert len(queries.search_transaction_ids(session, "checking")) == 3
+        (tx_id,) = queries.search_transaction_ids(session, "-50.00")
+        assert session.get(Transaction, tx_id).description == "Grocery Store"
+
+    def test_query_syntax_is_taken_literally(self, session, sample_account):
+        for term in ['"', "OR", "NOT salary", "a*b", "(", "description:x", "  "]:
+            queries.search_transaction_ids(session, term)
+
+    def test_index_follows_writes(self, session, sample_account):
+        tx = session.query(Transaction).filter_by(description="Salary").one()
+        tx.description = "Bonus"
+        tx.original_value = Decimal("123.45")
+        sample_account.name = "Savings"
+        session.commit()
+
+        assert queries.search_transaction_ids(session, "salary") == set()
+        assert queries.search_transaction_ids(session, "bonus 123.45 savings") == {tx.id}
+        assert queries.search_transaction_ids(session, "checking") == set()
+
+        session.delete(tx)
+        session.commit()
+        assert queries.search_transaction_ids(session, "bonus") == set()
+
+    def test_index_has_a_row_per_transaction(self, session, sample_account, merged_ledger):
+        indexed = session.connection().exec_driver_sql(
+            "SELECT rowid FROM transactions_search ORDER BY rowid"
+        ).scalars().all()
+
+        assert indexed == [tx.id for tx in session.query(Transaction).order_by(Transaction.id)]
+
+
+class TestRowSearchIndex:
+    WORDS = ["Coop", "Migros", "café", "Zürich", "SBB-Ticket", "rent_2025", "A.B", "x"]
+
+    @pytest.fixture()
+    def random_ledger(self, session):
+        rng = random.Random(7)
+        accounts = [Account(name=name, currency=Currency.CHF) for name in ("Main Checking", "Visa")]
+        session.add_all(accounts)
+        session.flush()
+        for i in range(300):
+            value = Decimal(rng.randrange(-100000, 100000)) / 100
+            session.add(Transaction(
+                account_id=rng.choice(accounts).id,
+                description=" ".join(rng.choice(self.WORDS) for _ in range(rng.randint(1, 3))),
+                original_value=value, original_currency=Currency.CHF,
+                value_in_account_currency=value, date=datetime(2025, 1, 1) + timedelta(hours=i),
+            ))
+        session.commit()
+        return queries.load_transaction_layout(session, all_accounts=True)
+
+    def random_terms(self, rng):
+        for _ in range(200):
+            words = []
+            for _ in range(rng.randint(1, 2)):
+                word = rng.choice(self.WORDS + ["main", "visa", "12", "-3", ".5", "b-t", "cafe"])
+                words.append(word[:rng.randint(1, len(word))])
+            yield " ".join(words)
+
+    def fts_rows(self, session, layout, term):
+        ids = queries.search_transaction_ids(session, term)
+        return [i for i, entry in enumerate(layout.rows) if abs(entry) in ids]
+
+    def test_matches_like_the_full_text_index(self, session, random_ledger):
+        index = queries.load_row_search_index(session, random_ledger)
+        indexed = queries.load_row_search_index(session, random_ledger)
+        indexed.build_postings()
+
+        for term in self.random_terms(random.Random(1)):
+            expected = self.fts_rows(session, random_ledger, term)
+            assert index.matches(queries.search_terms(term)) == expected, term
+            assert indexed.matches(queries.search_terms(term)) == expected, term
+
+    def test_extending_a_term_narrows_its_matches(self, session, random_ledger):
+        index = queries.load_row_search_index(session, random_ledger)
+
+        for term in self.random_terms(random.Random(2)):
+            for cut in range(1, len(term)):
+                prefix = queries.search_terms(term[:cut])
+                if prefix:
+                    within = index.matches(prefix)
+                    assert index.matches(queries.search_terms(term), within) == \
+                        self.fts_rows(session, random_ledger, term), term
+
+    def test_close_stops_building(self, session, random_ledger):
+        index = queries.load_row_search_index(session, random_ledger)
+        index.close()
+        index.build_postings()
+
+        assert index._postings is None
+        assert index.matches(["coop"]) == self.fts_rows(session, random_ledger, "coop")
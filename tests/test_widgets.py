@@ -1,7 +1,9 @@
 import pytest
 from datetime import datetime
+from decimal import Decimal
 
 import db
+import queries
 from models.finance import Account, Currency, Transaction
 from ui.app import FinViewApp
 from ui.widgets import AccountSidebar, TransactionTable, AllAccountsItem, AccountItem
@@ -57,6 +59,30 @@ class TestTransactionTable:
             assert "account" not in table.columns
             assert table.row_count == 3
 
+    async def test_switching_back_reuses_the_layout(self, sample_account, finview_app):
+        async with finview_app.run_test() as pilot:
+            await pilot.pause()
+            table = pilot.app.query_one(TransactionTable)
+            table.update_account(sample_account, pilot.app.db)
+            layout = table._layout
+            table.update_all_accounts(pilot.app.db)
+            table.update_account(sample_account, pilot.app.db)
+            await pilot.pause()
+
+            assert table._layout is layout
+
+            # A change since is shown after switching back
+            table.focus()
+            table.move_cursor(row=0)
+            was_reviewed = table.get_row_at(0)[-1]
+            await pilot.press("enter")
+            table.update_all_accounts(pilot.app.db)
+            table.update_account(sample_account, pilot.app.db)
+            await pilot.pause()
+
+            assert table._layout is not layout
+            assert table.get_row_at(0)[-1] != was_reviewed
+
 
 class TestToggleReviewed:
     async def test_toggle_reviewed_status(self, sample_account, finview_app):
@@ -77,8 +103,8 @@ class TestToggleReviewed:
             await pilot.pause()
 
             # Get the transaction before toggle
-            row_key, _ = table.coordinate_to_cell_key(table.cursor_coordinate)
-            tx = pilot.app.db.get(Transaction, int(row_key.value))
+            row_key = table._key_at(table.cursor_coordinate.row)
+            tx = pilot.app.db.get(Transaction, int(row_key))
             was_reviewed = tx.reviewed_at is not None
 
             await pilot.press("enter")
@@ -264,13 +290,13 @@ class TestVimNavigation:
             await pilot.pause()
             # Check first 3 rows are now reviewed
             for row_idx in range(3):
-                row_key = table._row_locations.get_key(row_idx)
-                tx = pilot.app.db.get(Transaction, int(row_key.value))
+                row_key = table._key_at(row_idx)
+                tx = pilot.app.db.get(Transaction, int(row_key))
                 pilot.app.db.refresh(tx)
                 assert tx.reviewed_at is not None, f"Row {row_idx} should be reviewed"
             # Row 3 should still be unreviewed
-            row_key = table._row_locations.get_key(3)
-            tx = pilot.app.db.get(Transaction, int(row_key.value))
+            row_key = table._key_at(3)
+            tx = pilot.app.db.get(Transaction, int(row_key))
             pilot.app.db.refresh(tx)
             assert tx.reviewed_at is None
 
@@ -284,12 +310,250 @@ class TestVimNavigation:
             await pilot.press("enter")
             await pilot.pause()
             for row_idx in [8, 9]:
-                row_key = table._row_locations.get_key(row_idx)
-                tx = pilot.app.db.get(Transaction, int(row_key.value))
+                row_key = table._key_at(row_idx)
+                tx = pilot.app.db.get(Transaction, int(row_key))
                 pilot.app.db.refresh(tx)
                 assert tx.reviewed_at is not None
 
 
+class TestBulkReview:
+    async def _setup_table(self, pilot, account):
+        await pilot.pause()
+        table = pilot.app.query_one(TransactionTable)
+        table.update_account(account, pilot.app.db)
+        await pilot.pause()
+        table.focus()
+        table.move_cursor(row=0)
+        await pilot.pause()
+        return table
+
+    async def test_batch_toggle_is_one_update(self, account_with_10_txs, finview_app):
+        from sqlalchemy import event
+
+        statements = []
+
+        def capture(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        async with finview_app.run_test() as pilot:
+            table = await self._setup_table(pilot, account_with_10_txs)
+            event.listen(db.engine, "before_cursor_execute", capture)
+            try:
+                await pilot.press("8", "enter")
+                await pilot.pause()
+            finally:
+                event.remove(db.engine, "before_cursor_execute", capture)
+
+            assert len([s for s in statements if s.startswith("UPDATE")]) == 1
+            assert [table.get_row_at(i)[-1] for i in range(10)] == ["Yes"] * 8 + ["No"] * 2
+            assert table._total_unreviewed == 2
+
+    async def test_batch_toggle_reviews_groups_not_their_children(self, account_with_10_txs, finview_app):
+        async with finview_app.run_test() as pilot:
+            session = pilot.app.db
+            txs = session.query(Transaction).filter_by(account_id=account_with_10_txs.id).all()
+            newest = sorted(txs, key=lambda t: t.date)[-2:]
+            parent = queries.create_merge(session, [t.id for t in newest], "Pair")
+            table = await self._setup_table(pilot, account_with_10_txs)
+            assert table.get_row_at(0)[2] == "Pair"
+
+            # Header, its two children and one plain row
+            await pilot.press("4", "enter")
+            await pilot.pause()
+
+            session.expire_all()
+            assert session.get(Transaction, parent.id).reviewed_at is not None
+            assert all(session.get(Transaction, t.id).reviewed_at is None for t in newest)
+            assert [table.get_row_at(i)[-1] for i in range(5)] == ["Yes", "Yes", "Yes", "Yes", "No"]
+
+
+class TestVirtualRows:
+    """The table knows every row's position but only loads the rows around the view."""
+
+    @pytest.fixture(autouse=True)
+    def small_pages(self, monkeypatch):
+        monkeypatch.setattr(TransactionTable, "PAGE_SIZE", 2)
+        monkeypatch.setattr(TransactionTable, "MAX_LOADED_PAGES", 2)
+
+    async def _setup_table(self, pilot, account):
+        await pilot.pause()
+        table = pilot.app.query_one(TransactionTable)
+        table.update_account(account, pilot.app.db)
+        await pilot.pause()
+        table.focus()
+        table.move_cursor(row=0)
+        await pilot.pause()
+        return table
+
+    async def test_only_pages_in_view_are_loaded(self, account_with_10_txs, finview_app):
+        async with finview_app.run_test(size=(100, 10)) as pilot:
+            table = await self._setup_table(pilot, account_with_10_txs)
+            assert table.row_count == 10
+            assert len(table._loaded_pages) <= 2
+            assert len(table._data) <= 4
+
+    async def test_first_paint_reads_one_window_of_the_layout(self, account_with_10_txs, finview_app):
+        async with finview_app.run_test(size=(100, 10)) as pilot:
+            await pilot.pause()
+            table = pilot.app.query_one(TransactionTable)
+            table.update_account(account_with_10_txs, pilot.app.db)
+
+            assert table.row_count == 2
+            assert not table._layout.complete
+
+            # The rest is added after the first paint
+            while not table._layout.complete:
+                await pilot.pause()
+            assert table.row_count == 10
+            assert table.get_row_at(9)[2] == "Transaction 1"
+
+    async def test_G_and_search_complete_the_layout(self, account_with_10_txs, finview_app):
+        async with finview_app.run_test(size=(100, 10)) as pilot:
+            await pilot.pause()
+            table = pilot.app.query_one(TransactionTable)
+            table.update_account(account_with_10_txs, pilot.app.db)
+            table.action_scroll_bottom()
+            assert table.cursor_row == 9
+
+            table.update_all_accounts(pilot.app.db)
+            table.update_account(account_with_10_txs, pilot.app.db)
+            table.search("Transaction 1")
+            assert table._search_matches == [0, 9]
+
+    async def test_G_loads_last_page(self, account_with_10_txs, finview_app):
+        async with finview_app.run_test(size=(100, 10)) as pilot:
+            table = await self._setup_table(pilot, account_with_10_txs)
+            await pilot.press("G")
+            await pilot.pause()
+            assert table.cursor_coordinate.row == 9
+            assert table.get_row_at(9)[0] == "10"
+            assert "10" not in table._loaded_index  # first row evicted
+            assert len(table._data) <= 4
+
+    async def test_count_prefix_jumps_to_unloaded_row(self, account_with_10_txs, finview_app):
+        async with finview_app.run_test(size=(100, 10)) as pilot:
+            table = await self._setup_table(pilot, account_with_10_txs)
+            await pilot.press("7", "j")
+            await pilot.pause()
+            assert table.cursor_coordinate.row == 7
+            assert table.get_row_at(7)[2] == "Transaction 3"
+
+    async def test_toggle_far_row(self, account_with_10_txs, finview_app):
+        async with finview_app.run_test(size=(100, 10)) as pilot:
+            table = await self._setup_table(pilot, account_with_10_txs)
+            await pilot.press("G")
+            await pilot.pause()
+            await pilot.press("enter")
+            await pilot.pause()
+            row_key = table._key_at(9)
+            tx = pilot.app.db.get(Transaction, int(row_key))
+            assert tx.reviewed_at is not None
+            assert table.get_cell(row_key, "reviewed") == "Yes"
+
+    async def test_search_finds_rows_on_unloaded_pages(self, account_with_10_txs, finview_app):
+        async with finview_app.run_test(size=(100, 10)) as pilot:
+            table = await self._setup_table(pilot, account_with_10_txs)
+            table.search("Transaction 1")
+            await pilot.pause()
+            # "Transaction 10" and "Transaction 1" are the first and last rows
+            assert table._search_matches == [0, 9]
+            assert table.cursor_coordinate.row == 0
+
+    def assert_rows_match_layout(self, table):
+        fresh = queries.load_transaction_layout(table._session, table.current_account.id)
+        assert list(table._layout.rows) == list(fresh.rows)
+        for key, index in table._loaded_index.items():
+            assert table._key_at(index) == key
+            assert table.get_row_at(index)[0] == str(index + 1)
+
+    async def test_merge_patches_the_loaded_rows(self, account_with_10_txs, finview_app, monkeypatch):
+        async with finview_app.run_test(size=(100, 10)) as pilot:
+            table = await self._setup_table(pilot, account_with_10_txs)
+            await pilot.press("G")
+            await pilot.pause()
+            cursor_key = table._key_at(9)
+            first_key = table._key_at(0)
+            monkeypatch.setattr(queries, "load_transaction_layout_window", None)
+            changes = queries.ChangeSet()
+
+            # Transactions 1 and 3 become one group, dated like Transaction 3
+            queries.create_merge(pilot.app.db, [int(table._key_at(9)), int(table._key_at(7))], "Group", changes)
+            table.apply_changes(changes)
+            await pilot.pause()
+
+            assert table.row_count == 11
+            assert table._key_at(table.cursor_coordinate.row) == cursor_key
+            assert table._key_at(0) == first_key
+            assert len(table._merge_child_rows) == 2
+            monkeypatch.undo()
+            self.assert_rows_match_layout(table)
+
+    async def test_split_patches_the_loaded_rows(self, account_with_10_txs, finview_app, monkeypatch):
+        async with finview_app.run_test(size=(100, 10)) as pilot:
+            table = await self._setup_table(pilot, account_with_10_txs)
+            root_id = int(table._key_at(0))
+            monkeypatch.setattr(queries, "load_transaction_layout_window", None)
+            changes = queries.ChangeSet()
+
+            queries.save_split(
+                pilot.app.db, root_id,
+                [{"id": None, "description": "Part", "amount": Decimal("40")}] * 2, changes,
+            )
+            table.apply_changes(changes)
+            await pilot.pause()
+
+            # The split parent is replaced by its children
+            assert table.row_count == 11
+            assert table.cursor_coordinate.row == 0
+            assert [table.get_row_at(i)[2] for i in range(3)] == ["Part [s]", "Part [s]", "Transaction 9"]
+            monkeypatch.undo()
+            self.assert_rows_match_layout(table)
+
+    async def test_many_changes_load_the_layout_anew(self, account_with_10_txs, finview_app, monkeypatch):
+        async with finview_app.run_test(size=(100, 10)) as pilot:
+            table = await self._setup_table(pilot, account_with_10_txs)
+            await pilot.press("3", "j")
+            await pilot.pause()
+            cursor_key = table._key_at(3)
+            monkeypatch.setattr(queries, "LAYOUT_PATCH_UNITS", 0)
+            changes = queries.ChangeSet()
+
+            queries.create_merge(pilot.app.db, [int(table._key_at(0)), int(table._key_at(1))], "Group", changes)
+            table.apply_changes(changes)
+            await pilot.pause()
+
+            assert table.row_count == 11
+            assert table._key_at(table.cursor_coordinate.row) == cursor_key
+            self.assert_rows_match_layout(table)
+
+
+class TestImportRefresh:
+    async def test_finished_import_patches_table_and_balances(self, account_with_10_txs, finview_app, monkeypatch):
+        async with finview_app.run_test() as pilot:
+            await pilot.pause()
+            table = pilot.app.query_one(TransactionTable)
+            table.update_account(account_with_10_txs, pilot.app.db)
+            await pilot.pause()
+            sidebar = pilot.app.query_one(AccountSidebar)
+            highlighted = sidebar.index
+            staged = queries.StagedImport()
+            staged.write_rows([{
+                "import_fingerprint": "imported", "account_id": account_with_10_txs.id,
+                "description": "Imported", "original_value": -5.0, "original_currency": Currency.CHF,
+                "value_in_account_currency": -5.0, "date": datetime(2025, 1, 5, 12),
+            }])
+            monkeypatch.setattr(queries, "load_transaction_layout_window", None)
+
+            pilot.app._finish_import(staged)
+            await pilot.pause()
+
+            assert table.row_count == 11
+            assert table.get_row_at(5)[2] == "Imported"
+            assert sidebar.index == highlighted
+            item = next(i for i in pilot.app.query(AccountItem) if i.account.id == account_with_10_txs.id)
+            assert item._balance_text() == "545.00 CHF"
+
+
 class TestCommandMode:
     async def test_save_command(self, finview_app, tmp_path):
         save_path = str(tmp_path / "cmd_save.db")
@@ -14,9 +14,13 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import threading
+import time
+from functools import partial
+
 from textual.app import App, ComposeResult
 from textual.css.query import NoMatches
-from textual.widgets import Header, Footer, Static, Input
+from textual.widgets import Header, Footer, Static, Input, ProgressBar
 from textual.containers import Horizontal, Vertical
 from textual.binding import Binding
 
@@ -35,11 +39,24 @@ class FinViewApp(App):
         Binding("colon", "show_command_line", "Command", show=False),
     ]
 
+    # Background CSV import state (see process_csv_import)
+    importing = False
+    import_status = ""
+    _import_started = 0.0
+    _import_cancel: threading.Event | None = None
+
+    # Seconds between autosave checks (see _autosave)
+    AUTOSAVE_INTERVAL = 60.0
+    _autosaving = False
+
     def on_mount(self) -> None:
         self.db = db.SessionLocal()
         self.refresh_accounts()
+        self.set_interval(self.AUTOSAVE_INTERVAL, self._autosave)
 
     def on_unmount(self) -> None:
+        if self._import_cancel is not None:
+            self._import_cancel.set()
         self.db.close()
 
     def refresh_accounts(self):
@@ -58,6 +75,13 @@ class FinViewApp(App):
         table = self.query_one(TransactionTable)
         table.update_all_accounts(self.db)
 
+    def refresh_balances(self):
+        """Update the balances in the sidebar, keeping the selection and the table."""
+        balances = {acc.id: balance for acc, balance in queries.get_all_accounts_with_balances(self.db)}
+        for item in self.query(AccountItem):
+            if item.account.id in balances:
+                item.set_balance(balances[item.account.id])
+
     def compose(self) -> ComposeResult:
         yield Header()
         with Horizontal():
@@ -67,6 +91,7 @@ class FinViewApp(App):
             with Vertical():
                 yield Static("", id="review-banner")
                 yield TransactionTable(id="main-content")
+                yield ProgressBar(id="import-progress", show_eta=False)
                 yield Static("", id="page-info")
         yield Input(id="command-input")
         yield Input(id="search-input", placeholder="/")
@@ -110,6 +135,11 @@ class FinViewApp(App):
         if cmd:
             self._handle_command(cmd)
 
+    def on_input_changed(self, event: Input.Changed) -> None:
+        # Changes made while the input is hidden only reset its value
+        if event.input.id == "search-input" and event.input.has_class("visible"):
+            self.query_one(TransactionTable).incremental_search(event.value)
+
     def on_key(self, event) -> None:
         try:
             cmd_input = self.query_one("#command-input", Input)
@@ -124,6 +154,7 @@ class FinViewApp(App):
             return
 
         if search_input.has_class("visible") and event.key == "escape":
+            self.query_one(TransactionTable).cancel_incremental_search()
             self._hide_search_input()
             event.prevent_default()
             event.stop()
@@ -152,6 +183,7 @@ class FinViewApp(App):
         search_input.value = ""
         search_input.add_class("visible")
         search_input.focus()
+        self.query_one(TransactionTable).prepare_incremental_search()
 
     def _hide_search_input(self):
         search_input = self.query_one("#search-input", Input)
@@ -160,10 +192,13 @@ class FinViewApp(App):
         self.query_one(TransactionTable).focus()
 
     def _handle_command(self, cmd: str):
-        if cmd.startswith(":wq"):
+        if cmd == ":cancel":
+            self._cancel_import()
+        elif cmd.startswith(":wq"):
             path = cmd[3:].strip() or None
             self._save_db(path, quit_after=True)
         elif cmd == ":q!":
+            db.discard_autosave()
             self.exit()
         elif cmd == ":q":
             if db.is_dirty():
@@ -176,9 +211,73 @@ class FinViewApp(App):
         elif cmd.startswith(":w"):
             path = cmd[2:].strip() or None
             self._save_db(path)
+        elif cmd == ":checkbalances":
+            self._check_balances()
+        elif cmd.split()[0] in (":review", ":unreview"):
+            self._review_command(cmd)
         else:
             self.notify(f"Unknown command: {cmd}", severity="error")
 
+    def _check_balances(self):
+        """Recompute all account balances, report and repair any cached ones that drifted."""
+        mismatches = queries.check_account_balances(self.db, repair=True)
+        if not mismatches:
+            self.notify("All account balances are consistent")
+            return
+        details = ", ".join(
+            f"{acc.name}: {cached:.2f} -> {computed:.2f}" for acc, cached, computed in mismatches
+        )
+        self.notify(f"Repaired balances: {details}", severity="warning")
+        db.mark_dirty()
+        self.refresh_accounts()
+
+    def _review_command(self, cmd: str):
+        """:review / :unreview all or all-matching: (un)mark rows of the view in one go."""
+        verb, _, scope = cmd.partition(" ")
+        scope = scope.strip()
+        if scope not in ("all", "all-matching"):
+            self.notify(f"Usage: {verb} all|all-matching", severity="error")
+            return
+        table = self.query_one(TransactionTable)
+        if scope == "all":
+            table.complete_layout()
+            rows = range(table.row_count)
+        elif matches := table.matching_rows():
+            rows = matches
+        else:
+            self.notify("No search matches; search with / first", severity="warning")
+            return
+        reviewed = verb == ":review"
+        changed = table.set_reviewed_rows(rows, reviewed)
+        self.notify(f"Marked {changed} transactions {'reviewed' if reviewed else 'unreviewed'}")
+
+    def _autosave(self):
+        """Snapshot unsaved changes to the recovery file in a background thread."""
+        if self._autosaving:
+            return
+        job = db.prepare_autosave()
+        if job is None:
+            return
+        self._autosaving = True
+        self.run_worker(
+            partial(self._run_autosave, job),
+            name="autosave",
+            group="autosave",
+            thread=True,
+            exit_on_error=False,
+        )
+
+    def _run_autosave(self, job):
+        try:
+            job()
+        except Exception as e:
+            try:
+                self.call_from_thread(self.notify, f"Autosave failed: {e}", severity="warning")
+            except RuntimeError:
+                pass
+        finally:
+            self._autosaving = False
+
     def _save_db(self, path: str | None = None, quit_after: bool = False):
         target = path or db.db_file_path
         if target is None:
@@ -248,16 +347,134 @@ class FinViewApp(App):
 
         self.push_screen(CreateAccountScreen(), handle_result)
 
+    def block_if_importing(self) -> bool:
+        """Return True (and tell the user) while an import is running; one runs at a time.
+
+        Nothing else needs to wait for it: the import only parses into a staged
+        import of its own until it is merged in _finish_import.
+        """
+        if not self.importing:
+            return False
+        self.notify(
+            "An import is running. Wait for it to finish or cancel it with :cancel",
+            severity="warning",
+        )
+        return True
+
     def process_csv_import(self, csv_path: str, account):
-        """Processes the CSV file using the account's mapping spec."""
+        """Imports the CSV file in a background worker using the account's mapping spec.
+
+        csv_path may be a glob pattern (e.g. ~/exports/*.csv); the matching files are
+        then parsed in parallel and imported together.
+        """
+        if self.block_if_importing():
+            return
+        self.importing = True
+        self._import_started = time.monotonic()
+        self._import_cancel = threading.Event()
+        self._show_import_progress(None)
+        self.run_worker(
+            partial(
+                self._run_import,
+                queries.ImportJob.for_account(csv_path, account),
+                self._import_cancel,
+            ),
+            name="csv-import",
+            group="import",
+            thread=True,
+            exit_on_error=False,
+        )
+
+    def _run_import(self, job: "queries.ImportJob", cancel: threading.Event):
+        """Worker thread body: parse the files into a staged import and hand it back.
+
+        The worker never touches the app's connection; the rows reach the database
+        only when _finish_import merges them on the UI thread.
+        """
+
+        def progress(p: queries.ImportProgress):
+            if cancel.is_set():
+                raise queries.ImportCancelled()
+            self.call_from_thread(self._show_import_progress, p)
+
+        staged = queries.StagedImport()
         try:
-            count = queries.import_csv_transactions(self.db, csv_path, account)
-            db.mark_dirty()
-            self.notify(f"Successfully imported {count} transactions.")
-            self.query_one(TransactionTable).update_account(account, self.db)
-            self.refresh_accounts()
-        except (FileNotFoundError, ValueError) as e:
-            self.notify(str(e), severity="error")
+            if queries.is_glob_pattern(job.csv_path):
+                paths = queries.expand_import_glob(job.csv_path)
+                if not paths:
+                    raise FileNotFoundError(f"No files match: {job.csv_path}")
+                queries.stage_csv_batch(
+                    staged, [job._replace(csv_path=path) for path in paths], progress=progress
+                )
+            else:
+                queries.stage_csv_import(staged, job, progress=progress)
+            outcome = staged
         except Exception as e:
-            self.db.rollback()
-            self.notify(f"Import failed: {str(e)}", severity="error")
+            staged.close()
+            outcome = e
+
+        try:
+            self.call_from_thread(self._finish_import, outcome, cancel)
+        except RuntimeError:
+            # App already shut down; nothing was written
+            if outcome is staged:
+                staged.close()
+
+    def _show_import_progress(self, p: "queries.ImportProgress | None"):
+        bar = self.query_one("#import-progress", ProgressBar)
+        bar.add_class("visible")
+        if p is None:
+            bar.update(total=None, progress=0)
+            self.import_status = "importing…"
+        else:
+            elapsed = max(time.monotonic() - self._import_started, 1e-6)
+            bar.update(total=p.bytes_total or None, progress=p.bytes_read)
+            self.import_status = (
+                f"importing: {p.rows_parsed:,} parsed, {p.rows_parsed / elapsed:,.0f} rows/s"
+            )
+        self._update_page_info()
+
+    def _finish_import(self, outcome, cancel: threading.Event | None = None):
+        """Merge a staged import, unless cancelled meanwhile, and report the outcome."""
+        self.importing = False
+        self.import_status = ""
+        self.query_one("#import-progress", ProgressBar).remove_class("visible")
+
+        changes = queries.ChangeSet()
+        if isinstance(outcome, queries.StagedImport):
+            staged = outcome
+            try:
+                if cancel is not None and cancel.is_set():
+                    outcome = queries.ImportCancelled()
+                else:
+                    outcome = queries.merge_staged_import(self.db, staged, changes=changes)
+            except Exception as e:
+                outcome = e
+            finally:
+                staged.close()
+
+        if isinstance(outcome, queries.ImportCancelled):
+            self.notify("Import cancelled. No transactions were imported.", severity="warning")
+        elif isinstance(outcome, (FileNotFoundError, ValueError)):
+            self.notify(str(outcome), severity="error")
+        elif isinstance(outcome, Exception):
+            self.notify(f"Import failed: {str(outcome)}", severity="error")
+        else:
+            inserted, skipped = outcome
+            if inserted:
+                db.mark_dirty()
+            message = f"Successfully imported {inserted} transactions."
+            if skipped:
+                message += f" Skipped {skipped} already imported."
+            self.notify(message)
+            self.refresh_balances()
+            self.query_one(TransactionTable).apply_changes(changes)
+        self._update_page_info()
+
+    def _cancel_import(self):
+        if not self.importing:
+            self.notify("No import is running", severity="warning")
+            return
+        self._import_cancel.set()
+        self.import_status = "cancelling import…"
+        self._update_page_info()
@@ -14,17 +14,14 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-import os
-import yaml
 from decimal import Decimal
-from pydantic import ValidationError
 from textual.app import ComposeResult
 from textual.screen import ModalScreen
 from textual.widgets import Label, Input, Button, Select, Static
 from textual.containers import Vertical, Horizontal, VerticalScroll
 from datetime import datetime
 from models.finance import Account, Currency, Transaction
-from importers.schema import ImporterMapping
+from importers import registry
 
 class CreateAccountScreen(ModalScreen[dict]):
     """
@@ -32,31 +29,10 @@ class CreateAccountScreen(ModalScreen[dict]):
     Returns a dictionary with the form data or None if cancelled.
     """
     def get_mapping_options(self) -> list[tuple[str, str | None]]:
-        """Scans ./importers, validates YAMLs, and returns list of (Display Name, Path)."""
-        base_path = "./importers"
+        """Lists the valid specs under ./importers as (Display Name, Path)."""
         options = [("No Mapping / Manual", None)]
-        
-        if not os.path.exists(base_path):
-            return options
-
-        for root, _, files in os.walk(base_path):
-            for f in files:
-                if f.endswith((".yaml", ".yml")):
-                    full_path = os.path.join(root, f)
-                    rel_path = os.path.relpath(full_path, base_path)
-                    
-                    try:
-                        with open(full_path, "r") as stream:
-                            config_data = yaml.safe_load(stream)
-                            # Validate using Pydantic
-                            mapping = ImporterMapping(**config_data)
-                            
-                            # Success: Use the 'name' from YAML for the display
-                            display_name = f"{mapping.name} ({rel_path})"
-                            options.append((display_name, rel_path))
-                    except (yaml.YAMLError, ValidationError, TypeError):
-                        # Skip invalid files silently or log them
-                        continue
+        for rel_path, mapping in registry.list_specs():
+            options.append((f"{mapping.name} ({rel_path})", rel_path))
         return options
 
     def compose(self) -> ComposeResult:
@@ -105,7 +81,7 @@ class ImportFileDialog(ModalScreen[str]):
     """A simple modal to input a file path."""
     def compose(self) -> ComposeResult:
         with Vertical(id="dialog"):
-            yield Label("Enter absolute path to CSV file:")
+            yield Label("Enter absolute path to CSV file (or a glob like *.csv):")
             yield Input(placeholder="/path/to/transactions.csv", id="file_path")
             with Horizontal():
                 yield Button("Cancel", id="cancel")
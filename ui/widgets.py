@@ -15,11 +15,18 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import os
+from collections import OrderedDict
 from decimal import Decimal
 
+from rich.cells import cell_len, set_cell_size
+from rich.segment import Segment
 from rich.style import Style
+from textual.coordinate import Coordinate
 from textual.css.query import NoMatches
-from textual.widgets import ListItem, ListView, DataTable, Label, Static
+from textual.geometry import Size
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+from textual.widgets import ListItem, ListView, Label, Static
 from textual.containers import Horizontal
 from textual.binding import Binding
 
@@ -45,7 +52,7 @@ BASE_COLUMNS = [
 
 ACCOUNT_COLUMN = ("Account", "account")
 
-# Prefix for merge header row keys in the DataTable
+# Prefix for merge header row keys in the TransactionTable
 MERGE_HEADER_KEY_PREFIX = "merge_header_"
 
 
@@ -72,11 +79,60 @@ class AccountItem(ListItem):
     def compose(self):
         yield Horizontal(
             Label(self.account.name, classes="acc-name"),
-            Label(f"{self._balance:.2f} {self.account.currency.value}", classes="acc-bal"),
+            Label(self._balance_text(), classes="acc-bal"),
         )
 
-class TransactionTable(DataTable):
+    def _balance_text(self) -> str:
+        return f"{self._balance:.2f} {self.account.currency.value}"
+
+    def set_balance(self, balance: Decimal):
+        self._balance = balance
+        self.query_one(".acc-bal", Label).update(self._balance_text())
+
+class TransactionTable(ScrollView, can_focus=True):
+    """The transactions of one account or of all accounts, one line per row.
+
+    Drawn line by line (render_line) below a fixed header row. Only the row
+    order is held for the whole view; cells are loaded a page at a time when
+    their rows are drawn or looked up, see "Virtual rows" below.
+    """
+
+    COMPONENT_CLASSES = {"transaction-table--header", "transaction-table--cursor"}
+
+    DEFAULT_CSS = """
+    TransactionTable {
+        background: $surface;
+        color: $foreground;
+        height: auto;
+        max-height: 100%;
+
+        & > .transaction-table--header {
+            text-style: bold;
+            background: $panel;
+            color: $foreground;
+        }
+
+        & > .transaction-table--cursor {
+            background: $block-cursor-blurred-background;
+            color: $block-cursor-blurred-foreground;
+            text-style: $block-cursor-blurred-text-style;
+        }
+
+        &:focus > .transaction-table--cursor {
+            background: $block-cursor-background;
+            color: $block-cursor-foreground;
+            text-style: $block-cursor-text-style;
+        }
+    }
+    """
+
     BINDINGS = [
+        Binding("up", "cursor_up", "Cursor up", show=False),
+        Binding("down", "cursor_down", "Cursor down", show=False),
+        Binding("pageup", "page_up", "Page up", show=False),
+        Binding("pagedown", "page_down", "Page down", show=False),
+        Binding("home,ctrl+home", "scroll_top", "Top", show=False),
+        Binding("end,ctrl+end", "scroll_bottom", "Bottom", show=False),
         Binding("escape", "focus_sidebar", "Sidebar", show=True),
         Binding("i", "import_csv", "Import CSV", show=True),
         Binding("enter", "toggle_reviewed", "Reviewed", show=True),
@@ -84,8 +140,19 @@ class TransactionTable(DataTable):
         Binding("m", "merge_transaction", "Merge", show=True),
     ]
 
+    # Display units per page of loaded rows, and how many pages stay loaded
+    PAGE_SIZE = queries.TRANSACTION_PAGE_SIZE
+    MAX_LOADED_PAGES = 3
+    # Display units added to the layout per step while it is built after the first paint
+    LAYOUT_SLICE_UNITS = 2000
+
+    # Blank cells on either side of each column's text
+    CELL_PADDING = 1
+
     def on_mount(self):
-        self.cursor_type = "row"
+        self.cursor_row = 0
+        self.columns: dict[str, str] = {}  # column key -> label, in display order
+        self._column_widths: dict[str, int] = {}  # column key -> widest text seen
         self.current_account = None
         self._all_accounts_mode = False
         self._row_styles: dict[str, Style] = {}
@@ -97,6 +164,12 @@ class TransactionTable(DataTable):
         self._search_term: str = ""
         self._search_matches: list[int] = []
         self._search_index: int = -1
+        # Search as you type: the row texts of the current layout, built on first
+        # use, and the matches of each term typed so far, so that a longer term
+        # only narrows them
+        self._text_index: queries.RowSearchIndex | None = None
+        self._typed_searches: list[tuple[str, list[int]]] = []
+        self._search_origin_row = 0
         # Merge pending state
         self._merge_pending_tx_id: int | None = None  # for new merges
         self._merge_pending_parent_id: int | None = None  # for add-to-group
@@ -105,27 +178,138 @@ class TransactionTable(DataTable):
         self._merge_child_rows: set[str] = set()  # row keys that are merge children
         self._merge_header_rows: set[str] = set()  # row keys that are merge headers
         self._merge_child_to_parent: dict[str, int] = {}  # child row key → merge parent id
-        for label, key in BASE_COLUMNS:
-            self.add_column(label, key=key)
-
-    def _get_row_style(self, row_index: int, base_style: Style) -> Style:
-        style = super()._get_row_style(row_index, base_style)
-        if row_index < 0:
-            return style
-        row_key = self._row_locations.get_key(row_index)
-        if row_key is not None and row_key.value in self._row_styles:
-            style += self._row_styles[row_key.value]
-        return style
+        # Installs the row layout and the loaded-page state, see _clear_rows()
+        self._clear_rows()
+        self._setup_columns(all_accounts=False)
 
     def _setup_columns(self, all_accounts: bool):
-        """Remove all columns and re-add in correct order for the mode."""
-        for col_key in list(self.columns.keys()):
-            self.remove_column(col_key)
+        """Remove all rows and set the columns in correct order for the mode."""
+        self._clear_rows()
         cols = list(BASE_COLUMNS)
         if all_accounts:
             cols.insert(1, ACCOUNT_COLUMN)
-        for label, key in cols:
-            self.add_column(label, key=key)
+        self.columns = {key: label for label, key in cols}
+        self._column_widths = {key: cell_len(label) for label, key in cols}
+        self._update_virtual_size()
+
+    # --- Drawing ---
+
+    @property
+    def row_count(self) -> int:
+        return len(self._layout)
+
+    @property
+    def cursor_coordinate(self) -> Coordinate:
+        """The cursor's position; the cursor always covers a whole row."""
+        return Coordinate(self.cursor_row, 0)
+
+    def _update_virtual_size(self):
+        width = sum(w + 2 * self.CELL_PADDING for w in self._column_widths.values())
+        # One line per row, plus the header
+        self.virtual_size = Size(width, self.row_count + 1)
+
+    def _measure(self, cells: dict[str, str]):
+        """Widen the columns to fit cells; columns never shrink while a view is shown."""
+        widened = False
+        for key, width in self._column_widths.items():
+            text_width = cell_len(cells.get(key, ""))
+            if text_width > width:
+                self._column_widths[key] = text_width
+                widened = True
+        if widened:
+            self._update_virtual_size()
+            self.refresh()
+
+    def _line(self, texts, style: Style) -> Strip:
+        """A line of cells holding texts, one per column, drawn in style."""
+        pad = " " * self.CELL_PADDING
+        segments = [
+            Segment(f"{pad}{set_cell_size(text, width)}{pad}", style)
+            for text, width in zip(texts, self._column_widths.values())
+        ]
+        return Strip(segments)
+
+    def render_line(self, y: int) -> Strip:
+        scroll_x, scroll_y = self.scroll_offset
+        width = self.size.width
+        base_style = self.rich_style
+        if y == 0:
+            # The header stays in place while the rows scroll under it
+            style = base_style + self.get_component_rich_style("transaction-table--header")
+            line = self._line(self.columns.values(), style)
+        else:
+            row_index = scroll_y + y - 1
+            if row_index >= self.row_count:
+                return Strip.blank(width, base_style)
+            self._load_page_at(row_index)
+            key = self._key_at(row_index)
+            cells = self._data.get(key, {})
+            style = base_style + self._row_styles.get(key, Style())
+            if row_index == self.cursor_row:
+                style += self.get_component_rich_style("transaction-table--cursor")
+            line = self._line((cells.get(column, "") for column in self.columns), style)
+        # The row's colours reach across the whole width, past the last column
+        return line.crop_extend(scroll_x, scroll_x + width, style)
+
+    def on_click(self, event):
+        offset = event.get_content_offset(self)
+        if offset is None or offset.y == 0:
+            return
+        self._move_to(self.scroll_offset.y + offset.y - 1)
+
+    # --- Cursor ---
+
+    def move_cursor(self, *, row: int | None = None, animate: bool = False, scroll: bool = True):
+        """Put the cursor on row (clamped to the rows there are) and scroll it into view."""
+        if row is not None:
+            self.cursor_row = max(0, min(row, self.row_count - 1))
+        if scroll:
+            self._scroll_to_cursor(animate)
+        self.refresh()
+
+    def _scroll_to_cursor(self, animate: bool = False):
+        # Lines below the header
+        height = self.scrollable_content_region.height - 1
+        if height <= 0:
+            return
+        if self.cursor_row < self.scroll_y:
+            self.scroll_to(y=self.cursor_row, animate=animate, immediate=not animate)
+        elif self.cursor_row >= self.scroll_y + height:
+            self.scroll_to(y=self.cursor_row - height + 1, animate=animate, immediate=not animate)
+
+    def _page_height(self) -> int:
+        return max(self.scrollable_content_region.height - 1, 1)
+
+    def action_cursor_up(self):
+        self._move_relative(-1)
+
+    def action_cursor_down(self):
+        self._move_relative(1)
+
+    def action_page_up(self):
+        self._move_relative(-self._page_height())
+
+    def action_page_down(self):
+        self._move_relative(self._page_height())
+
+    def action_scroll_top(self):
+        self._move_to(0)
+
+    def action_scroll_bottom(self):
+        self.complete_layout()
+        self._move_to(self.row_count - 1)
+
+    def get_row_at(self, row_index: int) -> list[str]:
+        """Return the cells of a row, in column order, loading its page if needed."""
+        if not 0 <= row_index < self.row_count:
+            raise IndexError(row_index)
+        self._load_page_at(row_index)
+        cells = self._data.get(self._key_at(row_index), {})
+        return [cells.get(column, "") for column in self.columns]
+
+    def get_cell(self, row_key: str, column_key: str) -> str:
+        """Return one cell of a loaded row."""
+        return self._data[row_key][column_key]
 
     def _row_cells(self, tx, row_num, account_name=None, merge_net=None,
                    merge_reviewed=None, merge_group_name=None,
@@ -226,6 +410,8 @@ class TransactionTable(DataTable):
                 )
             else:
                 parts.append(f"/{self._search_term} [0/0]")
+        if self.app.import_status:
+            parts.append(self.app.import_status)
         # Merge pending indicator (escape brackets to avoid Rich markup interpretation)
         if self._merge_pending_parent_id is not None:
             parts.append(f"\\[merge+: {self._merge_pending_desc[:20]}]")
@@ -260,25 +446,237 @@ class TransactionTable(DataTable):
         return next_tx.merge_parent_id != tx.merge_parent_id
 
     def _load_transactions(self):
-        """Load all transactions and update counts from DB."""
-        session = self._session
+        """Update counts and the row layout from DB; rows are loaded when shown.
+
+        Only the first page of the layout is loaded here, so that opening a view
+        costs one page; the rest is added after the first paint, see _extend_layout.
+        """
         account_id = None if self._all_accounts_mode else self.current_account.id
-        total_count, total_unreviewed, rows = queries.load_transaction_page(
-            session, account_id=account_id, all_accounts=self._all_accounts_mode
+        self._total_count, self._total_unreviewed = queries.count_transactions(
+            self._session, account_id=account_id, all_accounts=self._all_accounts_mode
+        )
+        layout = queries.load_transaction_layout_window(
+            self._session, account_id, self._all_accounts_mode, units=self.PAGE_SIZE
         )
-        self._total_count = total_count
-        self._total_unreviewed = total_unreviewed
 
         # Clear rows only, keep columns
-        self.clear()
-        self._row_styles = {}
+        self._clear_rows()
+        self._clear_search()
+        self._close_text_index()
+        self._layout = layout
+        self._update_virtual_size()
+        self.move_cursor(row=self.cursor_row)
+        self._update_banner()
+        if not layout.complete:
+            self.call_after_refresh(self._extend_layout, layout)
+
+    def _extend_layout(self, layout: queries.TransactionLayout):
+        """Add a slice of units to the layout, then schedule the next one.
+
+        Runs between refreshes on the UI thread, which owns the session, and
+        stops once the view shows another layout.
+        """
+        if layout is not self._layout or layout.complete or self._session is None:
+            return
+        account_id = None if self._all_accounts_mode else self.current_account.id
+        queries.extend_transaction_layout(
+            self._session, layout, account_id, self._all_accounts_mode, self.LAYOUT_SLICE_UNITS
+        )
+        self._update_virtual_size()
+        self._update_page_info()
+        if not layout.complete:
+            self.call_after_refresh(self._extend_layout, layout)
+
+    def complete_layout(self, row_count: int | None = None):
+        """Add the rest of the layout now, for what needs every row of the view.
+
+        With row_count, stop once the layout has that many rows.
+        """
+        extended = False
+        while not self._layout.complete and self._session is not None:
+            if row_count is not None and self.row_count >= row_count:
+                break
+            account_id = None if self._all_accounts_mode else self.current_account.id
+            queries.extend_transaction_layout(
+                self._session, self._layout, account_id, self._all_accounts_mode,
+                None if row_count is None else self.LAYOUT_SLICE_UNITS,
+            )
+            extended = True
+        if extended:
+            self._update_virtual_size()
+            self._update_page_info()
+
+    def apply_changes(self, changes: queries.ChangeSet):
+        """Show what a write changed, updating only the rows of the units it touched.
+
+        Loaded rows elsewhere keep their cells and only get renumbered; the
+        cursor stays on its transaction and the scroll position is kept. Too
+        many changes load the layout anew, see queries.update_transaction_layout.
+        """
+        if not changes or self._session is None:
+            self._update_page_info()
+            return
+        cursor_row = self.cursor_row
+        cursor_key = self._key_at(cursor_row) if cursor_row < self.row_count else None
+        # Patches place units among all the others
+        self.complete_layout()
+        account_id = None if self._all_accounts_mode else self.current_account.id
+        patch = queries.update_transaction_layout(
+            self._session, self._layout, account_id, self._all_accounts_mode, changes
+        )
+        if patch is None:
+            self.reload()
+            return
+
+        self._layout = patch.layout
+        removed = []
+        for key, index in list(self._loaded_index.items()):
+            new_index = patch.row_index(index)
+            if new_index is None:
+                removed.append(key)
+            elif new_index != index:
+                self._loaded_index[key] = new_index
+                self._data[key]["row_num"] = str(new_index + 1)
+        for key in removed:
+            for keys in self._loaded_pages.values():
+                if key in keys:
+                    keys.remove(key)
+        self._unload_rows(removed)
+        # Units put back among loaded rows are loaded right away, others when shown
+        for unit in patch.new_units:
+            page = unit // self.PAGE_SIZE
+            if page in self._loaded_pages:
+                self._loaded_pages[page].extend(self._load_units(unit, unit + 1))
+
         self._clear_search()
+        self._close_text_index()
+        self._total_count, self._total_unreviewed = queries.count_transactions(
+            self._session, account_id=account_id, all_accounts=self._all_accounts_mode
+        )
+        self._update_virtual_size()
+        self.refresh()
+        self._restore_cursor(cursor_key, cursor_row)
+        self._update_banner()
+
+    def reload(self):
+        """Load the rows anew from the DB, keeping the cursor on its transaction."""
+        if self._session is None:
+            return
+        cursor_row = self.cursor_row
+        cursor_key = self._key_at(cursor_row) if cursor_row < self.row_count else None
+        self._load_transactions()
+        self._restore_cursor(cursor_key, cursor_row)
+
+    def _restore_cursor(self, key: str | None, row: int):
+        """Put the cursor on the row with the given key, or near row if it is gone."""
+        if key is not None:
+            if key.startswith(MERGE_HEADER_KEY_PREFIX):
+                entry = -int(key[len(MERGE_HEADER_KEY_PREFIX):])
+            else:
+                entry = int(key)
+            if entry not in self._layout.rows:
+                self.complete_layout()
+            try:
+                row = self._layout.rows.index(entry)
+            except ValueError:
+                pass
+        self._move_to(row)
+
+    def _close_text_index(self):
+        if self._text_index is not None:
+            self._text_index.close()
+            self._text_index = None
+
+    # --- Virtual rows ---
+    #
+    # The table only holds the row order of the whole view (self._layout),
+    # read a window of units at a time after the first, see _extend_layout.
+    # Cells are loaded and formatted a page of display units at a time when a
+    # row is first drawn or looked up, and only the MAX_LOADED_PAGES most
+    # recently used pages are kept.
+
+    def _clear_rows(self):
+        self._layout = queries.TransactionLayout()
+        self._loaded_pages = OrderedDict()  # page number -> row keys
+        self._loaded_index = {}  # row key -> row index, for loaded rows
+        self._data: dict[str, dict[str, str]] = {}  # row key -> column key -> cell
+        self._row_styles = {}
         self._merge_child_rows = set()
         self._merge_header_rows = set()
         self._merge_child_to_parent = {}
-
+        self.cursor_row = 0
+
+    def _key_at(self, row_index: int) -> str:
+        entry = self._layout.rows[row_index]
+        if entry < 0:
+            return f"{MERGE_HEADER_KEY_PREFIX}{-entry}"
+        return str(entry)
+
+    def _load_page_at(self, row_index: int):
+        """Make sure the row at row_index is loaded, with the page of rows around it."""
+        page = self._layout.unit_at_row(row_index) // self.PAGE_SIZE
+        if self._key_at(row_index) in self._loaded_index:
+            if page in self._loaded_pages:
+                self._loaded_pages.move_to_end(page)
+            return
+        start = page * self.PAGE_SIZE
+        keys = self._load_units(start, start + self.PAGE_SIZE)
+        # After apply_changes, a page can have held other rows when it was loaded
+        stale = self._loaded_pages.pop(page, [])
+        self._loaded_pages[page] = keys
+        self._unload_rows(stale)
+
+        while len(self._loaded_pages) > self.MAX_LOADED_PAGES:
+            _, evicted = self._loaded_pages.popitem(last=False)
+            self._unload_rows(evicted)
+
+    def _unload_rows(self, keys):
+        """Drop the cells of rows, except those that a loaded page still holds."""
+        for key in set(keys).difference(*self._loaded_pages.values()):
+            self._loaded_index.pop(key, None)
+            self._data.pop(key, None)
+            self._row_styles.pop(key, None)
+            self._merge_header_rows.discard(key)
+            self._merge_child_rows.discard(key)
+            self._merge_child_to_parent.pop(key, None)
+
+    def _load_units(self, start: int, stop: int) -> list[str]:
+        """Load and format the rows of the display units start..stop; returns their keys."""
+        account_id = None if self._all_accounts_mode else self.current_account.id
+        rows = queries.load_unit_rows(
+            self._session, account_id, self._all_accounts_mode, self._layout.units(start, stop),
+        )
+        first = self._layout.unit_starts[start]
+        last_rows = self._layout.unit_rows(min(stop, self._layout.unit_count) - 1)
+        # Rows that no longer exist are left out, so positions come from the layout
+        positions = {self._key_at(index): index for index in range(first, last_rows.stop)}
+        column_keys = list(self.columns)
+        keys = []
+        for key, cells, style, merge_parent_id, is_header in self._format_rows(rows, first + 1):
+            index = positions.get(key)
+            if index is None:
+                continue
+            keys.append(key)
+            self._loaded_index[key] = index
+            self._data[key] = dict(zip(column_keys, cells))
+            self._data[key]["row_num"] = str(index + 1)
+            self._measure(self._data[key])
+            self._row_styles[key] = style
+            if is_header:
+                self._merge_header_rows.add(key)
+            elif merge_parent_id is not None:
+                self._merge_child_rows.add(key)
+                self._merge_child_to_parent[key] = merge_parent_id
+        return keys
+
+    def _format_rows(self, rows, first: int):
+        """Yield (key, cells, style, merge_parent_id, is_header) for rows from load_unit_rows.
+
+        first is the display number of the first row. merge_parent_id is set for
+        merge children that are shown under their group's header.
+        """
         if self._all_accounts_mode:
-            for i, row in enumerate(rows, start=1):
+            for i, row in enumerate(rows, start=first):
                 tx = row[0]
                 account_name = row[1]
                 merge_net = row[2]
@@ -293,36 +691,32 @@ class TransactionTable(DataTable):
                     net = merge_net if merge_net is not None else 0
                     currency = tx.original_currency.value
                     cells = self._merge_header_cells(tx, i, net, currency, account_name="–")
-                    self.add_row(*cells, key=key)
                     # Merge parent gets normal reviewed/unreviewed background
-                    self._row_styles[key] = REVIEWED_BG if tx.reviewed_at else UNREVIEWED_BG
-                    self._merge_header_rows.add(key)
+                    yield key, cells, REVIEWED_BG if tx.reviewed_at else UNREVIEWED_BG, None, True
                 else:
                     key = str(tx.id)
                     # Determine if this is the last child in its merge group
-                    is_last = self._is_last_merge_child(rows, i - 1)
+                    is_last = self._is_last_merge_child(rows, i - first)
                     cells = self._row_cells(tx, i, account_name=account_name,
                                            merge_net=merge_net,
                                            merge_reviewed=merge_reviewed,
                                            merge_group_name=merge_group_name,
                                            is_last_merge_child=is_last)
-                    self.add_row(*cells, key=key)
                     if tx.merge_parent_id is not None:
                         # Merge children: gray text, no background
-                        self._row_styles[key] = MERGE_CHILD_STYLE
-                        self._merge_child_rows.add(key)
-                        self._merge_child_to_parent[key] = tx.merge_parent_id
+                        yield key, cells, MERGE_CHILD_STYLE, tx.merge_parent_id, False
                     else:
-                        self._row_styles[key] = REVIEWED_BG if tx.reviewed_at else UNREVIEWED_BG
+                        yield key, cells, REVIEWED_BG if tx.reviewed_at else UNREVIEWED_BG, None, False
         else:
-            # Build set of merge parent IDs so we can detect header rows
+            # Build set of merge parent IDs so we can detect header rows;
+            # a page always holds whole merge groups
             merge_parent_ids = set()
             for row in rows:
                 tx = row[0]
                 if tx.merge_parent_id is not None:
                     merge_parent_ids.add(tx.merge_parent_id)
 
-            for i, row in enumerate(rows, start=1):
+            for i, row in enumerate(rows, start=first):
                 tx = row[0]
                 merge_net = row[1]
                 merge_reviewed = row[2]
@@ -337,27 +731,20 @@ class TransactionTable(DataTable):
                     net = merge_net if merge_net is not None else 0
                     currency = tx.original_currency.value
                     cells = self._merge_header_cells(tx, i, net, currency)
-                    self.add_row(*cells, key=key)
-                    self._row_styles[key] = REVIEWED_BG if tx.reviewed_at else UNREVIEWED_BG
-                    self._merge_header_rows.add(key)
+                    yield key, cells, REVIEWED_BG if tx.reviewed_at else UNREVIEWED_BG, None, True
                 else:
                     key = str(tx.id)
-                    is_last = self._is_last_merge_child_single(rows, i - 1)
+                    is_last = self._is_last_merge_child_single(rows, i - first)
                     cells = self._row_cells(tx, i, merge_net=merge_net,
                                            merge_reviewed=merge_reviewed,
                                            merge_group_name=merge_group_name,
                                            is_last_merge_child=is_last,
                                            is_cross_account_merge=is_cross_account)
-                    self.add_row(*cells, key=key)
                     if tx.merge_parent_id is not None and not is_cross_account:
                         # Same-account merge children: gray text, no background
-                        self._row_styles[key] = MERGE_CHILD_STYLE
-                        self._merge_child_rows.add(key)
-                        self._merge_child_to_parent[key] = tx.merge_parent_id
+                        yield key, cells, MERGE_CHILD_STYLE, tx.merge_parent_id, False
                     else:
-                        self._row_styles[key] = REVIEWED_BG if tx.reviewed_at else UNREVIEWED_BG
-
-        self._update_banner()
+                        yield key, cells, REVIEWED_BG if tx.reviewed_at else UNREVIEWED_BG, None, False
 
     def update_account(self, account, session):
         """Populate table with a single account's transactions."""
@@ -411,6 +798,7 @@ class TransactionTable(DataTable):
             if count is not None:
                 self._move_to_display_line(count)
             else:
+                self.complete_layout()
                 self._move_to(self.row_count - 1)
             event.prevent_default()
         elif key == "n":
@@ -430,10 +818,12 @@ class TransactionTable(DataTable):
         self._update_page_info()
 
     def _move_relative(self, delta: int):
-        target = self.cursor_coordinate.row + delta
+        target = self.cursor_row + delta
         self._move_to(target)
 
     def _move_to(self, row: int):
+        if row >= self.row_count:
+            self.complete_layout(row + 1)
         if self.row_count == 0:
             return
         row = max(0, min(row, self.row_count - 1))
@@ -445,21 +835,18 @@ class TransactionTable(DataTable):
     # --- Search ---
 
     def search(self, term: str):
-        """Search all visible rows for term (case-insensitive)."""
+        """Search all rows for term, see queries.search_transaction_ids."""
         self._search_term = term
         self._search_matches = []
         self._search_index = -1
-        term_lower = term.lower()
 
-        for row_idx in range(self.row_count):
-            row_key = self._row_locations.get_key(row_idx)
-            if row_key is None:
-                continue
-            for col_key in self.columns:
-                cell_value = str(self.get_cell(row_key, col_key))
-                if term_lower in cell_value.lower():
-                    self._search_matches.append(row_idx)
-                    break
+        ids = queries.search_transaction_ids(self._session, term)
+        if ids:
+            self.complete_layout()
+            # Headers match by their merge parent, i.e. by the negated id
+            self._search_matches = [
+                row_idx for row_idx, entry in enumerate(self._layout.rows) if abs(entry) in ids
+            ]
 
         if self._search_matches:
             self._search_index = 0
@@ -469,6 +856,64 @@ class TransactionTable(DataTable):
 
         self._update_page_info()
 
+    def matching_rows(self) -> list[int]:
+        """Return the rows matching the current search, top to bottom; none without one."""
+        return list(self._search_matches)
+
+    def prepare_incremental_search(self):
+        """Get ready for search as you type, e.g. when the search input opens.
+
+        Builds the row texts of the current layout if needed and indexes them in
+        a worker thread; until that is done, incremental_search scans the texts.
+        """
+        self._typed_searches = []
+        self._search_origin_row = self.cursor_row
+        if self._text_index is not None or self._session is None:
+            return
+        self.complete_layout()
+        self._text_index = queries.load_row_search_index(self._session, self._layout)
+        self.run_worker(
+            self._text_index.build_postings,
+            name="search-index",
+            group="search-index",
+            thread=True,
+            exclusive=True,
+            exit_on_error=False,
+        )
+
+    def incremental_search(self, term: str):
+        """Show the matches of a partly typed term and move to the first one.
+
+        A term that extends one typed before is only checked against that term's
+        matches; deleting characters goes back to the matches of the shorter term.
+        """
+        if self._text_index is None:
+            self.prepare_incremental_search()
+            if self._text_index is None:
+                return
+        words = queries.search_terms(term)
+        while self._typed_searches and not term.startswith(self._typed_searches[-1][0]):
+            self._typed_searches.pop()
+        if words:
+            within = self._typed_searches[-1][1] if self._typed_searches else None
+            matches = self._text_index.matches(words, within)
+            self._typed_searches.append((term, matches))
+        else:
+            matches = []
+
+        self._search_term = term.strip()
+        self._search_matches = matches
+        self._search_index = 0 if matches else -1
+        self._move_to(matches[0] if matches else self._search_origin_row)
+        self._update_page_info()
+
+    def cancel_incremental_search(self):
+        """Drop the typed search and return to where the cursor was before it."""
+        self._clear_search()
+        self._typed_searches = []
+        self._move_to(self._search_origin_row)
+        self._update_page_info()
+
     def _search_next(self):
         if not self._search_matches:
             return
@@ -498,11 +943,8 @@ class TransactionTable(DataTable):
         """Toggle reviewed status on a specific row. Returns True if toggled."""
         if row_index < 0 or row_index >= self.row_count:
             return False
-        row_key = self._row_locations.get_key(row_index)
-        if row_key is None:
-            return False
-
-        key_value = row_key.value
+        self._load_page_at(row_index)
+        key_value = self._key_at(row_index)
 
         # Merge children are not independently reviewable
         if key_value in self._merge_child_rows:
@@ -522,18 +964,12 @@ class TransactionTable(DataTable):
             db.mark_dirty()
             reviewed = tx.reviewed_at is not None
             self._row_styles[key_value] = REVIEWED_BG if reviewed else UNREVIEWED_BG
-            self.update_cell(row_key, "reviewed", "Yes" if reviewed else "No")
+            self._data[key_value]["reviewed"] = "Yes" if reviewed else "No"
             # Update only this parent's child rows' reviewed text (keep gray style)
-            from textual.widgets._data_table import RowKey
             for child_key_value, child_parent_id in self._merge_child_to_parent.items():
-                if child_parent_id != parent_id:
-                    continue
-                try:
-                    child_row_key = RowKey(child_key_value)
-                    self.update_cell(child_row_key, "reviewed", "Yes" if reviewed else "No")
-                except Exception:
-                    pass
-            self._clear_caches()
+                if child_parent_id == parent_id:
+                    self._data[child_key_value]["reviewed"] = "Yes" if reviewed else "No"
+            self.refresh()
             self._total_unreviewed += -1 if reviewed else 1
             return True
 
@@ -543,23 +979,93 @@ class TransactionTable(DataTable):
             return False
         db.mark_dirty()
         self._row_styles[key_value] = REVIEWED_BG if tx.reviewed_at else UNREVIEWED_BG
-        self.update_cell(row_key, "reviewed", "Yes" if tx.reviewed_at else "No")
-        self._clear_caches()
+        self._data[key_value]["reviewed"] = "Yes" if tx.reviewed_at else "No"
+        self.refresh()
         self._total_unreviewed += -1 if tx.reviewed_at else 1
         return True
 
     def _batch_toggle(self, count: int):
         """Toggle reviewed status on count consecutive rows, stopping at end."""
-        start = self.cursor_coordinate.row
+        start = self.cursor_row
+        self.complete_layout(start + count)
         end = min(start + count, self.row_count)
-        for row_idx in range(start, end):
-            self._toggle_row_at(row_idx)
+        _, skipped = self._review_rows(range(start, end), None)
+        if skipped:
+            self.app.notify(
+                "Rows in a merge group were skipped — review the group instead",
+                severity="warning",
+            )
         # Move cursor to last toggled row
         self.move_cursor(row=end - 1)
         self._update_banner()
 
+    def set_reviewed_rows(self, rows, reviewed: bool) -> int:
+        """Mark the given rows reviewed or unreviewed; returns how many changed.
+
+        Merge children are skipped, their group's header stands for them.
+        """
+        changes, _ = self._review_rows(rows, reviewed)
+        return len(changes)
+
+    def _review_rows(self, rows, reviewed: bool | None) -> tuple[dict[int, bool], bool]:
+        """Set (True/False) or toggle (None) reviewed on rows with one UPDATE.
+
+        Returns the new state of every changed transaction by id, and whether some
+        rows were skipped as merge children, which can only be reviewed as a group.
+        """
+        tx_ids = [self._reviewable_id(row) for row in rows]
+        skipped = None in tx_ids
+        tx_ids = [tx_id for tx_id in tx_ids if tx_id is not None]
+        changes = {}
+        if tx_ids:
+            session = self._session or self.app.db
+            if reviewed is None:
+                changes = queries.toggle_reviewed_many(session, tx_ids)
+            else:
+                changes = dict.fromkeys(queries.set_reviewed(session, tx_ids, reviewed), reviewed)
+        if changes:
+            db.mark_dirty()
+            self._show_reviewed(changes)
+        return changes, skipped
+
+    def _reviewable_id(self, row_index: int) -> int | None:
+        """The transaction whose reviewed status a row shows; None for a merge child.
+
+        Uses the layout, so it works for rows that are not loaded.
+        """
+        entry = self._layout.rows[row_index]
+        if entry < 0:
+            return -entry
+        unit_start = self._layout.unit_starts[self._layout.unit_at_row(row_index)]
+        if self._layout.rows[unit_start] < 0:
+            return None
+        return entry
+
+    def _show_reviewed(self, changes: dict[int, bool]):
+        """Update the loaded rows and counts for new reviewed states, refreshing once."""
+        for key in self._loaded_index:
+            if key in self._merge_header_rows:
+                tx_id = int(key[len(MERGE_HEADER_KEY_PREFIX):])
+            elif key in self._merge_child_rows:
+                tx_id = self._merge_child_to_parent[key]
+            else:
+                tx_id = int(key)
+            if tx_id not in changes:
+                continue
+            reviewed = changes[tx_id]
+            self._data[key]["reviewed"] = "Yes" if reviewed else "No"
+            if key not in self._merge_child_rows:
+                self._row_styles[key] = REVIEWED_BG if reviewed else UNREVIEWED_BG
+        self.refresh()
+
+        account_id = None if self._all_accounts_mode else self.current_account.id
+        self._total_count, self._total_unreviewed = queries.count_transactions(
+            self._session, account_id=account_id, all_accounts=self._all_accounts_mode
+        )
+        self._update_banner()
+
     def action_toggle_reviewed(self):
-        row = self.cursor_coordinate.row
+        row = self.cursor_row
         if self._toggle_row_at(row):
             self._update_banner()
             if row < self.row_count - 1:
@@ -584,8 +1090,7 @@ class TransactionTable(DataTable):
         if self.row_count == 0:
             return
 
-        row_key, _ = self.coordinate_to_cell_key(self.cursor_coordinate)
-        key_value = row_key.value
+        key_value = self._key_at(self.cursor_row)
         session = self._session or self.app.db
 
         # Case 1: cursor is on a merge header row
@@ -596,14 +1101,15 @@ class TransactionTable(DataTable):
                 return
             # If there's a pending ungrouped tx, add it to this group
             if self._merge_pending_tx_id is not None:
+                changes = queries.ChangeSet()
                 try:
-                    queries.add_to_merge(session, parent_id, self._merge_pending_tx_id)
+                    queries.add_to_merge(session, parent_id, self._merge_pending_tx_id, changes)
                     db.mark_dirty()
                     self.app.notify("Transaction added to merge group")
                 except ValueError as e:
                     self.app.notify(str(e), severity="error")
                 self._clear_merge_pending()
-                self._load_transactions()
+                self.apply_changes(changes)
                 return
             self._show_merge_action_screen(parent)
             return
@@ -620,14 +1126,15 @@ class TransactionTable(DataTable):
                 return
             # If there's a pending ungrouped tx, add it to this group
             if self._merge_pending_tx_id is not None:
+                changes = queries.ChangeSet()
                 try:
-                    queries.add_to_merge(session, parent.id, self._merge_pending_tx_id)
+                    queries.add_to_merge(session, parent.id, self._merge_pending_tx_id, changes)
                     db.mark_dirty()
                     self.app.notify("Transaction added to merge group")
                 except ValueError as e:
                     self.app.notify(str(e), severity="error")
                 self._clear_merge_pending()
-                self._load_transactions()
+                self.apply_changes(changes)
                 return
             self._show_merge_action_screen(parent, tx)
             return
@@ -640,14 +1147,15 @@ class TransactionTable(DataTable):
 
         # Case 4: pending merge (add-to-group), different ungrouped tx
         if self._merge_pending_parent_id is not None:
+            changes = queries.ChangeSet()
             try:
-                queries.add_to_merge(session, self._merge_pending_parent_id, tx_id)
+                queries.add_to_merge(session, self._merge_pending_parent_id, tx_id, changes)
                 db.mark_dirty()
                 self.app.notify("Transaction added to merge group")
             except ValueError as e:
                 self.app.notify(str(e), severity="error")
             self._clear_merge_pending()
-            self._load_transactions()
+            self.apply_changes(changes)
             return
 
         # Case 5: pending merge (new merge), different tx
@@ -677,14 +1185,15 @@ class TransactionTable(DataTable):
                 self._clear_merge_pending()
                 self._update_page_info()
                 return
+            changes = queries.ChangeSet()
             try:
-                queries.create_merge(session, [tx1.id, tx2.id], name)
+                queries.create_merge(session, [tx1.id, tx2.id], name, changes)
                 db.mark_dirty()
                 self.app.notify(f"Created merge group: {name}")
             except ValueError as e:
                 self.app.notify(str(e), severity="error")
             self._clear_merge_pending()
-            self._load_transactions()
+            self.apply_changes(changes)
 
         self.app.push_screen(
             MergeTransactionScreen(tx1, tx2, acc1, acc2), handle_merge
@@ -702,8 +1211,9 @@ class TransactionTable(DataTable):
                 self._update_page_info()
                 return
 
+            changes = queries.ChangeSet()
             if result == "remove" and child_tx is not None:
-                dissolved_name = queries.remove_from_merge(session, child_tx.id)
+                dissolved_name = queries.remove_from_merge(session, child_tx.id, changes)
                 db.mark_dirty()
                 if dissolved_name:
                     self.app.notify(
@@ -711,18 +1221,18 @@ class TransactionTable(DataTable):
                     )
                 else:
                     self.app.notify("Transaction removed from merge group")
-                self._load_transactions()
+                self.apply_changes(changes)
                 return
 
             if result.startswith("rename:"):
                 new_name = result[7:]
                 try:
-                    queries.rename_merge(session, parent.id, new_name)
+                    queries.rename_merge(session, parent.id, new_name, changes)
                     db.mark_dirty()
                     self.app.notify(f"Group renamed to: {new_name}")
                 except ValueError as e:
                     self.app.notify(str(e), severity="error")
-                self._load_transactions()
+                self.apply_changes(changes)
                 return
 
         self.app.push_screen(
@@ -738,6 +1248,9 @@ class TransactionTable(DataTable):
             self.notify("This account has no mapping spec!", severity="error")
             return
 
+        if self.app.block_if_importing():
+            return
+
         def handle_import(csv_path: str | None):
             if not csv_path:
                 return
@@ -752,14 +1265,14 @@ class TransactionTable(DataTable):
         if self.row_count == 0:
             return
 
-        row_key, _ = self.coordinate_to_cell_key(self.cursor_coordinate)
+        key_value = self._key_at(self.cursor_row)
 
         # Can't split merge headers
-        if row_key.value in self._merge_header_rows:
+        if key_value.startswith(MERGE_HEADER_KEY_PREFIX):
             return
 
         session = self._session or self.app.db
-        tx = session.get(Transaction, int(row_key.value))
+        tx = session.get(Transaction, int(key_value))
         if tx is None:
             return
 
@@ -782,51 +1295,10 @@ class TransactionTable(DataTable):
         def handle_split(splits: list[dict] | None):
             if splits is None:
                 return
-
-            existing_ids = {c.id for c in (existing or [])}
-            returned_ids = {s["id"] for s in splits if s["id"] is not None}
-
-            # Delete removed children
-            for child in list(root.split_children):
-                if child.id not in returned_ids:
-                    session.delete(child)
-
-            # Compute proportional ratio
-            if float(root.original_value) != 0:
-                ratio = Decimal(str(root.value_in_account_currency)) / Decimal(
-                    str(root.original_value)
-                )
-            else:
-                ratio = Decimal("1")
-
-            # Update or create children
-            for s in splits:
-                amount = Decimal(str(s["amount"]))
-                acc_amount = float(amount * ratio)
-
-                if s["id"] is not None and s["id"] in existing_ids:
-                    # Update existing child
-                    child = session.get(Transaction, s["id"])
-                    if child:
-                        child.description = s["description"]
-                        child.original_value = float(amount)
-                        child.value_in_account_currency = acc_amount
-                else:
-                    # Create new child
-                    child = Transaction(
-                        account_id=root.account_id,
-                        description=s["description"],
-                        original_value=float(amount),
-                        original_currency=root.original_currency,
-                        value_in_account_currency=acc_amount,
-                        date=root.date,
-                        split_parent_id=root.id,
-                    )
-                    session.add(child)
-
-            session.commit()
+            changes = queries.ChangeSet()
+            queries.save_split(session, root.id, splits, changes)
             db.mark_dirty()
-            self._load_transactions()
+            self.apply_changes(changes)
 
         self.app.push_screen(
             SplitTransactionScreen(root, existing), handle_split